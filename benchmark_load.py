@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent load test for the Flask API
+ทดสอบโหลดของ Web API แบบหลายผู้ใช้พร้อมกัน
+
+Starts main_optimized in a child process with stub STT/translation/TTS stages and
+yt-dlp replaced by a local YouTube stand-in (serving a synthetic clip, optionally
+bandwidth-limited), then drives it with concurrent uploaders, YouTube submitters and
+status pollers. Reports p50/p95/p99 latency and error rate per endpoint, queue wait
+and turnaround per job, and server RSS (incl. ffmpeg children) over time.
+
+Examples:
+    python benchmark_load.py --uploaders 4 --youtube 4 --pollers 8 --duration 60
+    python benchmark_load.py --max-concurrent 1 --standin-bandwidth 2000000 --think-time 0.5
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import shutil
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+import collections
+import http.server
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+import psutil
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_DIR = Path("benchmark_results")
+TERMINAL_STATUSES = ('completed', 'error', 'stopped')
+
+# Keep the stubbed pipeline light: no UVR model loading
+JOB_OPTIONS = {
+    'force_reprocess': 'true',
+    'enable_vocal_removal': 'false',
+    'enable_step2_vocal_removal': 'false'
+}
+
+# ---------------------------------------------------------------------------
+# Server side (runs in the child process started with --serve)
+# ---------------------------------------------------------------------------
+
+def make_standin_download(standin_url):
+    """Replacement for YouTubeDownloader._download_format that fetches from the local stand-in"""
+    from config import YOUTUBE_AUDIO_FORMAT
+    from services import pipeline_metrics, resource_tracker
+    
+    def standin_download_format(self, url, format_selector, output_base):
+        # Same container for both selectors; the .m4a name keeps the mp4-compatible mux path
+        output_path = f"{output_base}.{'m4a' if format_selector == YOUTUBE_AUDIO_FORMAT else 'mp4'}"
+        with pipeline_metrics.time_stage('download'), \
+                urllib.request.urlopen(f"{standin_url}/{self.extract_video_id(url)}", timeout=300) as response, \
+                open(output_path, 'wb') as f:
+            shutil.copyfileobj(response, f)
+        resource_tracker.charge(network_bytes=os.path.getsize(output_path))
+        return output_path
+    
+    return standin_download_format
+
+def serve(args):
+    """รัน main_optimized พร้อม stub (เรียกจาก --serve ใน process ลูก)"""
+    import config
+    config.MAX_CONCURRENT_JOBS = args.max_concurrent  # read by main_optimized at import
+    
+    from services import YouTubeDownloader
+    from benchmark_pipeline import install_stubs
+    install_stubs(['stt', 'translation', 'tts'])
+    YouTubeDownloader._download_format = make_standin_download(args.standin)
+    
+    import main_optimized
+    print(f"🚀 Load-test server on 127.0.0.1:{args.port} (max concurrent jobs: {args.max_concurrent})", flush=True)
+    main_optimized.app.run(host='127.0.0.1', port=args.port, debug=False, threaded=True, use_reloader=False)
+    return 0
+
+# ---------------------------------------------------------------------------
+# Local YouTube stand-in
+# ---------------------------------------------------------------------------
+
+class YouTubeStandInHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the synthetic clip for any video id, with optional latency and bandwidth cap"""
+    
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(os.path.getsize(self.server.media_path)))
+        self.end_headers()
+        with open(self.server.media_path, 'rb') as f:
+            while True:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                if self.server.bandwidth:
+                    time.sleep(len(chunk) / self.server.bandwidth)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_standin(media_path, bandwidth, latency):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), YouTubeStandInHandler)
+    server.daemon_threads = True
+    server.media_path = media_path
+    server.bandwidth = bandwidth
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+# ---------------------------------------------------------------------------
+# Client side
+# ---------------------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def http_request(method, url, body=None, headers=None, timeout=120):
+    """คืนค่า (status, payload, latency, error) - status เป็น None เมื่อเชื่อมต่อไม่ได้"""
+    request = urllib.request.Request(url, data=body, method=method, headers=headers or {})
+    start = time.perf_counter()
+    status, payload, error = None, b'', None
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+            payload = response.read()
+    except urllib.error.HTTPError as e:
+        status = e.code
+        payload = e.read()
+    except Exception as e:
+        error = type(e).__name__
+    return status, payload, time.perf_counter() - start, error
+
+def encode_multipart(fields, file_field, filename, content):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+                 f'Content-Type: video/mp4\r\n\r\n'.encode() + content + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+class LoadStats:
+    """Thread-safe per-endpoint latency/error counters and per-job timings"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.defaultdict(collections.Counter)
+        self.jobs = {}
+    
+    def record(self, endpoint, latency, status, error=None):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            if error or status is None or status >= 400:
+                self.errors[endpoint][error or str(status)] += 1
+    
+    def job_submitted(self, task_id, kind):
+        with self.lock:
+            self.jobs[task_id] = {'kind': kind, 'status': 'submitted', 'submitted_at': time.time()}
+    
+    def job_status(self, task_id, status):
+        with self.lock:
+            job = self.jobs[task_id]
+            job['status'] = status['status']
+            if status['status'] in TERMINAL_STATUSES:
+                created = datetime.fromisoformat(status['created_at']) if status.get('created_at') else None
+                started = datetime.fromisoformat(status['started_at']) if status.get('started_at') else None
+                completed = datetime.fromisoformat(status['completed_at']) if status.get('completed_at') else None
+                job['queue_wait'] = (started - created).total_seconds() if created and started else None
+                job['turnaround'] = (completed - created).total_seconds() if created and completed else None
+                job['error'] = status.get('error')
+    
+    def active_jobs(self):
+        with self.lock:
+            return [task_id for task_id, job in self.jobs.items() if job['status'] not in TERMINAL_STATUSES]
+    
+    def summary(self, elapsed):
+        with self.lock:
+            endpoints = {}
+            for endpoint, values in sorted(self.latencies.items()):
+                errors = sum(self.errors[endpoint].values())
+                endpoints[endpoint] = {
+                    'requests': len(values),
+                    'rps': round(len(values) / elapsed, 2) if elapsed else None,
+                    'errors': errors,
+                    'error_rate': round(errors / len(values), 4) if values else 0.0,
+                    'error_kinds': dict(self.errors[endpoint]),
+                    'p50_ms': round(percentile(values, 50) * 1000, 1),
+                    'p95_ms': round(percentile(values, 95) * 1000, 1),
+                    'p99_ms': round(percentile(values, 99) * 1000, 1),
+                    'max_ms': round(max(values) * 1000, 1)
+                }
+            
+            jobs = {}
+            for kind in sorted({job['kind'] for job in self.jobs.values()}):
+                kind_jobs = [job for job in self.jobs.values() if job['kind'] == kind]
+                waits = [job['queue_wait'] for job in kind_jobs if job.get('queue_wait') is not None]
+                turnarounds = [job['turnaround'] for job in kind_jobs if job.get('turnaround') is not None]
+                statuses = collections.Counter(job['status'] for job in kind_jobs)
+                jobs[kind] = {
+                    'submitted': len(kind_jobs),
+                    'statuses': dict(statuses),
+                    'unfinished': sum(count for status, count in statuses.items() if status not in TERMINAL_STATUSES),
+                    'queue_wait_p50': percentile(waits, 50),
+                    'queue_wait_p95': percentile(waits, 95),
+                    'queue_wait_p99': percentile(waits, 99),
+                    'turnaround_p50': percentile(turnarounds, 50),
+                    'turnaround_p95': percentile(turnarounds, 95),
+                    'errors': collections.Counter(job['error'] for job in kind_jobs if job.get('error')).most_common(5)
+                }
+            return endpoints, jobs
+
+class RssMonitor:
+    """Samples server RSS (incl. children such as ffmpeg) and thread count over time"""
+    
+    def __init__(self, pid, interval):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.started = time.time()
+    
+    def _loop(self):
+        while not self.stop_event.is_set():
+            try:
+                rss = self.process.memory_info().rss
+                for child in self.process.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+                self.samples.append({'t': round(time.time() - self.started, 1), 'rss': rss, 'threads': self.process.num_threads()})
+            except psutil.Error:
+                break
+            self.stop_event.wait(self.interval)
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+        return self.samples
+
+def submitter(kind, base_url, stats, deadline, think_time, index, upload_body=None):
+    """ส่งงานซ้ำ ๆ จนหมดเวลา (uploader หรือ YouTube submitter)"""
+    count = 0
+    while time.time() < deadline:
+        if kind == 'upload':
+            endpoint = 'POST /api/upload/auto'
+            body, content_type = upload_body
+            status, payload, latency, error = http_request('POST', f"{base_url}/api/upload/auto", body, {'Content-Type': content_type})
+        else:
+            endpoint = 'POST /api/youtube/realtime'
+            # A small pool of ids so the download cache sees hits and coalesced fetches too
+            video_id = f"loadtest{(index * 7 + count) % 5:03d}"
+            data = {'video_url': f"https://www.youtube.com/watch?v={video_id}", 'force_reprocess': True,
+                    'enable_vocal_removal': False, 'enable_step2_vocal_removal': False}
+            status, payload, latency, error = http_request('POST', f"{base_url}/api/youtube/realtime",
+                                                           json.dumps(data).encode(), {'Content-Type': 'application/json'})
+        stats.record(endpoint, latency, status, error)
+        if status == 200:
+            response = json.loads(payload)
+            stats.job_submitted(response.get('duplicate_of') or response['task_id'], kind)
+        count += 1
+        time.sleep(think_time)
+
+def poller(base_url, stats, stop_event, interval, index, pollers):
+    """วนตรวจสถานะงานที่ยังไม่เสร็จ (แบ่งงานกันตาม index)"""
+    while not stop_event.is_set():
+        for task_id in stats.active_jobs()[index::pollers]:
+            status, payload, latency, error = http_request('GET', f"{base_url}/api/status/{task_id}")
+            stats.record('GET /api/status', latency, status, error)
+            if status == 200:
+                stats.job_status(task_id, json.loads(payload))
+        stop_event.wait(interval)
+
+def wait_for_server(base_url, server_process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server_process.poll() is not None:
+            return False
+        status, _, _, _ = http_request('GET', f"{base_url}/api/languages/supported", timeout=2)
+        if status == 200:
+            return True
+        time.sleep(0.5)
+    return False
+
+def print_report(endpoints, jobs, samples):
+    print(f"\n{'endpoint':<28} {'reqs':>6} {'rps':>7} {'err%':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print("-" * 86)
+    for endpoint, row in endpoints.items():
+        print(f"{endpoint:<28} {row['requests']:>6} {row['rps']:>7.2f} {row['error_rate'] * 100:>6.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+        if row['error_kinds']:
+            print(f"{'':<28} errors: {row['error_kinds']}")
+    
+    fmt = lambda value: f"{value:.1f}" if value is not None else '-'
+    print(f"\n{'jobs':<10} {'submitted':>9} {'done':>5} {'failed':>6} {'unfin':>6} {'wait p50':>9} {'wait p95':>9} {'wait p99':>9} {'turn p50':>9} {'turn p95':>9}")
+    print("-" * 92)
+    for kind, row in jobs.items():
+        print(f"{kind:<10} {row['submitted']:>9} {row['statuses'].get('completed', 0):>5} {row['statuses'].get('error', 0):>6} "
+              f"{row['unfinished']:>6} {fmt(row['queue_wait_p50']):>9} {fmt(row['queue_wait_p95']):>9} {fmt(row['queue_wait_p99']):>9} "
+              f"{fmt(row['turnaround_p50']):>9} {fmt(row['turnaround_p95']):>9}")
+        for error, count in row['errors']:
+            print(f"{'':<10} ❌ {count}x {error}")
+    
+    if samples:
+        print(f"\n🧠 Server RSS: start {samples[0]['rss'] / 1024 / 1024:.0f}MB, "
+              f"peak {max(sample['rss'] for sample in samples) / 1024 / 1024:.0f}MB, end {samples[-1]['rss'] / 1024 / 1024:.0f}MB")
+        step = max(1, len(samples) // 12)
+        for sample in samples[::step]:
+            print(f"   t={sample['t']:>6.1f}s  {sample['rss'] / 1024 / 1024:>7.0f}MB  threads={sample['threads']}")
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description="Concurrent load test for the Flask API with stub pipeline stages")
+    parser.add_argument('--uploaders', type=int, default=2, help="Concurrent /api/upload/auto clients")
+    parser.add_argument('--youtube', type=int, default=2, help="Concurrent /api/youtube/realtime clients")
+    parser.add_argument('--pollers', type=int, default=4, help="Concurrent /api/status pollers")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to keep submitting")
+    parser.add_argument('--think-time', type=float, default=2.0, help="Pause between submissions per client")
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    parser.add_argument('--drain-timeout', type=float, default=300, help="Max seconds to wait for queued jobs afterwards")
+    parser.add_argument('--media-seconds', type=float, default=10, help="Length of the synthetic clip")
+    parser.add_argument('--max-concurrent', type=int, help="Override MAX_CONCURRENT_JOBS on the server")
+    parser.add_argument('--standin-bandwidth', type=float, default=0, help="YouTube stand-in bytes/s per download (0 = unlimited)")
+    parser.add_argument('--standin-latency', type=float, default=0.2, help="YouTube stand-in time to first byte (s)")
+    parser.add_argument('--rss-interval', type=float, default=1.0)
+    parser.add_argument('--output', help="Result JSON path (default benchmark_results/load_<time>.json)")
+    # Internal: child-process server mode
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--standin', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        return serve(args)
+    
+    from config import MAX_CONCURRENT_JOBS
+    from benchmark_pipeline import generate_synthetic_video
+    args.max_concurrent = args.max_concurrent or MAX_CONCURRENT_JOBS
+    
+    print("🚀 เริ่ม Load Test")
+    print("=" * 50)
+    
+    media_path = generate_synthetic_video(args.media_seconds)
+    with open(media_path, 'rb') as f:
+        upload_body = encode_multipart(JOB_OPTIONS, 'video', 'loadtest.mp4', f.read())
+    standin, standin_url = start_standin(media_path, args.standin_bandwidth, args.standin_latency)
+    print(f"📺 YouTube stand-in: {standin_url}")
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    server_log_path = RESULTS_DIR / f"load_server_{timestamp}.log"
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with open(server_log_path, 'w') as server_log:
+        server_process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port),
+             '--standin', standin_url, '--max-concurrent', str(args.max_concurrent)],
+            stdout=server_log, stderr=subprocess.STDOUT
+        )
+    
+    try:
+        print(f"⏳ รอเซิร์ฟเวอร์ {base_url} (log: {server_log_path})")
+        if not wait_for_server(base_url, server_process, timeout=180):
+            print(f"❌ เซิร์ฟเวอร์ไม่พร้อม ดู log: {server_log_path}")
+            return 1
+        
+        monitor = RssMonitor(server_process.pid, args.rss_interval)
+        monitor.start()
+        stats = LoadStats()
+        stop_polling = threading.Event()
+        
+        started = time.time()
+        deadline = started + args.duration
+        clients = [threading.Thread(target=submitter, args=('upload', base_url, stats, deadline, args.think_time, i, upload_body))
+                   for i in range(args.uploaders)]
+        clients += [threading.Thread(target=submitter, args=('youtube', base_url, stats, deadline, args.think_time, i))
+                    for i in range(args.youtube)]
+        pollers = [threading.Thread(target=poller, args=(base_url, stats, stop_polling, args.poll_interval, i, args.pollers))
+                   for i in range(args.pollers)]
+        for thread in clients + pollers:
+            thread.daemon = True
+            thread.start()
+        
+        print(f"👥 {args.uploaders} uploaders, {args.youtube} YouTube submitters, {args.pollers} pollers "
+              f"for {args.duration:g}s (max concurrent jobs: {args.max_concurrent})")
+        for thread in clients:
+            thread.join()
+        
+        print(f"⏳ รองานที่ค้างในคิว ({len(stats.active_jobs())} งาน)...")
+        drain_deadline = time.time() + args.drain_timeout
+        while stats.active_jobs() and time.time() < drain_deadline:
+            time.sleep(1)
+        stop_polling.set()
+        for thread in pollers:
+            thread.join(timeout=10)
+        elapsed = time.time() - started
+        samples = monitor.stop()
+    finally:
+        server_process.terminate()
+        try:
+            server_process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server_process.kill()
+        standin.shutdown()
+    
+    endpoints, jobs = stats.summary(elapsed)
+    print_report(endpoints, jobs, samples)
+    
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"load_{timestamp}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'host': {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+            'config': {key: value for key, value in vars(args).items() if key not in ('serve', 'port', 'standin')},
+            'elapsed_seconds': round(elapsed, 1),
+            'endpoints': endpoints,
+            'jobs': jobs,
+            'server_rss': samples
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 บันทึกผล: {output_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
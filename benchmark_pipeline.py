@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end pipeline benchmark with synthetic media
+เบนช์มาร์กไปป์ไลน์ทั้งหมดด้วยวิดีโอสังเคราะห์
+
+Generates videos of controlled length with ffmpeg lavfi (tone + speech-like noise with
+silence gaps), runs them through JobQueue._process_job and records per-stage wall time,
+RTF, CPU, peak memory and temp-disk usage to JSON. STT, translation and TTS use fast
+stubs by default (--stt real / --translation real / --tts real for the real models).
+
+Examples:
+    python benchmark_pipeline.py --durations 30,120 --repeat 3
+    python benchmark_pipeline.py --save-baseline benchmark_results/baseline.json
+    python benchmark_pipeline.py --baseline benchmark_results/baseline.json --threshold 0.25
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import psutil
+import soundfile as sf
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import TEMP_DIR, AUDIOS_DIR, OUTPUTS_DIR, TEXTS_DIR, UPLOADS_DIR
+from services import JobQueue, VideoProcessor, TranslationService, TTSService
+
+BENCHMARK_DIR = TEMP_DIR / "benchmark"
+RESULTS_DIR = Path("benchmark_results")
+WATCHED_DIRS = [TEMP_DIR, AUDIOS_DIR, OUTPUTS_DIR, TEXTS_DIR, UPLOADS_DIR]
+STUB_WORDS = ["hello", "video", "translate", "speech", "model", "audio", "today", "we", "will", "test", "the", "pipeline"]
+
+def generate_synthetic_video(duration, speech_seconds=4.0, gap_seconds=1.5, output_dir=BENCHMARK_DIR):
+    """สร้างวิดีโอสังเคราะห์ (testsrc2 + เสียงคล้ายเสียงพูดสลับช่วงเงียบ) ด้วย ffmpeg lavfi"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"synthetic_{duration:g}s_{speech_seconds:g}on_{gap_seconds:g}off.mp4"
+    if output_path.exists():
+        return str(output_path)
+    
+    period = speech_seconds + gap_seconds
+    # Pink noise band-limited to the voice range, amplitude-modulated at a syllable rate and
+    # mixed with a low tone, then gated so every period ends with gap_seconds of near-silence
+    audio_filter = (
+        "[1:a][2:a]amix=inputs=2:duration=first,"
+        "bandpass=f=1000:width_type=h:w=2500,"
+        "tremolo=f=4:d=0.7,"
+        f"volume='if(lt(mod(t,{period}),{speech_seconds}),1,0.02)':eval=frame[a]"
+    )
+    cmd = [
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size=640x360:rate=25:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=180:sample_rate=16000:duration={duration}',
+        '-f', 'lavfi', '-i', f'anoisesrc=color=pink:amplitude=0.25:sample_rate=16000:duration={duration}',
+        '-filter_complex', audio_filter,
+        '-map', '0:v', '-map', '[a]',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-shortest', str(output_path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0 or not output_path.exists():
+        raise Exception(f"ffmpeg lavfi generation failed: {result.stderr}")
+    
+    print(f"🎬 สร้างวิดีโอสังเคราะห์: {output_path} ({duration:g}s)")
+    return str(output_path)
+
+# ---------------------------------------------------------------------------
+# Stub models (fast, deterministic, same return types as the real services)
+# ---------------------------------------------------------------------------
+
+def stub_transcribe_audio(self, audio_path, model_name, source_lang, task_id, task='transcribe', target_lang=None):
+    """~2.5 words per second of audio, like conversational speech"""
+    duration = sf.info(audio_path).duration
+    words = [STUB_WORDS[i % len(STUB_WORDS)] for i in range(max(1, int(duration * 2.5)))]
+    sentences = [' '.join(words[i:i + 12]).capitalize() + '.' for i in range(0, len(words), 12)]
+    return ' '.join(sentences)
+
+def stub_translate(self, text, source_lang, target_lang, model_name):
+    """Same length as the input, so downstream TTS sees a realistic amount of text"""
+    return ' '.join(f"[{target_lang}]{word}" if i % 12 == 0 else word for i, word in enumerate(text.split()))
+
+def stub_synthesize_speech(self, text, target_lang, model_name, task_id, voice_mode='female', custom_coqui_model=None):
+    """A tone lasting as long as speaking the text would (~14 chars/s)"""
+    sample_rate = 22050
+    duration = max(0.5, len(text) / 14.0)
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    audio = 0.2 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    output_path = TEMP_DIR / f"{task_id}_tts_stub.wav"
+    sf.write(str(output_path), audio.astype(np.float32), sample_rate)
+    return str(output_path)
+
+STUBS = {
+    'stt': (VideoProcessor, 'transcribe_audio', stub_transcribe_audio),
+    'translation': (TranslationService, 'translate', stub_translate),
+    'tts': (TTSService, 'synthesize_speech', stub_synthesize_speech),
+}
+
+def install_stubs(stages):
+    """แทนที่เมธอดของ service ด้วย stub (คืนค่าเดิมไว้สำหรับ restore_stubs)"""
+    originals = {}
+    for stage in stages:
+        cls, name, stub = STUBS[stage]
+        originals[stage] = getattr(cls, name)
+        setattr(cls, name, stub)
+    return originals
+
+def restore_stubs(originals):
+    for stage, original in originals.items():
+        cls, name, _ = STUBS[stage]
+        setattr(cls, name, original)
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def directory_size(paths):
+    total = 0
+    for path in paths:
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+    return total
+
+class PeakSampler:
+    """Background sampling of process RSS (incl. ffmpeg children) and temp-disk usage"""
+    
+    def __init__(self, interval=0.1, disk_interval=0.5):
+        self.interval = interval
+        self.disk_interval = disk_interval
+        self.process = psutil.Process()
+        self.running = False
+    
+    def _rss(self):
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+    
+    def start(self):
+        self.start_rss = self._rss()
+        self.start_disk = directory_size(WATCHED_DIRS)
+        self.peak_rss = self.start_rss
+        self.peak_disk = self.start_disk
+        self.running = True
+        self.thread = threading.Thread(target=self._loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def _loop(self):
+        last_disk = 0.0
+        while self.running:
+            self.peak_rss = max(self.peak_rss, self._rss())
+            if time.time() - last_disk >= self.disk_interval:
+                self.peak_disk = max(self.peak_disk, directory_size(WATCHED_DIRS))
+                last_disk = time.time()
+            time.sleep(self.interval)
+    
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=5)
+        return {
+            'peak_rss': self.peak_rss,
+            'rss_delta': self.peak_rss - self.start_rss,
+            'peak_temp_disk_delta': self.peak_disk - self.start_disk
+        }
+
+def build_task_data(video_path, args):
+    return {
+        'video_input': video_path,
+        'stt_model': args.stt_model,
+        'translation_model': args.translation_model,
+        'tts_model': args.tts_model,
+        'source_lang': args.source_lang,
+        'target_lang': args.target_lang,
+        'voice_mode': 'female',
+        'video_speed': 1.0,
+        'output_mode': 'dub',
+        'enable_step2_vocal_removal': args.uvr,
+        'enable_vocal_removal': args.uvr,
+        'force_reprocess': True,  # Never reuse an earlier result (dedup)
+    }
+
+def run_once(job_queue, video_path, media_seconds, args, run_index):
+    """รันงานหนึ่งครั้งผ่าน JobQueue และเก็บผลต่อขั้นตอน"""
+    task_id = f"bench_{int(media_seconds)}s_{run_index}_{datetime.now().strftime('%H%M%S%f')}"
+    sampler = PeakSampler()
+    sampler.start()
+    
+    started = time.time()
+    job_queue.add_job(task_id, build_task_data(video_path, args))
+    job = job_queue.get_job_status(task_id)
+    while job['status'] not in ('completed', 'error', 'stopped') or job.get('resources') is None:
+        if time.time() - started > args.timeout:
+            job_queue.stop_job(task_id)
+            break
+        time.sleep(0.05)
+    peaks = sampler.stop()
+    
+    resources = job.get('resources') or {'stages': {}, 'totals': {}}
+    total_seconds = ((job['completed_at'] - job['started_at']).total_seconds()
+                     if job.get('completed_at') and job.get('started_at') else time.time() - started)
+    
+    stages = {}
+    for stage, usage in resources['stages'].items():
+        stages[stage] = {
+            'wall_seconds': usage['wall_seconds'],
+            'rtf': round(usage['wall_seconds'] / media_seconds, 4),
+            'cpu_seconds': usage['cpu_seconds'],
+            'process_cpu_seconds': usage['process_cpu_seconds'],
+            'subprocess_cpu_seconds': usage['subprocess_cpu_seconds'],
+            'peak_rss_delta': usage['peak_rss_delta'],
+        }
+    
+    return {
+        'task_id': task_id,
+        'status': job['status'],
+        'error': job.get('error'),
+        'total_seconds': round(total_seconds, 3),
+        'rtf': round(total_seconds / media_seconds, 4),
+        'stages': stages,
+        **peaks
+    }
+
+def summarize_runs(runs, media_seconds):
+    """Median for times, max for memory/disk across repeats"""
+    ok_runs = [run for run in runs if run['status'] == 'completed'] or runs
+    stage_names = []
+    for run in ok_runs:
+        stage_names.extend(stage for stage in run['stages'] if stage not in stage_names)
+    
+    stages = {}
+    for stage in stage_names:
+        values = [run['stages'][stage] for run in ok_runs if stage in run['stages']]
+        stages[stage] = {
+            key: (max(value[key] for value in values) if key == 'peak_rss_delta'
+                  else round(statistics.median(value[key] for value in values), 4))
+            for key in values[0]
+        }
+    
+    return {
+        'media_seconds': media_seconds,
+        'runs': len(runs),
+        'failed_runs': sum(1 for run in runs if run['status'] != 'completed'),
+        'errors': [run['error'] for run in runs if run.get('error')],
+        'total_seconds': round(statistics.median(run['total_seconds'] for run in ok_runs), 3),
+        'rtf': round(statistics.median(run['rtf'] for run in ok_runs), 4),
+        'peak_rss': max(run['peak_rss'] for run in ok_runs),
+        'rss_delta': max(run['rss_delta'] for run in ok_runs),
+        'peak_temp_disk_delta': max(run['peak_temp_disk_delta'] for run in ok_runs),
+        'stages': stages
+    }
+
+def compare_to_baseline(results, baseline, threshold, min_seconds):
+    """คืนรายการ regression: เวลาที่ช้าลงเกิน threshold (และเกิน min_seconds) หรือหน่วยความจำที่เพิ่มขึ้น"""
+    regressions = []
+    for case, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(case)
+        if previous is None:
+            continue
+        
+        checks = [('total_seconds', current['total_seconds'], previous['total_seconds'], min_seconds),
+                  ('rss_delta', current['rss_delta'], previous['rss_delta'], 50 * 1024 * 1024)]
+        for stage, usage in current['stages'].items():
+            if stage in previous['stages']:
+                checks.append((f"{stage} wall_seconds", usage['wall_seconds'], previous['stages'][stage]['wall_seconds'], min_seconds))
+        
+        for metric, now, before, floor in checks:
+            if now > before * (1 + threshold) and now - before > floor:
+                regressions.append({
+                    'case': case,
+                    'metric': metric,
+                    'baseline': before,
+                    'current': now,
+                    'change_percent': round((now / before - 1) * 100, 1) if before else None
+                })
+    return regressions
+
+def print_case(case, summary):
+    print(f"\n📊 {case}: total {summary['total_seconds']:.2f}s  RTF {summary['rtf']:.3f}  "
+          f"peak RSS {summary['peak_rss'] / 1024 / 1024:.0f}MB (+{summary['rss_delta'] / 1024 / 1024:.0f}MB)  "
+          f"temp disk +{summary['peak_temp_disk_delta'] / 1024 / 1024:.1f}MB")
+    print(f"   {'stage':<36} {'wall(s)':>9} {'RTF':>8} {'cpu(s)':>8} {'proc cpu':>9} {'subproc':>8}")
+    for stage, usage in summary['stages'].items():
+        print(f"   {stage[:36]:<36} {usage['wall_seconds']:>9.3f} {usage['rtf']:>8.4f} {usage['cpu_seconds']:>8.3f} "
+              f"{usage['process_cpu_seconds']:>9.3f} {usage['subprocess_cpu_seconds']:>8.3f}")
+    for error in summary['errors']:
+        print(f"   ❌ {error}")
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description="End-to-end VIDEOTRANSLAT pipeline benchmark")
+    parser.add_argument('--durations', default='30,120', help="Synthetic video lengths in seconds (comma separated)")
+    parser.add_argument('--speech-seconds', type=float, default=4.0, help="Speech-like burst length")
+    parser.add_argument('--gap-seconds', type=float, default=1.5, help="Silence between bursts")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per duration (median is reported)")
+    parser.add_argument('--stt', choices=['stub', 'real'], default='stub')
+    parser.add_argument('--translation', choices=['stub', 'real'], default='stub')
+    parser.add_argument('--tts', choices=['stub', 'real'], default='stub')
+    parser.add_argument('--uvr', action='store_true', help="Run the vocal-removal step (real UVR)")
+    parser.add_argument('--stt-model', default='base')
+    parser.add_argument('--translation-model', default='nllb-200-distilled')
+    parser.add_argument('--tts-model', default='gtts')
+    parser.add_argument('--source-lang', default='en')
+    parser.add_argument('--target-lang', default='th')
+    parser.add_argument('--timeout', type=float, default=3600, help="Per-run timeout in seconds")
+    parser.add_argument('--output', help="Result JSON path (default benchmark_results/pipeline_<time>.json)")
+    parser.add_argument('--baseline', help="Compare against this result JSON")
+    parser.add_argument('--save-baseline', help="Also write the results to this path as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument('--min-seconds', type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    
+    print("🚀 เริ่ม Pipeline Benchmark")
+    print("=" * 50)
+    
+    stubbed = [stage for stage in ('stt', 'translation', 'tts') if getattr(args, stage) == 'stub']
+    originals = install_stubs(stubbed)
+    print(f"🧩 Stub stages: {', '.join(stubbed) or 'none'}")
+    
+    job_queue = JobQueue(max_concurrent=1)
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline', 'save_baseline')},
+        'host': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'memory_total': psutil.virtual_memory().total
+        },
+        'cases': {}
+    }
+    
+    try:
+        for duration in [float(value) for value in args.durations.split(',') if value.strip()]:
+            video_path = generate_synthetic_video(duration, args.speech_seconds, args.gap_seconds)
+            runs = []
+            for run_index in range(args.repeat):
+                print(f"⏱️  {duration:g}s run {run_index + 1}/{args.repeat}...")
+                runs.append(run_once(job_queue, video_path, duration, args, run_index))
+            case = f"{duration:g}s"
+            results['cases'][case] = summarize_runs(runs, duration)
+            print_case(case, results['cases'][case])
+    finally:
+        job_queue.stop()
+        restore_stubs(originals)
+    
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 บันทึกผล: {output_path}")
+    
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📌 บันทึก baseline: {args.save_baseline}")
+    
+    exit_code = 0
+    if any(case['failed_runs'] for case in results['cases'].values()):
+        print("❌ มีบางรอบที่ล้มเหลว")
+        exit_code = 1
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold, args.min_seconds)
+        print("\n" + "=" * 50)
+        if regressions:
+            print(f"❌ พบ regression {len(regressions)} รายการ (threshold {args.threshold * 100:.0f}%)")
+            for item in regressions:
+                print(f"   {item['case']} {item['metric']}: {item['baseline']} -> {item['current']} ({item['change_percent']}%)")
+            exit_code = 1
+        else:
+            print(f"🎉 ไม่มี regression เทียบกับ baseline {args.baseline}")
+    
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
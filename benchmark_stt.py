@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+STT throughput / accuracy benchmark for VideoProcessor
+เบนช์มาร์กความเร็วและความแม่นยำของ STT
+
+Sweeps model x chunk length x beam size x batch size x torch thread count over a fixed
+local corpus and reports real-time factor, generated tokens/s, peak RSS and WER/CER
+against reference transcripts.
+
+Corpus layout (one reference transcript per audio file, same stem):
+    benchmark_corpus/stt/clip01.wav
+    benchmark_corpus/stt/clip01.txt
+
+Examples:
+    python benchmark_stt.py --models base,small --beams 1,5 --batch-sizes 1,4 --threads 4
+    python benchmark_stt.py --models biodatlab-medium --source-lang th --chunk-seconds 20,30
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import itertools
+import platform
+from datetime import datetime
+from pathlib import Path
+
+import torch
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import WHISPER_CHUNK_OVERLAP
+from services import VideoProcessor, model_registry
+from benchmark_pipeline import PeakSampler, RESULTS_DIR
+
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.flac', '.ogg'}
+
+def load_corpus(corpus_dir):
+    """โหลดรายการไฟล์เสียงพร้อม transcript อ้างอิง (ถ้ามี)"""
+    items = []
+    for path in sorted(Path(corpus_dir).iterdir()):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        reference_path = path.with_suffix('.txt')
+        reference = reference_path.read_text(encoding='utf-8').strip() if reference_path.exists() else None
+        items.append({'name': path.name, 'path': str(path), 'reference': reference})
+    return items
+
+def normalize_text(text):
+    text = text.lower()
+    text = re.sub(r"[^\w\s']", ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def edit_distance(reference, hypothesis):
+    """Levenshtein distance between two token sequences"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_token in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_token in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_token != hyp_token))
+        previous = current
+    return previous[-1]
+
+def error_rates(reference, hypothesis):
+    """(WER, CER) - CER is the meaningful one for Thai/Lao/Chinese, which have no word spaces"""
+    reference = normalize_text(reference)
+    hypothesis = normalize_text(hypothesis)
+    ref_words = reference.split()
+    ref_chars = list(reference.replace(' ', ''))
+    wer = edit_distance(ref_words, hypothesis.split()) / len(ref_words) if ref_words else 0.0
+    cer = edit_distance(ref_chars, list(hypothesis.replace(' ', ''))) / len(ref_chars) if ref_chars else 0.0
+    return wer, cer
+
+def transcribe_file(processor, audio, sr, source_lang, chunk_seconds, batch_size, num_beams):
+    """แบ่ง chunk แล้วถอดเสียงทีละ batch; คืนค่า (ข้อความ, จำนวน token)"""
+    overlap = min(WHISPER_CHUNK_OVERLAP, chunk_seconds / 4)
+    chunks = [chunk for _, chunk in processor._split_audio_chunks(audio, sr, chunk_seconds, overlap)]
+    texts = []
+    token_count = 0
+    for i in range(0, len(chunks), batch_size):
+        batch_texts, batch_tokens = processor.transcribe_chunk_batch(chunks[i:i + batch_size], sr, source_lang, num_beams)
+        texts.extend(batch_texts)
+        token_count += batch_tokens
+    return processor._combine_transcriptions_enhanced(texts), token_count
+
+def run_config(processor, corpus, audio_cache, source_lang, chunk_seconds, batch_size, num_beams, threads):
+    torch.set_num_threads(threads)
+    sampler = PeakSampler()
+    sampler.start()
+    
+    files = []
+    total_audio = total_wall = 0.0
+    total_tokens = 0
+    for item in corpus:
+        audio, sr = audio_cache[item['path']]
+        start = time.perf_counter()
+        text, tokens = transcribe_file(processor, audio, sr, source_lang, chunk_seconds, batch_size, num_beams)
+        wall = time.perf_counter() - start
+        
+        audio_seconds = len(audio) / sr
+        wer, cer = error_rates(item['reference'], text) if item['reference'] else (None, None)
+        files.append({'name': item['name'], 'audio_seconds': round(audio_seconds, 2), 'wall_seconds': round(wall, 3),
+                      'rtf': round(wall / audio_seconds, 4), 'tokens': tokens, 'wer': wer, 'cer': cer, 'text': text})
+        total_audio += audio_seconds
+        total_wall += wall
+        total_tokens += tokens
+    
+    peaks = sampler.stop()
+    scored = [item for item in files if item['wer'] is not None]
+    return {
+        'chunk_seconds': chunk_seconds,
+        'num_beams': num_beams,
+        'batch_size': batch_size,
+        'threads': threads,
+        'audio_seconds': round(total_audio, 2),
+        'wall_seconds': round(total_wall, 3),
+        'rtf': round(total_wall / total_audio, 4) if total_audio else None,
+        'tokens_per_second': round(total_tokens / total_wall, 2) if total_wall else None,
+        # Length-weighted so long clips count more than short ones
+        'wer': round(sum(item['wer'] * item['audio_seconds'] for item in scored) / sum(item['audio_seconds'] for item in scored), 4) if scored else None,
+        'cer': round(sum(item['cer'] * item['audio_seconds'] for item in scored) / sum(item['audio_seconds'] for item in scored), 4) if scored else None,
+        'peak_rss': peaks['peak_rss'],
+        'files': files
+    }
+
+def print_table(rows):
+    print(f"\n{'model':<28} {'chunk':>5} {'beams':>5} {'batch':>5} {'thr':>4} {'RTF':>8} {'tok/s':>8} {'WER':>7} {'CER':>7} {'RSS MB':>8}")
+    print("-" * 98)
+    for row in rows:
+        wer = f"{row['wer']:.3f}" if row['wer'] is not None else '-'
+        cer = f"{row['cer']:.3f}" if row['cer'] is not None else '-'
+        print(f"{row['model'][:28]:<28} {row['chunk_seconds']:>5g} {row['num_beams']:>5} {row['batch_size']:>5} {row['threads']:>4} "
+              f"{row['rtf']:>8.4f} {row['tokens_per_second']:>8.1f} {wer:>7} {cer:>7} {row['peak_rss'] / 1024 / 1024:>8.0f}")
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description="STT benchmark sweep (model x chunk x beams x batch x threads)")
+    parser.add_argument('--corpus', default='benchmark_corpus/stt', help="Directory of audio files + same-stem .txt references")
+    parser.add_argument('--models', default='base', help="STT_MODELS keys, e.g. base,small,medium,large,biodatlab-medium")
+    parser.add_argument('--chunk-seconds', default='30', help="Chunk lengths to try (Whisper's window is 30s)")
+    parser.add_argument('--beams', default='1,5')
+    parser.add_argument('--batch-sizes', default='1,4')
+    parser.add_argument('--threads', default=str(torch.get_num_threads()))
+    parser.add_argument('--source-lang', default='auto')
+    parser.add_argument('--output', help="Result JSON path (default benchmark_results/stt_<time>.json)")
+    args = parser.parse_args()
+    
+    print("🚀 เริ่ม STT Benchmark")
+    print("=" * 50)
+    
+    if not Path(args.corpus).is_dir():
+        print(f"❌ ไม่พบโฟลเดอร์ corpus: {args.corpus} (ใส่ไฟล์เสียงและ transcript .txt ชื่อเดียวกัน)")
+        return 1
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"❌ ไม่พบไฟล์เสียงใน {args.corpus}")
+        return 1
+    
+    processor = VideoProcessor()
+    audio_cache = {item['path']: processor._load_audio_with_fallback(item['path']) for item in corpus}
+    total_audio = sum(len(audio) / sr for audio, sr in audio_cache.values())
+    print(f"📁 Corpus: {len(corpus)} ไฟล์, {total_audio:.1f} วินาที, "
+          f"{sum(1 for item in corpus if item['reference'])} ไฟล์มี transcript อ้างอิง")
+    
+    rows = []
+    model_loads = {}
+    sweep = list(itertools.product(parse_list(args.chunk_seconds, float), parse_list(args.beams, int),
+                                   parse_list(args.batch_sizes, int), parse_list(args.threads, int)))
+    for model_name in parse_list(args.models, str):
+        load_start = time.perf_counter()
+        try:
+            processor._ensure_whisper_model(model_name)
+        except Exception as e:
+            print(f"❌ โหลดโมเดล {model_name} ไม่สำเร็จ: {e}")
+            continue
+        if processor.current_model_name != model_name:
+            # _ensure_whisper_model fell back to base after a timeout; those numbers would be mislabelled
+            print(f"⚠️  {model_name} โหลดไม่ทัน ได้ {processor.current_model_name} แทน - ข้าม")
+            continue
+        model_loads[model_name] = round(time.perf_counter() - load_start, 2)
+        print(f"🤖 {model_name} โหลดใน {model_loads[model_name]:.1f}s")
+        
+        # Warm-up so the first configuration doesn't pay for lazy initialisation
+        first_audio, first_sr = audio_cache[corpus[0]['path']]
+        processor.transcribe_chunk_batch([first_audio[:first_sr * 5]], first_sr, args.source_lang, 1)
+        
+        for chunk_seconds, num_beams, batch_size, threads in sweep:
+            print(f"⏱️  {model_name}: chunk={chunk_seconds:g}s beams={num_beams} batch={batch_size} threads={threads}")
+            try:
+                row = run_config(processor, corpus, audio_cache, args.source_lang, chunk_seconds, batch_size, num_beams, threads)
+            except Exception as e:
+                print(f"❌ ล้มเหลว: {e}")
+                continue
+            row['model'] = model_name
+            rows.append(row)
+        
+        # Free the model before loading the next one (the registry holds the shared copy)
+        model_registry.evict(model_registry.key('stt', model_name))
+        processor.whisper_model = None
+        processor.whisper_processor = None
+        processor._cleanup_memory()
+    
+    if not rows:
+        print("❌ ไม่มีผลลัพธ์")
+        return 1
+    
+    print_table(rows)
+    
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"stt_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'host': {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+                     'cuda': torch.cuda.is_available()},
+            'corpus': {'path': args.corpus, 'files': len(corpus), 'audio_seconds': round(total_audio, 2)},
+            'model_load_seconds': model_loads,
+            'results': rows
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 บันทึกผล: {output_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Translation / TTS text-path micro-benchmarks
+เบนช์มาร์กย่อยของการแบ่งข้อความ การแปล และ TTS
+
+Runs TranslationService._split_text_for_translation, _combine_translations,
+TTSService._split_text_for_tts, NLLB generation and the TTS engines over Thai, Lao,
+English and Chinese corpora of increasing size, and reports chars/s, sentences/s and
+the scaling exponent (slope of log time vs. log size: ~1 linear, ~2 quadratic).
+
+gTTS and Edge TTS talk to local stub servers by default (latency and payload size are
+configurable), so the numbers show the client-side cost and request pattern - e.g.
+gTTS sends one request per ~100 characters - rather than internet variance.
+
+Examples:
+    python benchmark_text.py
+    python benchmark_text.py --sizes 1000,10000,100000 --langs th,zh --engines gtts,edge
+    python benchmark_text.py --nllb nllb-200-distilled --nllb-sizes 200,1000,4000
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import base64
+import struct
+import hashlib
+import argparse
+import platform
+import statistics
+import threading
+import http.server
+import urllib.parse
+from datetime import datetime
+from pathlib import Path
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import TEMP_DIR
+from services import TranslationService, TTSService
+
+RESULTS_DIR = Path("benchmark_results")
+
+# Seed sentences per language; joined without/with terminators the way STT output looks
+CORPUS_SEEDS = {
+    'th': [
+        "วันนี้เราจะมาเรียนรู้วิธีแปลวิดีโอด้วยปัญญาประดิษฐ์",
+        "ระบบจะถอดเสียงพูดเป็นข้อความก่อน",
+        "จากนั้นข้อความจะถูกแปลเป็นภาษาเป้าหมาย",
+        "สุดท้ายระบบจะสร้างเสียงพากย์ใหม่ให้ตรงกับเวลาเดิม",
+        "ผู้ชมสามารถเลือกเสียงผู้หญิงหรือผู้ชายได้",
+        "คุณภาพของผลลัพธ์ขึ้นอยู่กับความชัดเจนของเสียงต้นฉบับ"
+    ],
+    'lo': [
+        "ມື້ນີ້ພວກເຮົາຈະມາຮຽນຮູ້ວິທີແປວິດີໂອ",
+        "ລະບົບຈະຖອດສຽງເວົ້າເປັນຂໍ້ຄວາມກ່ອນ",
+        "ຈາກນັ້ນຂໍ້ຄວາມຈະຖືກແປເປັນພາສາເປົ້າໝາຍ",
+        "ສຸດທ້າຍລະບົບຈະສ້າງສຽງພາກໃໝ່",
+        "ຜູ້ຊົມສາມາດເລືອກສຽງຜູ້ຍິງຫຼືຜູ້ຊາຍໄດ້",
+        "ຄຸນນະພາບຂອງຜົນລັບຂຶ້ນກັບຄວາມຊັດເຈນຂອງສຽງຕົ້ນສະບັບ"
+    ],
+    'en': [
+        "Today we are going to learn how to translate a video with artificial intelligence.",
+        "The system first transcribes the speech into text.",
+        "Then the text is translated into the target language.",
+        "Finally a new voice-over is generated to match the original timing.",
+        "Viewers can choose a female or a male voice.",
+        "The quality of the result depends on how clear the original audio is."
+    ],
+    'zh': [
+        "今天我们来学习如何用人工智能翻译视频。",
+        "系统首先把语音转写成文字。",
+        "然后把文字翻译成目标语言。",
+        "最后生成新的配音并与原来的时间对齐。",
+        "观众可以选择女声或男声。",
+        "结果的质量取决于原始音频是否清晰。"
+    ]
+}
+SENTENCE_JOINERS = {'th': ' ', 'lo': ' ', 'en': ' ', 'zh': ''}
+
+def build_corpus(lang, size):
+    """สร้างข้อความยาวประมาณ size ตัวอักษร คืนค่า (text, จำนวนประโยค)"""
+    seeds = CORPUS_SEEDS[lang]
+    joiner = SENTENCE_JOINERS[lang]
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = seeds[len(sentences) % len(seeds)]
+        sentences.append(sentence)
+        length += len(sentence) + len(joiner)
+    return joiner.join(sentences), len(sentences)
+
+# ---------------------------------------------------------------------------
+# Local stand-ins for the gTTS and Edge TTS services
+# ---------------------------------------------------------------------------
+
+# ~48 kbit/s MP3 at ~14 characters of speech per second
+MP3_BYTES_PER_CHAR = 430
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class GTTSStubHandler(http.server.BaseHTTPRequestHandler):
+    """Answers gTTS batchexecute POSTs with a correctly framed (filler) audio payload"""
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        rpc = json.loads(urllib.parse.unquote(body.split('f.req=', 1)[1].rstrip('&')))
+        text = json.loads(rpc[0][0][1])[0]
+        time.sleep(self.server.latency)
+        
+        audio = base64.b64encode(b'\xff\xf3' * (len(text) * MP3_BYTES_PER_CHAR // 2)).decode('ascii')
+        payload = f')]}}\'\n\n[["wrb.fr","jQ1olc","[\\"{audio}\\"]",null,null,null,"generic"]]\n'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        pass
+
+class EdgeTTSStubHandler(http.server.BaseHTTPRequestHandler):
+    """Minimal websocket server speaking the Edge read-aloud protocol (turn.start, audio, turn.end)"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        accept = base64.b64encode(hashlib.sha1((self.headers['Sec-WebSocket-Key'] + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+        
+        while True:
+            opcode, payload = self._read_frame()
+            if opcode is None or opcode == 0x8:
+                self._send_frame(0x8, b'')
+                return
+            if opcode == 0x1 and b'Path:ssml' in payload:
+                self._synthesize(payload.decode('utf-8'))
+    
+    def _synthesize(self, ssml_message):
+        ssml = ssml_message.split('\r\n\r\n', 1)[1]
+        text = ssml[ssml.find('>', ssml.find('<prosody')) + 1:ssml.find('</prosody>')]
+        time.sleep(self.server.latency)
+        
+        self._send_frame(0x1, b'X-RequestId:stub\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.start\r\n\r\n{}')
+        headers = b'X-RequestId:stub\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n'
+        remaining = max(1, len(text)) * MP3_BYTES_PER_CHAR
+        while remaining > 0:
+            chunk = min(remaining, 4096)  # roughly the service's frame size
+            self._send_frame(0x2, struct.pack('>H', len(headers)) + headers + b'\xff\xf3' * (chunk // 2) + b'\x00' * (chunk % 2))
+            remaining -= chunk
+        self._send_frame(0x1, b'X-RequestId:stub\r\nPath:turn.end\r\n\r\n{}')
+    
+    def _read_frame(self):
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            return None, None
+        length = head[1] & 0x7f
+        if length == 126:
+            length = struct.unpack('>H', self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else None
+        payload = self.rfile.read(length)
+        if mask:
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        return head[0] & 0x0f, payload
+    
+    def _send_frame(self, opcode, payload):
+        if len(payload) < 126:
+            header = struct.pack('>BB', 0x80 | opcode, len(payload))
+        elif len(payload) < 65536:
+            header = struct.pack('>BBH', 0x80 | opcode, 126, len(payload))
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, 127, len(payload))
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(handler, latency):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, f"127.0.0.1:{server.server_address[1]}"
+
+def install_tts_stub_servers(latency):
+    """ชี้ gTTS และ Edge TTS ไปที่ stub server ในเครื่อง"""
+    import gtts.tts
+    import edge_tts.communicate
+    
+    # The stand-ins are plain http/ws on localhost; don't send them through a proxy
+    for name in ('http_proxy', 'HTTP_PROXY'):
+        os.environ.pop(name, None)
+    
+    gtts_server, gtts_address = start_stub_server(GTTSStubHandler, latency)
+    edge_server, edge_address = start_stub_server(EdgeTTSStubHandler, latency)
+    gtts.tts._translate_url = lambda tld='com', path='': f"http://{gtts_address}/{path}"
+    edge_tts.communicate.WSS_URL = f"ws://{edge_address}/edge/v1?TrustedClientToken=stub"
+    print(f"🧪 Stub servers: gTTS http://{gtts_address}, Edge ws://{edge_address} (latency {latency * 1000:.0f}ms)")
+    return [gtts_server, edge_server]
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def time_call(fn, min_time, max_calls):
+    """Call fn repeatedly until min_time has passed; returns (median, best, calls, last result)"""
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while True:
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        if time.perf_counter() >= deadline or len(timings) >= max_calls:
+            return statistics.median(timings), min(timings), len(timings), result
+
+def scaling_exponent(points):
+    """Least-squares slope of log(seconds) against log(chars)"""
+    points = [(math.log(chars), math.log(seconds)) for chars, seconds in points if chars > 0 and seconds > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if denominator == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator, 2)
+
+def make_row(name, lang, text, sentences, seconds, best, calls, extra=None):
+    row = {
+        'benchmark': name,
+        'lang': lang,
+        'chars': len(text),
+        'sentences': sentences,
+        'seconds': seconds,
+        'best_seconds': best,
+        'calls': calls,
+        'chars_per_second': round(len(text) / seconds, 1) if seconds > 0 else None,
+        'sentences_per_second': round(sentences / seconds, 2) if seconds > 0 else None
+    }
+    row.update(extra or {})
+    return row
+
+def bench_text_functions(translation_service, tts_service, lang, sizes, min_time):
+    """ฟังก์ชันแบ่ง/รวมข้อความ (CPU ล้วน)"""
+    rows = []
+    for size in sizes:
+        text, sentences = build_corpus(lang, size)
+        
+        seconds, best, calls, chunks = time_call(lambda: translation_service._split_text_for_translation(text), min_time, 10000)
+        rows.append(make_row('split_text_for_translation', lang, text, sentences, seconds, best, calls,
+                             {'chunks': len(chunks), 'max_chunk_chars': max(len(chunk) for chunk in chunks)}))
+        
+        seconds, best, calls, _ = time_call(lambda: translation_service._combine_translations(chunks), min_time, 10000)
+        rows.append(make_row('combine_translations', lang, text, sentences, seconds, best, calls, {'chunks': len(chunks)}))
+        
+        seconds, best, calls, tts_chunks = time_call(lambda: tts_service._split_text_for_tts(text), min_time, 10000)
+        rows.append(make_row('split_text_for_tts', lang, text, sentences, seconds, best, calls,
+                             {'chunks': len(tts_chunks), 'max_chunk_chars': max(len(chunk) for chunk in tts_chunks)}))
+    return rows
+
+def bench_nllb(translation_service, model_name, lang, sizes, target_lang):
+    """NLLB generation ผ่าน TranslationService.translate (รวมการแบ่ง chunk สำหรับข้อความยาว)"""
+    rows = []
+    translation_service._load_translation_model(model_name)
+    for size in sizes:
+        text, sentences = build_corpus(lang, size)
+        seconds, best, calls, translation = time_call(
+            lambda: translation_service.translate(text, lang, target_lang, model_name), 0, 1
+        )
+        rows.append(make_row(f"nllb:{model_name}", lang, text, sentences, seconds, best, calls,
+                             {'target_lang': target_lang, 'output_chars': len(translation)}))
+    return rows
+
+TTS_ENGINES = {
+    'gtts': '_synthesize_with_gtts',
+    'edge': '_synthesize_with_edge',
+    'espeak': '_synthesize_with_espeak'
+}
+
+def bench_tts(tts_service, engine, lang, sizes):
+    """สังเคราะห์เสียงทั้งข้อความด้วย engine เดียว (ไม่มี fallback)"""
+    rows = []
+    method = getattr(tts_service, TTS_ENGINES[engine])
+    output_path = str(TEMP_DIR / f"benchmark_tts_{engine}_{lang}.mp3")
+    for size in sizes:
+        text, sentences = build_corpus(lang, size)
+        seconds, best, calls, result = time_call(lambda: method(text, lang, output_path), 0, 1)
+        if not result or not os.path.exists(result):
+            raise Exception(f"{engine} produced no audio")
+        rows.append(make_row(f"tts:{engine}", lang, text, sentences, seconds, best, calls,
+                             {'output_bytes': os.path.getsize(result)}))
+        os.remove(result)
+    return rows
+
+def print_table(rows, exponents):
+    print(f"\n{'benchmark':<28} {'lang':<4} {'chars':>8} {'sent':>6} {'ms/call':>10} {'chars/s':>12} {'sent/s':>10} {'chunks':>6} {'max chunk':>9}")
+    print("-" * 103)
+    for row in rows:
+        print(f"{row['benchmark'][:28]:<28} {row['lang']:<4} {row['chars']:>8} {row['sentences']:>6} {row['seconds'] * 1000:>10.3f} "
+              f"{row['chars_per_second'] or 0:>12.0f} {row['sentences_per_second'] or 0:>10.1f} "
+              f"{row.get('chunks', ''):>6} {row.get('max_chunk_chars', ''):>9}")
+    
+    print(f"\n📈 Scaling exponent (time ∝ chars^k):")
+    for (name, lang), exponent in sorted(exponents.items()):
+        note = '' if exponent is None else (' ⚠️  superlinear' if exponent > 1.3 else '')
+        print(f"   {name:<28} {lang:<4} k = {exponent if exponent is not None else '-'}{note}")
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description="Translation/TTS text-path micro-benchmarks (th/lo/en/zh)")
+    parser.add_argument('--langs', default='th,lo,en,zh')
+    parser.add_argument('--sizes', default='500,2000,8000,32000,128000', help="Corpus sizes (chars) for split/combine")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds to repeat each CPU-only measurement")
+    parser.add_argument('--engines', default='gtts,edge', help=f"TTS engines: {', '.join(TTS_ENGINES)} (empty to skip)")
+    parser.add_argument('--tts-sizes', default='200,1000,4000')
+    parser.add_argument('--stub-latency', type=float, default=0.05, help="Stub gTTS/Edge server response delay (s)")
+    parser.add_argument('--live-tts', action='store_true', help="Use the real gTTS/Edge services instead of local stubs")
+    parser.add_argument('--nllb', help="Translation model key to benchmark generation with (e.g. nllb-200-distilled)")
+    parser.add_argument('--nllb-sizes', default='200,1000,4000')
+    parser.add_argument('--output', help="Result JSON path (default benchmark_results/text_<time>.json)")
+    args = parser.parse_args()
+    
+    print("🚀 เริ่ม Text Benchmark (Translation / TTS)")
+    print("=" * 50)
+    
+    langs = parse_list(args.langs, str)
+    unknown = [lang for lang in langs if lang not in CORPUS_SEEDS]
+    if unknown:
+        print(f"❌ ไม่มี corpus สำหรับภาษา: {', '.join(unknown)}")
+        return 1
+    engines = parse_list(args.engines, str)
+    unknown = [engine for engine in engines if engine not in TTS_ENGINES]
+    if unknown:
+        print(f"❌ ไม่รู้จัก TTS engine: {', '.join(unknown)}")
+        return 1
+    
+    translation_service = TranslationService()
+    tts_service = TTSService()
+    stub_servers = install_tts_stub_servers(args.stub_latency) if engines and not args.live_tts else []
+    
+    rows = []
+    for lang in langs:
+        print(f"⏱️  split/combine: {lang}")
+        rows.extend(bench_text_functions(translation_service, tts_service, lang, parse_list(args.sizes, int), args.min_time))
+        
+        if args.nllb:
+            target_lang = 'th' if lang == 'en' else 'en'
+            print(f"⏱️  {args.nllb}: {lang} -> {target_lang}")
+            try:
+                rows.extend(bench_nllb(translation_service, args.nllb, lang, parse_list(args.nllb_sizes, int), target_lang))
+            except Exception as e:
+                print(f"❌ NLLB ล้มเหลว: {e}")
+        
+        for engine in engines:
+            print(f"⏱️  tts:{engine}: {lang}")
+            try:
+                rows.extend(bench_tts(tts_service, engine, lang, parse_list(args.tts_sizes, int)))
+            except Exception as e:
+                print(f"❌ {engine} ล้มเหลว: {e}")
+    
+    for server in stub_servers:
+        server.shutdown()
+    
+    series = {}
+    for row in rows:
+        series.setdefault((row['benchmark'], row['lang']), []).append((row['chars'], row['seconds']))
+    exponents = {key: scaling_exponent(points) for key, points in series.items()}
+    print_table(rows, exponents)
+    
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"text_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'host': {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+            'tts_backend': 'live' if args.live_tts else {'stub_latency': args.stub_latency, 'mp3_bytes_per_char': MP3_BYTES_PER_CHAR},
+            'results': rows,
+            'scaling': [{'benchmark': name, 'lang': lang, 'exponent': exponent} for (name, lang), exponent in sorted(exponents.items())]
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 บันทึกผล: {output_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,6 +35,37 @@ PROGRESS_UPDATE_INTERVAL = 1
 PROGRESS_BAR_COLOR = "#28a745"
 PROGRESS_BAR_HEIGHT = "20px"
 
+# System Metrics Sampler Configuration
+METRICS_SAMPLE_INTERVAL = 5  # Seconds between background samples
+METRICS_HISTORY_SIZE = 720  # Samples kept in the ring buffer (1 hour at 5s)
+
+# Prometheus Metrics Configuration
+METRICS_STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)  # Seconds
+METRICS_RTF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 5)  # Processing time / audio duration
+
+# Job Tracing Configuration (nested spans written as JSON lines)
+TRACE_FILE = LOGS_DIR / "traces.jsonl"
+TRACE_FILE_MAX_BYTES = 20 * 1024 * 1024  # Rotate after 20MB
+TRACE_FILE_BACKUPS = 5  # traces.jsonl.1 ... traces.jsonl.5
+TRACE_MEMORY_JOBS = 50  # Recent job traces kept in memory for the waterfall endpoint
+TRACE_MAX_SPANS_PER_JOB = 5000  # Further spans still go to the file but not to memory
+
+# On-demand Sampling Profiler Configuration
+PROFILES_DIR = LOGS_DIR / "profiles"  # Collapsed stacks (flamegraph.pl / speedscope input)
+PROFILER_SAMPLE_INTERVAL = 0.01  # Seconds between stack samples (~100 Hz)
+PROFILER_MAX_DEPTH = 128  # Deeper stacks are truncated at the outermost frames
+
+# Per-job Resource Accounting Configuration
+RESOURCE_SUBPROCESS_POLL_INTERVAL = 0.1  # Seconds between psutil samples of a running ffmpeg/sox process
+
+# Progress Stream Configuration (Server-Sent Events)
+PROGRESS_STREAM_HEARTBEAT = 15  # Seconds between keep-alive comments on idle streams
+PROGRESS_STREAM_MAX_PENDING = 32  # Events buffered per subscriber before the oldest is dropped
+# Each open SSE stream holds one server thread (threaded werkzeug); over these caps clients get 429 and poll /api/status
+PROGRESS_STREAM_MAX_PER_JOB = 10
+PROGRESS_STREAM_MAX_TOTAL = 100
+PROGRESS_TERMINAL_STATES = ('completed', 'error', 'stopped')
+
 # Language Configuration
 SUPPORTED_LANGUAGES = {
     'auto': 'อัตโนมัติ',
@@ -99,6 +130,12 @@ VOICE_MODES = {
     'sing': 'ร้องเพลง'
 }
 
+# Output Modes
+OUTPUT_MODES = {
+    'dub': 'พากย์เสียง (TTS + ผสมเสียง)',
+    'subtitles': 'ซับไตเติล (SRT/WebVTT ไม่ต้อง TTS)'
+}
+
 # Model Configuration
 STT_MODELS = {
     # OpenAI Whisper Models (แนะนำ)
@@ -122,6 +159,25 @@ TTS_MODELS = {
     'edge': 'Microsoft Edge TTS'
 }
 
+# Model Storage Configuration
+# Downloaded checkpoints are converted to safetensors (prepare_models.py) and loaded memory-mapped,
+# so worker processes on one host share a single page-cache copy of the weights
+MODEL_SAFETENSORS_MAX_SHARD_SIZE = '2GB'  # Shard size when converting pickle checkpoints
+MODEL_MMAP_LOAD = True  # low_cpu_mem_usage loading: CPU weights stay views of the mmapped file (needs accelerate)
+
+# Model Download Configuration
+# Endpoint with the Hugging Face layout (/api/models/<repo>/revision/<rev>, /<repo>/resolve/<sha>/<file>):
+# the Hub, an HTTP stand-in, or a file:// mirror directory laid out the same way
+MODEL_DOWNLOAD_ENDPOINT = os.environ.get('HF_ENDPOINT', 'https://huggingface.co').rstrip('/')
+MODEL_DOWNLOAD_TOKEN = os.environ.get('HF_TOKEN')  # Only needed for gated/private repos
+MODEL_DOWNLOAD_REVISION = 'main'
+MODEL_DOWNLOAD_WORKERS = 4  # Files fetched in parallel per model
+MODEL_DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB reads per request
+MODEL_DOWNLOAD_TIMEOUT = 60  # Seconds without data before a request is retried
+MODEL_DOWNLOAD_RETRIES = 5  # Attempts per file; each retry resumes from the bytes already on disk
+MODEL_DOWNLOAD_SKIP_PATTERNS = ['*.h5', '*.msgpack', '*.ot', 'flax_model*', 'tf_model*', 'rust_model*', '*.onnx', 'onnx/*']  # Other frameworks
+MODEL_COMPLETE_MARKER = '.download_complete.json'  # Written last; a model directory without it is incomplete
+
 # Video Speed options
 VIDEO_SPEED_OPTIONS = {
     '1.0': 'ปกติ (1x)',
@@ -137,6 +193,13 @@ YOUTUBE_PATTERNS = [
     r'(?:https?://)?(?:www\.)?youtube\.com/v/'
 ]
 
+# YouTube Download Configuration
+YOUTUBE_AUDIO_FORMAT = 'bestaudio[ext=m4a]/bestaudio/best'  # Audio-only stream (no video bytes)
+YOUTUBE_VIDEO_FORMAT = 'bestvideo[ext=mp4]/bestvideo'  # Video-only stream, muxed with the audio afterwards
+YOUTUBE_CONCURRENT_FRAGMENTS = 4  # yt-dlp fragments downloaded in parallel per stream
+YOUTUBE_CACHE_DIR = Path("cache") / "youtube"  # Shared downloads keyed by (video id, format)
+YOUTUBE_CACHE_MAX_BYTES = 20 * 1024 * 1024 * 1024  # 20GB disk quota, least recently used evicted first
+
 # Processing Configuration
 AUDIO_SAMPLE_RATE = 16000
 AUDIO_CHANNELS = 1
@@ -296,9 +359,75 @@ ENABLE_TTS_SYNC = True
 TTS_SILENCE_PADDING = 0.1  # seconds
 TTS_MIN_SEGMENT_DURATION = 0.5  # seconds
 
+# Webhook and Batch Configuration
+WEBHOOK_TIMEOUT = 10  # Seconds per delivery attempt
+WEBHOOK_WORKERS = 8  # Webhook deliveries in flight at once
+WEBHOOK_MAX_ATTEMPTS = 6  # Total attempts before a callback is dropped
+WEBHOOK_BACKOFF_BASE = 2  # Seconds before the first retry, doubled on each attempt
+WEBHOOK_BACKOFF_MAX = 300  # Upper bound on the delay between retries
+BATCH_MAX_ITEMS = 100  # Videos accepted per batch submission
+
+# Result Deduplication Configuration
+ENABLE_RESULT_DEDUP = True  # Reuse results for identical input + parameters
+RESULT_DEDUP_RETENTION = 24 * 60 * 60  # Seconds a finished result stays reusable
+RESULT_DEDUP_PARAM_KEYS = [
+    'output_mode', 'source_lang', 'target_lang', 'stt_model', 'translation_model', 'translation_mode',
+    'tts_model', 'voice_mode', 'video_speed', 'custom_coqui_model', 'format_id',
+    'enable_preprocessing', 'enable_noise_reduction', 'enable_vad', 'enable_tts_sync',
+    'enable_vocal_removal', 'enable_instrumental_mixing', 'sync_original_audio',
+    'enable_step1_video_processing', 'enable_step2_vocal_removal', 'enable_step3_stt',
+    'enable_step4_translation', 'enable_step5_tts', 'enable_step6_audio_mixing', 'enable_step7_video_merge'
+]
+
+# Subtitle Output Configuration
+SUBTITLE_TRANSLATION_BATCH_SIZE = 8  # Segments translated per generate() call in subtitle mode
+
+# Media Serving Configuration (outputs and TTS audio)
+MEDIA_HASH_CHUNK_SIZE = 1024 * 1024  # 1MB blocks when hashing files for strong ETags
+MEDIA_HASH_SUFFIX = '.sha256'  # Sidecar written next to a finished output with its content hash
+MEDIA_SENDFILE_MODE = None  # None (serve from Flask), 'x-sendfile' (Apache/lighttpd) or 'x-accel' (nginx)
+MEDIA_X_ACCEL_PREFIX = '/protected-media/'  # Base of the nginx internal locations below
+# Served directory -> nginx `internal` location that aliases it; files elsewhere are served by Flask
+MEDIA_X_ACCEL_LOCATIONS = {
+    OUTPUTS_DIR: MEDIA_X_ACCEL_PREFIX + 'outputs/',
+    PREVIEWS_DIR: MEDIA_X_ACCEL_PREFIX + 'previews/',
+    AUDIOS_DIR: MEDIA_X_ACCEL_PREFIX + 'audios/',
+    TEMP_DIR: MEDIA_X_ACCEL_PREFIX + 'temp/'
+}
+TTS_PREVIEW_FORMAT = 'opus'  # None = serve original WAV, 'opus', 'aac' or 'mp3' = transcode once and cache
+TTS_PREVIEW_BITRATE = '48k'
+TTS_PREVIEW_MAX_AGE = 24 * 60 * 60  # Seconds a transcoded preview is kept in previews/ before it is removed
+
+# Model Preload / Warm-up Configuration
+# Loaded in the background at startup and run once on a short input; /api/ready answers 503 until all are warm
+# Entries are "<kind>:<name>" with kind stt, translation or tts, e.g.
+# PRELOAD_MODELS="stt:base,translation:nllb-200-distilled,tts:edge"
+PRELOAD_MODELS = [item.strip() for item in os.environ.get('PRELOAD_MODELS', '').split(',') if item.strip()]
+PRELOAD_WARMUP = os.environ.get('PRELOAD_WARMUP', 'true').lower() == 'true'  # false = load only, no warm-up inference
+PRELOAD_WARMUP_TEXT = "Hello, this is a short warm-up sentence."
+PRELOAD_WARMUP_TARGET_LANG = 'th'  # Translation (en -> this) and TTS language used for the warm-up
+
+# Model Prefetch Configuration (look ahead in the job queue while earlier jobs run)
+PREFETCH_LOOKAHEAD = 3  # Queued jobs whose models are prepared ahead of time
+PREFETCH_FULL_LOAD = True  # Load the model into memory when it fits, otherwise only warm the page cache
+PREFETCH_MEMORY_RESERVE = 4 * 1024 * 1024 * 1024  # Available memory that must remain after a full prefetch load
+PREFETCH_READ_BLOCK = 8 * 1024 * 1024  # Read size when pulling weight files into the page cache
+
 # Logging Configuration
-LOG_LEVEL = 'INFO'
-LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Records are queued by the calling thread and written by a background listener thread
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')  # DEBUG brings back the per-chunk/per-segment diagnostics
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [task=%(task_id)s stage=%(stage)s chunk=%(chunk)s] %(message)s'
+LOG_JSON = os.environ.get('LOG_JSON', 'false').lower() == 'true'  # One JSON object per line instead of LOG_FORMAT
+LOG_FILE = LOGS_DIR / "videotranslat.log"
+LOG_FILE_MAX_BYTES = 50 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+LOG_QUEUE_SIZE = 10000  # Records beyond this are dropped (and counted) rather than blocking workers
+# Per-module overrides of LOG_LEVEL, e.g. LOG_MODULE_LEVELS="stt=DEBUG,tts=WARNING"
+# Modules: queue, download, video, stt, translation, tts, uvr, models, metrics
+LOG_MODULE_LEVELS = {
+    f"videotranslat.{name.strip()}": level.strip().upper()
+    for name, level in (item.split('=', 1) for item in os.environ.get('LOG_MODULE_LEVELS', '').split(',') if '=' in item)
+}
 
 def generate_output_filename(original_filename, task_id=None):
     """สร้างชื่อไฟล์ผลลัพธ์"""
@@ -317,6 +446,9 @@ def cleanup_temp_files(file_paths):
             if os.path.exists(file_path):
                 os.remove(file_path)
                 print(f"🗑️  ลบไฟล์ชั่วคราว: {file_path}")
+            # Content-hash sidecar of a served output (see record_content_hash)
+            if os.path.exists(f"{file_path}{MEDIA_HASH_SUFFIX}"):
+                os.remove(f"{file_path}{MEDIA_HASH_SUFFIX}")
         except Exception as e:
             print(f"⚠️  ไม่สามารถลบไฟล์ {file_path}: {e}")
 
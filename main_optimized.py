@@ -4,7 +4,10 @@ Video Translator Application - Optimized Main Entry Point
 """
 
 import os
+import sys
 import json
+import hashlib
+import mimetypes
 import uuid
 import re
 import subprocess
@@ -12,11 +15,12 @@ import tempfile
 import warnings
 import threading
 import gc
-import psutil
+import queue
 import time
+import logging
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, Response, request, jsonify, render_template, send_file
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
@@ -26,12 +30,13 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 
 # Import configuration and services
 from config import *
-from services import VideoProcessor, TranslationService, TTSService, JobQueue, AdvancedSubtitleService
+from services import VideoProcessor, TranslationService, TTSService, JobQueue, AdvancedSubtitleService, SystemMetricsSampler, ModelPreloader, pipeline_metrics, tracer, resource_tracker, read_content_hash, record_content_hash, run_subprocess
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='static')
 app.config['SECRET_KEY'] = FLASK_SECRET_KEY
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+app.use_x_sendfile = MEDIA_SENDFILE_MODE == 'x-sendfile'
 
 # Initialize CORS
 CORS(app)
@@ -43,10 +48,32 @@ memory_monitor = None
 # Thread safety for global variables
 tasks_data_lock = threading.Lock()
 memory_lock = threading.Lock()
+media_lock = threading.Lock()
+
+media_log = logging.getLogger('videotranslat.media')
+
+# One [lock, users] entry per TTS preview being transcoded so concurrent requests share the work
+media_transcode_locks = {}
+
+TTS_PREVIEW_CODECS = {
+    'opus': ('libopus', '.ogg', 'audio/ogg'),
+    'aac': ('aac', '.m4a', 'audio/mp4'),
+    'mp3': ('libmp3lame', '.mp3', 'audio/mpeg')
+}
 
 # Initialize job queue with memory monitoring
 job_queue = JobQueue(MAX_CONCURRENT_JOBS)
 
+# Background system metrics (handlers read the latest sample instead of calling psutil)
+metrics_sampler = SystemMetricsSampler(
+    worker_status_fn=job_queue.get_worker_status,
+    on_sample=lambda sample: resource_tracker.observe_rss(sample['process_rss'])
+)
+
+# Load and warm up PRELOAD_MODELS in the background; /api/ready reports when they are done
+model_preloader = ModelPreloader()
+model_preloader.start()
+
 # Task storage for step-by-step processing with cleanup
 tasks_data = {}
 
@@ -70,8 +97,9 @@ def cleanup_memory():
         
         with memory_lock:
             gc.collect()
-            import torch
-            if torch.cuda.is_available():
+            # torch is imported lazily by the models; nothing to free if no model has loaded it
+            torch = sys.modules.get('torch')
+            if torch is not None and torch.cuda.is_available():
                 torch.cuda.empty_cache()
             
             cleanup_memory.last_cleanup_time = current_time
@@ -90,24 +118,25 @@ def monitor_memory_usage():
         else:
             monitor_memory_usage.last_check_time = 0
         
-        memory = psutil.virtual_memory()
+        # Latest background sample - no psutil call on the request path
+        memory = metrics_sampler.latest()
         
         # เพิ่ม memory monitoring ที่ละเอียดขึ้น
-        if memory.percent > 95:  # Critical memory usage
-            print(f"🚨 Critical memory usage: {memory.percent}% - Forcing cleanup")
+        if memory['memory_percent'] > 95:  # Critical memory usage
+            print(f"🚨 Critical memory usage: {memory['memory_percent']}% - Forcing cleanup")
             cleanup_memory()
-        elif memory.percent > 90:  # High memory usage
-            print(f"⚠️ High memory usage: {memory.percent}% - Recommended cleanup")
+        elif memory['memory_percent'] > 90:  # High memory usage
+            print(f"⚠️ High memory usage: {memory['memory_percent']}% - Recommended cleanup")
             cleanup_memory()
-        elif memory.percent > 80:  # Moderate memory usage
-            print(f"📊 Memory usage: {memory.percent}% - Monitoring")
+        elif memory['memory_percent'] > 80:  # Moderate memory usage
+            print(f"📊 Memory usage: {memory['memory_percent']}% - Monitoring")
         
         # Log memory stats every 10 minutes
         if not hasattr(monitor_memory_usage, 'last_log_time'):
             monitor_memory_usage.last_log_time = 0
         
         if current_time - monitor_memory_usage.last_log_time > 600:  # 10 minutes
-            print(f"💾 Memory Stats - Used: {memory.percent}%, Available: {memory.available / (1024**3):.1f}GB")
+            print(f"💾 Memory Stats - Used: {memory['memory_percent']}%, Available: {memory['memory_available'] / (1024**3):.1f}GB")
             monitor_memory_usage.last_log_time = current_time
         
         monitor_memory_usage.last_check_time = current_time
@@ -156,6 +185,129 @@ def safe_remove_task_data(task_id):
         if task_id in tasks_data:
             del tasks_data[task_id]
 
+def save_upload_with_hash(file, file_path):
+    """Save an uploaded file and compute its SHA-256 in the same pass (input fingerprint for dedup)"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'wb') as f:
+        for block in iter(lambda: file.stream.read(MEDIA_HASH_CHUNK_SIZE), b''):
+            hasher.update(block)
+            f.write(block)
+    return hasher.hexdigest()
+
+def compute_file_etag(file_path):
+    """Strong ETag for a media file without reading it on the request thread
+    
+    Uses the content hash the job recorded when it wrote the file (record_content_hash);
+    files without one (e.g. written by an older version) get a size + mtime_ns tag.
+    """
+    content_hash = read_content_hash(file_path)
+    if content_hash:
+        return content_hash[:32]
+    stat = os.stat(file_path)
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+def x_accel_path(file_path):
+    """nginx internal URI for file_path via MEDIA_X_ACCEL_LOCATIONS, or None if no location covers it"""
+    resolved = Path(file_path).resolve()
+    for media_dir, location in MEDIA_X_ACCEL_LOCATIONS.items():
+        try:
+            return location + resolved.relative_to(Path(media_dir).resolve()).as_posix()
+        except ValueError:
+            continue
+    media_log.warning(f"⚠️ No X-Accel location for {file_path}, serving it from Flask")
+    return None
+
+def send_media_file(file_path, mimetype=None, as_attachment=False):
+    """Send a media file with Range, strong ETag and If-None-Match support
+    
+    When MEDIA_SENDFILE_MODE is set the body is offloaded to the reverse proxy
+    (X-Sendfile via Flask, X-Accel-Redirect for nginx) and only headers leave the worker.
+    """
+    etag = compute_file_etag(file_path)
+    mimetype = mimetype or mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+    
+    accel_path = x_accel_path(file_path) if MEDIA_SENDFILE_MODE == 'x-accel' else None
+    if accel_path:
+        response = app.response_class(mimetype=mimetype)
+        response.automatically_set_content_length = False
+        response.headers['X-Accel-Redirect'] = accel_path
+        response.headers['Accept-Ranges'] = 'bytes'
+        if as_attachment:
+            response.headers.set('Content-Disposition', 'attachment', filename=os.path.basename(file_path))
+        response.set_etag(etag)
+        response.last_modified = datetime.fromtimestamp(os.path.getmtime(file_path))
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    
+    # send_file handles Range/If-Range/If-None-Match (and X-Sendfile via app.use_x_sendfile)
+    return send_file(
+        file_path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        conditional=True,
+        etag=etag
+    )
+
+def get_tts_preview(tts_audio_path):
+    """Transcode TTS WAV to a compact streaming format on first request and cache it
+    
+    Returns (path, mimetype); falls back to the original WAV if transcoding is disabled or fails.
+    """
+    if TTS_PREVIEW_FORMAT not in TTS_PREVIEW_CODECS:
+        return tts_audio_path, 'audio/wav'
+    
+    codec, extension, preview_mimetype = TTS_PREVIEW_CODECS[TTS_PREVIEW_FORMAT]
+    preview_path = PREVIEWS_DIR / f"tts_{compute_file_etag(tts_audio_path)}{extension}"
+    if preview_path.exists():
+        return str(preview_path), preview_mimetype
+    
+    # The entry stays while any request holds or waits on it, so all of them share one ffmpeg run
+    with media_lock:
+        entry = media_transcode_locks.setdefault(str(preview_path), [threading.Lock(), 0])
+        entry[1] += 1
+    
+    try:
+        with entry[0]:
+            # Another request may have finished the transcode while we waited
+            if preview_path.exists():
+                return str(preview_path), preview_mimetype
+            
+            partial_path = preview_path.with_name(f"{preview_path.stem}.partial{extension}")
+            cmd = [
+                'ffmpeg', '-i', tts_audio_path,
+                '-vn', '-c:a', codec,
+                '-b:a', TTS_PREVIEW_BITRATE,
+                '-y', str(partial_path)
+            ]
+            result = run_subprocess(cmd, capture_output=True, text=True)
+            
+            if result.returncode == 0 and partial_path.exists():
+                os.replace(partial_path, preview_path)
+                media_log.info(f"🎧 TTS preview cached: {preview_path}")
+                prune_tts_previews()
+                return str(preview_path), preview_mimetype
+            
+            media_log.warning(f"⚠️ TTS preview transcode failed, serving WAV: {result.stderr[-200:]}")
+            if partial_path.exists():
+                partial_path.unlink()
+            return tts_audio_path, 'audio/wav'
+    finally:
+        with media_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                media_transcode_locks.pop(str(preview_path), None)
+
+def prune_tts_previews(max_age=TTS_PREVIEW_MAX_AGE):
+    """Remove transcoded TTS previews older than max_age (they are recreated on the next request)"""
+    cutoff = time.time() - max_age
+    for preview_path in PREVIEWS_DIR.glob('tts_*'):
+        try:
+            if preview_path.stat().st_mtime < cutoff:
+                preview_path.unlink()
+                media_log.debug(f"🗑️ Removed old TTS preview: {preview_path}")
+        except OSError:
+            continue
+
 # Flask Routes with memory optimization
 @app.route('/')
 def index():
@@ -214,6 +366,48 @@ def simple_test():
     return render_template('simple_test.html')
 
 # ===== YOUTUBE URL (REAL-TIME) MODE =====
+def build_youtube_task_data(data, video_url):
+    """Build queue task data for a YouTube URL from JSON request parameters"""
+    return {
+        'mode': 'youtube_realtime',
+        'video_url': video_url,
+        'video_input': video_url,
+        'source_lang': data.get('source_lang', 'auto'),
+        'target_lang': data.get('target_lang', 'th'),
+        'stt_model': data.get('stt_model', 'base'),
+        'translation_model': data.get('translation_model', 'nllb-200'),
+        'tts_model': data.get('tts_model', 'gtts'),
+        'voice_mode': data.get('voice_mode', 'female'),
+        'video_speed': data.get('video_speed', '1.0'),
+        'output_mode': data.get('output_mode', 'dub'),
+        'custom_coqui_model': data.get('custom_coqui_model', None),
+        # Advanced audio processing options
+        'enable_preprocessing': data.get('enable_preprocessing', True),
+        'enable_noise_reduction': data.get('enable_noise_reduction', True),
+        'enable_vad': data.get('enable_vad', True),
+        'enable_tts_sync': data.get('enable_tts_sync', True),
+        # Ultimate Vocal Remover options
+        'enable_vocal_removal': data.get('enable_vocal_removal', False),
+        'enable_instrumental_mixing': data.get('enable_instrumental_mixing', False),
+        'sync_original_audio': data.get('sync_original_audio', False),
+        # Processing steps control - ทุกขั้นตอน
+        'enable_step1_video_processing': data.get('enable_step1_video_processing', True),
+        'enable_step2_vocal_removal': data.get('enable_step2_vocal_removal', True),
+        'enable_step3_stt': data.get('enable_step3_stt', True),
+        'enable_step4_translation': data.get('enable_step4_translation', True),
+        'enable_step5_tts': data.get('enable_step5_tts', True),
+        'enable_step6_audio_mixing': data.get('enable_step6_audio_mixing', True),
+        'enable_step7_video_merge': data.get('enable_step7_video_merge', True),
+        'force_reprocess': data.get('force_reprocess', False),
+        'profile': data.get('profile', False),
+        'webhook_url': data.get('webhook_url'),
+        # Unlimited processing flags
+        'unlimited_mode': True,
+        'unlimited_audio_length': True,
+        'unlimited_file_size': True,
+        'unlimited_processing_time': True
+    }
+
 @app.route('/api/youtube/realtime', methods=['POST'])
 def youtube_realtime():
     """Process YouTube URL in real-time mode with memory optimization"""
@@ -250,40 +444,7 @@ def youtube_realtime():
         task_id = str(uuid.uuid4())
         print(f"🆔 Generated task ID: {task_id}")
         
-        task_data = {
-            'mode': 'youtube_realtime',
-            'video_url': video_url,
-            'source_lang': data.get('source_lang', 'auto'),
-            'target_lang': data.get('target_lang', 'th'),
-            'stt_model': data.get('stt_model', 'base'),
-            'translation_model': data.get('translation_model', 'nllb-200'),
-            'tts_model': data.get('tts_model', 'gtts'),
-            'voice_mode': data.get('voice_mode', 'female'),
-            'video_speed': data.get('video_speed', '1.0'),
-            'custom_coqui_model': data.get('custom_coqui_model', None),
-            # Advanced audio processing options
-            'enable_preprocessing': data.get('enable_preprocessing', True),
-            'enable_noise_reduction': data.get('enable_noise_reduction', True),
-            'enable_vad': data.get('enable_vad', True),
-            'enable_tts_sync': data.get('enable_tts_sync', True),
-            # Ultimate Vocal Remover options
-            'enable_vocal_removal': data.get('enable_vocal_removal', False),
-            'enable_instrumental_mixing': data.get('enable_instrumental_mixing', False),
-            'sync_original_audio': data.get('sync_original_audio', False),
-            # Processing steps control - ทุกขั้นตอน
-            'enable_step1_video_processing': data.get('enable_step1_video_processing', True),
-            'enable_step2_vocal_removal': data.get('enable_step2_vocal_removal', True),
-            'enable_step3_stt': data.get('enable_step3_stt', True),
-            'enable_step4_translation': data.get('enable_step4_translation', True),
-            'enable_step5_tts': data.get('enable_step5_tts', True),
-            'enable_step6_audio_mixing': data.get('enable_step6_audio_mixing', True),
-            'enable_step7_video_merge': data.get('enable_step7_video_merge', True),
-            # Unlimited processing flags
-            'unlimited_mode': True,
-            'unlimited_audio_length': True,
-            'unlimited_file_size': True,
-            'unlimited_processing_time': True
-        }
+        task_data = build_youtube_task_data(data, video_url)
         
         # Add job to queue
         print(f"📋 Adding job to queue with task ID: {task_id}")
@@ -294,7 +455,8 @@ def youtube_realtime():
         return jsonify({
             'task_id': task_id,
             'message': 'YouTube real-time processing added to queue',
-            'queue_position': job_queue.queue.qsize()
+            'queue_position': job_queue.queue.qsize(),
+            'duplicate_of': job['task_id'] if job['task_id'] != task_id else None
         })
         
     except Exception as e:
@@ -302,6 +464,67 @@ def youtube_realtime():
         cleanup_memory()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/batch', methods=['POST'])
+def submit_batch():
+    """Submit many YouTube videos at once with shared defaults and per-item overrides
+    
+    Body: {"defaults": {...}, "items": [{"video_url": ..., ...}], "webhook_url": optional batch callback}
+    Items may carry their own "webhook_url" for per-job callbacks.
+    """
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('items'), list) or not data['items']:
+            return jsonify({'error': 'No items provided'}), 400
+        
+        items = data['items']
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({'error': f'Too many items (max {BATCH_MAX_ITEMS})'}), 400
+        
+        defaults = data.get('defaults') or {}
+        if not isinstance(defaults, dict):
+            return jsonify({'error': 'defaults must be an object'}), 400
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return jsonify({'error': f'Item {index} must be an object'}), 400
+            video_url = item.get('video_url') or defaults.get('video_url')
+            if not isinstance(video_url, str) or not any(re.match(pattern, video_url) for pattern in YOUTUBE_PATTERNS):
+                return jsonify({'error': f'Invalid YouTube URL in item {index}'}), 400
+        
+        # Build every job first so a bad item cannot leave part of the batch queued
+        batch_id = str(uuid.uuid4())
+        batch_tasks = []
+        for item in items:
+            params = {**defaults, **item}
+            task_data = build_youtube_task_data(params, item.get('video_url') or defaults['video_url'])
+            task_data['batch_id'] = batch_id
+            batch_tasks.append((str(uuid.uuid4()), task_data))
+        
+        task_ids = []
+        for task_id, task_data in batch_tasks:
+            job = job_queue.add_job(task_id, task_data)
+            task_ids.append(job['task_id'])
+        
+        job_queue.register_batch(batch_id, task_ids, data.get('webhook_url'))
+        print(f"📦 Batch {batch_id}: {len(task_ids)} งานเข้า queue")
+        
+        return jsonify({
+            'batch_id': batch_id,
+            'task_ids': task_ids,
+            'queue_position': job_queue.queue.qsize()
+        }), 202
+        
+    except Exception as e:
+        print(f"❌ Error submitting batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch/<batch_id>')
+def get_batch_status(batch_id):
+    """Get batch progress: counts per state plus compact status of every job"""
+    batch_status = job_queue.get_batch_status(batch_id)
+    if batch_status is None:
+        return jsonify({'error': 'Batch not found'}), 404
+    return jsonify(batch_status)
+
 # ===== FILE UPLOAD MODE =====
 @app.route('/api/upload/auto', methods=['POST'])
 def file_upload_auto():
@@ -340,11 +563,12 @@ def file_upload_auto():
         # Save uploaded file
         filename = secure_filename(file.filename or 'video')
         file_path = UPLOADS_DIR / f"{task_id}_{filename}"
-        file.save(str(file_path))
+        file_hash = save_upload_with_hash(file, str(file_path))
         
         task_data = {
             'mode': 'file_auto',
             'video_input': str(file_path),
+            'input_fingerprint': f"sha256:{file_hash}",
             'source_lang': request.form.get('source_lang', 'auto'),
             'target_lang': request.form.get('target_lang', 'th'),
             'stt_model': request.form.get('stt_model', 'base'),
@@ -352,6 +576,7 @@ def file_upload_auto():
             'tts_model': request.form.get('tts_model', 'gtts'),
             'voice_mode': request.form.get('voice_mode', 'female'),
             'video_speed': request.form.get('video_speed', '1.0'),
+            'output_mode': request.form.get('output_mode', 'dub'),
             'custom_coqui_model': request.form.get('custom_coqui_model', None),
             # Advanced audio processing options
             'enable_preprocessing': request.form.get('enable_preprocessing', 'true').lower() == 'true',
@@ -370,6 +595,9 @@ def file_upload_auto():
             'enable_step5_tts': request.form.get('enable_step5_tts', 'true').lower() == 'true',
             'enable_step6_audio_mixing': request.form.get('enable_step6_audio_mixing', 'true').lower() == 'true',
             'enable_step7_video_merge': request.form.get('enable_step7_video_merge', 'true').lower() == 'true',
+            'force_reprocess': request.form.get('force_reprocess', 'false').lower() == 'true',
+            'profile': request.form.get('profile', 'false').lower() == 'true',
+            'webhook_url': request.form.get('webhook_url'),
             # Unlimited processing flags
             'unlimited_mode': True,
             'unlimited_audio_length': True,
@@ -386,7 +614,8 @@ def file_upload_auto():
         return jsonify({
             'task_id': task_id,
             'message': 'File upload processing added to queue',
-            'queue_position': job_queue.queue.qsize()
+            'queue_position': job_queue.queue.qsize(),
+            'duplicate_of': job['task_id'] if job['task_id'] != task_id else None
         })
         
     except Exception as e:
@@ -446,6 +675,7 @@ def file_upload_step():
             'tts_model': request.form.get('tts_model', 'gtts'),
             'voice_mode': request.form.get('voice_mode', 'female'),
             'video_speed': request.form.get('video_speed', '1.0'),
+            'output_mode': request.form.get('output_mode', 'dub'),
             'custom_coqui_model': request.form.get('custom_coqui_model', None),
             # Advanced audio processing options
             'enable_preprocessing': request.form.get('enable_preprocessing', 'true').lower() == 'true',
@@ -490,49 +720,92 @@ def file_upload_step():
         cleanup_memory()
         return jsonify({'error': str(e)}), 500
 
+def run_step(task_id, step):
+    """Run one step on a JobQueue worker, reading task data at execution time"""
+    task_data = safe_get_task_data(task_id)
+    if not task_data:
+        raise Exception('Task not found')
+    
+    try:
+        if step == 1:
+            result = process_video_step(task_id, task_data)
+        elif step == 2:
+            result = process_vocal_removal_step(task_id, task_data)
+        elif step == 3:
+            result = process_stt_step(task_id, task_data)
+        elif step == 4:
+            result = process_translation_step(task_id, task_data)
+        elif step == 5:
+            result = process_tts_step(task_id, task_data)
+        elif step == 6:
+            result = process_audio_mixing_step(task_id, task_data)
+        else:
+            result = process_merge_step(task_id, task_data)
+    finally:
+        # Cleanup memory after each step
+        cleanup_memory()
+    
+    # Keep the stage result small: long text is served by /api/text/<task_id>/<text_type>
+    data = dict(result.get('data') or {})
+    for text_type in ('transcription', 'translation'):
+        if isinstance(data.get(text_type), str):
+            data[f'{text_type}_length'] = len(data.pop(text_type))
+    result['data'] = data
+    # Hash served outputs here on the worker so the media routes never do it per request
+    for path_key in ('tts_audio_path', 'final_video_path'):
+        if data.get(path_key) and os.path.exists(data[path_key]):
+            record_content_hash(data[path_key])
+    if data.get('final_video_path'):
+        result['output_path'] = data['final_video_path']
+    return result
+
 @app.route('/api/step/<task_id>/<int:step>', methods=['POST'])
 def process_step(task_id, step):
-    """Process specific step with memory optimization"""
+    """Queue a single step on the shared JobQueue and return 202 with its stage id
+    
+    Progress and the step result arrive via /api/events/<stage_id> or /api/status/<stage_id>.
+    """
     try:
-        print(f"🔄 Processing step {step} for task {task_id}")
-        monitor_memory_usage()
-        
-        task_data = safe_get_task_data(task_id)
-        if not task_data:
-            return jsonify({'error': 'Task not found'}), 404
+        print(f"🔄 Queueing step {step} for task {task_id}")
         
-        request_data = request.get_json() or {}
+        if step < 1 or step > 7:
+            return jsonify({'error': 'Invalid step number'}), 400
         
-        # Update task data with request data
-        safe_update_task_data(task_id, request_data)
+        request_data = request.get_json(silent=True) or {}
+        stage_id = str(uuid.uuid4())
         
-        try:
-            if step == 1:
-                result = process_video_step(task_id, task_data)
-            elif step == 2:
-                result = process_vocal_removal_step(task_id, task_data)
-            elif step == 3:
-                result = process_stt_step(task_id, task_data)
-            elif step == 4:
-                result = process_translation_step(task_id, task_data)
-            elif step == 5:
-                result = process_tts_step(task_id, task_data)
-            elif step == 6:
-                result = process_audio_mixing_step(task_id, task_data)
-            elif step == 7:
-                result = process_merge_step(task_id, task_data)
-            else:
-                return jsonify({'error': 'Invalid step number'}), 400
-            
-            # Cleanup memory after each step
-            cleanup_memory()
+        # Steps build on each other - one stage per task at a time. The check and the claim
+        # share one tasks_data_lock section so two concurrent POSTs cannot both enqueue.
+        with tasks_data_lock:
+            if task_id not in tasks_data:
+                return jsonify({'error': 'Task not found'}), 404
+            task_data = tasks_data[task_id].copy()
             
-            return jsonify(result)
+            active_stage_id = task_data.get('active_stage_id')
+            if active_stage_id:
+                active_stage = job_queue.get_job_status(active_stage_id)
+                if active_stage and active_stage['status'] not in PROGRESS_TERMINAL_STATES:
+                    return jsonify({'error': 'Another step is still running', 'stage_id': active_stage_id}), 409
             
-        except Exception as e:
-            print(f"❌ Error in step {step}: {str(e)}")
-            cleanup_memory()
-            return jsonify({'error': str(e)}), 500
+            # Update task data with request data
+            tasks_data[task_id].update(dict(request_data, active_stage_id=stage_id))
+        
+        # The model choices let the queue prefetch this step's model while earlier jobs run
+        step_settings = dict(task_data, **request_data)
+        job_queue.add_stage_job(stage_id, lambda: run_step(task_id, step), {
+            'parent_task_id': task_id,
+            'step': step,
+            **{key: step_settings.get(key) for key in ('stt_model', 'translation_model', 'tts_model', 'target_lang', 'custom_coqui_model')}
+        })
+        
+        return jsonify({
+            'stage_id': stage_id,
+            'task_id': task_id,
+            'step': step,
+            'status_url': f'/api/status/{stage_id}',
+            'events_url': f'/api/events/{stage_id}',
+            'queue_position': job_queue.queue.qsize()
+        }), 202
             
     except Exception as e:
         print(f"❌ Error in process_step: {str(e)}")
@@ -756,18 +1029,27 @@ def get_text(task_id, text_type):
     try:
         monitor_memory_usage()
         
-        task_data = safe_get_task_data(task_id)
+        if text_type not in ('transcription', 'translation'):
+            return jsonify({'error': 'Invalid text type'}), 400
+        
+        # Step-by-step tasks first, then queued jobs
+        task_data = safe_get_task_data(task_id) or job_queue.get_job_status(task_id)
         if not task_data:
             return jsonify({'error': 'Task not found'}), 404
         
-        if text_type == 'transcription':
-            text = task_data.get('transcription', '')
-        elif text_type == 'translation':
-            text = task_data.get('translation', '')
-        else:
-            return jsonify({'error': 'Invalid text type'}), 400
+        text = task_data.get(text_type) or ''
+        
+        # Optional paging by characters: ?offset=0&limit=20000
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = request.args.get('limit', None, type=int)
+        end = len(text) if limit is None else min(offset + max(limit, 0), len(text))
         
-        return jsonify({'text': text})
+        return jsonify({
+            'text': text[offset:end],
+            'offset': offset,
+            'total_length': len(text),
+            'has_more': end < len(text)
+        })
         
     except Exception as e:
         print(f"❌ Error getting text: {str(e)}")
@@ -818,10 +1100,10 @@ def get_status(task_id):
             monitor_memory_usage()
             get_status.last_memory_check = current_time
         
-        # Check job queue status
+        # Check job queue status (compact projection; large text is served by /api/text)
         job_status = job_queue.get_job_status(task_id)
         if job_status:
-            return jsonify(job_status)
+            return jsonify(job_queue.status_projection(job_status))
         
         # Check step-by-step processing status
         task_data = safe_get_task_data(task_id)
@@ -848,6 +1130,48 @@ def get_status(task_id):
         cleanup_memory()
         return jsonify({'error': str(e)}), 500
 
+def format_sse(event, event_name='progress'):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event_name}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+@app.route('/api/events/<task_id>')
+def stream_progress(task_id):
+    """Push progress events over Server-Sent Events (replaces polling /api/status)
+    
+    Each open stream holds one werkzeug worker thread for the life of the job, so streams
+    are capped (PROGRESS_STREAM_MAX_PER_JOB / PROGRESS_STREAM_MAX_TOTAL); past the cap the
+    client gets 429 and should poll /api/status instead.
+    """
+    job_status = job_queue.get_job_status(task_id)
+    if not job_status:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    job_task_id = job_status['task_id']
+    # Subscribe before taking the snapshot so no update falls in between
+    subscriber = job_queue.progress_events.subscribe(job_task_id)
+    if subscriber is None:
+        return jsonify({'error': 'Too many progress streams, poll the status URL instead', 'status_url': f'/api/status/{task_id}'}), 429
+    
+    def generate():
+        try:
+            event = job_queue.progress_event(job_status)
+            yield format_sse(event)
+            while event['status'] not in PROGRESS_TERMINAL_STATES:
+                try:
+                    event = subscriber.get(timeout=PROGRESS_STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Keep proxies and browsers from closing an idle connection
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            job_queue.progress_events.unsubscribe(job_task_id, subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # nginx: flush each event immediately
+    })
+
 @app.route('/api/audio/<task_id>/tts')
 def serve_tts_audio(task_id):
     """Serve TTS audio with memory optimization"""
@@ -863,7 +1187,12 @@ def serve_tts_audio(task_id):
         if not tts_audio_path or not os.path.exists(tts_audio_path):
             return jsonify({'error': 'TTS audio not found'}), 404
         
-        return send_file(tts_audio_path, mimetype='audio/wav')
+        # ?format=wav bypasses the compressed preview
+        if request.args.get('format') == 'wav':
+            return send_media_file(tts_audio_path, mimetype='audio/wav')
+        
+        preview_path, preview_mimetype = get_tts_preview(tts_audio_path)
+        return send_media_file(preview_path, mimetype=preview_mimetype)
         
     except Exception as e:
         print(f"❌ Error serving TTS audio: {str(e)}")
@@ -881,14 +1210,14 @@ def download_video(task_id):
         if job_status and job_status.get('status') == 'completed':
             output_path = job_status.get('output_path')
             if output_path and os.path.exists(output_path):
-                return send_file(output_path, as_attachment=True)
+                return send_media_file(output_path, as_attachment=True)
         
         # Check step-by-step processing
         task_data = safe_get_task_data(task_id)
         if task_data:
             output_path = task_data.get('output_path')
             if output_path and os.path.exists(output_path):
-                return send_file(output_path, as_attachment=True)
+                return send_media_file(output_path, as_attachment=True)
         
         return jsonify({'error': 'Video not found or not completed'}), 404
         
@@ -897,6 +1226,27 @@ def download_video(task_id):
         cleanup_memory()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/subtitles/<task_id>/<subtitle_format>')
+def download_subtitles(task_id, subtitle_format):
+    """Download SRT/WebVTT subtitles produced by subtitle output mode"""
+    try:
+        if subtitle_format not in ('srt', 'vtt'):
+            return jsonify({'error': 'Invalid subtitle format'}), 400
+        
+        job_status = job_queue.get_job_status(task_id)
+        subtitle_paths = (job_status or {}).get('subtitle_paths') or {}
+        subtitle_path = subtitle_paths.get(subtitle_format)
+        
+        if not subtitle_path or not os.path.exists(subtitle_path):
+            return jsonify({'error': 'Subtitles not found'}), 404
+        
+        mimetype = 'text/vtt' if subtitle_format == 'vtt' else 'application/x-subrip'
+        return send_media_file(subtitle_path, mimetype=mimetype, as_attachment=subtitle_format == 'srt')
+        
+    except Exception as e:
+        print(f"❌ Error downloading subtitles: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # ===== SYSTEM ENDPOINTS =====
 @app.route('/api/models/list')
 def list_models():
@@ -975,6 +1325,11 @@ def get_supported_voice_modes():
     """Get supported voice modes"""
     return jsonify(VOICE_MODES)
 
+@app.route('/api/output_modes/supported')
+def get_supported_output_modes():
+    """Get supported output modes"""
+    return jsonify(OUTPUT_MODES)
+
 @app.route('/api/video_speed_options/supported')
 def get_supported_video_speed_options():
     """Get supported video speed options"""
@@ -986,10 +1341,9 @@ def system_status():
     try:
         monitor_memory_usage()
         
-        # CPU and Memory info
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        # CPU, memory and disk from the background sampler (no blocking cpu_percent)
+        sample = metrics_sampler.latest()
+        cpu_percent = sample['cpu_percent']
         
         # Queue status
         queue_status = job_queue.get_queue_status()
@@ -998,20 +1352,20 @@ def system_status():
         with tasks_data_lock:
             active_tasks = len(tasks_data)
         
-        # เพิ่ม system health indicators
-        import torch
-        gpu_available = torch.cuda.is_available()
+        # เพิ่ม system health indicators (GPU is unknown/None until a model has imported torch)
+        torch = sys.modules.get('torch')
+        gpu_available = torch.cuda.is_available() if torch is not None else None
         gpu_memory = None
         if gpu_available:
             gpu_memory = torch.cuda.get_device_properties(0).total_memory
         
         # System health score (0-100)
         health_score = 100
-        if memory.percent > 90:
+        if sample['memory_percent'] > 90:
             health_score -= 30
-        elif memory.percent > 85:
+        elif sample['memory_percent'] > 85:
             health_score -= 20
-        elif memory.percent > 75:
+        elif sample['memory_percent'] > 75:
             health_score -= 10
             
         if cpu_percent > 90:
@@ -1019,19 +1373,21 @@ def system_status():
         elif cpu_percent > 80:
             health_score -= 10
             
-        if disk.percent > 90:
+        if sample['disk_percent'] > 90:
             health_score -= 20
-        elif disk.percent > 85:
+        elif sample['disk_percent'] > 85:
             health_score -= 10
         
         return jsonify({
             'cpu_percent': cpu_percent,
-            'memory_total': memory.total,
-            'memory_available': memory.available,
-            'memory_percent': memory.percent,
-            'disk_total': disk.total,
-            'disk_free': disk.free,
-            'disk_percent': disk.percent,
+            'memory_total': sample['memory_total'],
+            'memory_available': sample['memory_available'],
+            'memory_percent': sample['memory_percent'],
+            'process_rss': sample['process_rss'],
+            'disk_total': sample['disk_total'],
+            'disk_free': sample['disk_free'],
+            'disk_percent': sample['disk_percent'],
+            'sampled_at': sample['timestamp'],
             'queue_status': queue_status,
             'active_tasks': active_tasks,
             'gpu_available': gpu_available,
@@ -1045,6 +1401,34 @@ def system_status():
         cleanup_memory()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/system/metrics/history')
+def system_metrics_history():
+    """Recent metric samples for dashboards (?seconds=600, ?fields=cpu_percent,process_rss)"""
+    seconds = request.args.get('seconds', None, type=float)
+    samples = metrics_sampler.get_history(seconds)
+    
+    fields = request.args.get('fields')
+    if fields:
+        keep = set(fields.split(',')) | {'timestamp'}
+        samples = [{key: value for key, value in sample.items() if key in keep} for sample in samples]
+    
+    return jsonify({
+        'interval': metrics_sampler.interval,
+        'count': len(samples),
+        'samples': samples
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    return Response(pipeline_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/ready')
+def readiness():
+    """Readiness probe: 200 once every PRELOAD_MODELS entry is loaded and warmed up, otherwise 503"""
+    status = model_preloader.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 @app.route('/api/jobs/active')
 def get_active_jobs():
     """Get detailed information about active jobs"""
@@ -1060,6 +1444,63 @@ def get_active_jobs():
         print(f"❌ Error getting active jobs: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<task_id>/trace')
+def get_job_trace(task_id):
+    """Trace waterfall for one job (?format=text for a plain-text bar chart)"""
+    job = job_queue.get_job_status(task_id)
+    trace_id = job['task_id'] if job else task_id
+    
+    waterfall = tracer.waterfall(trace_id)
+    if waterfall is None:
+        return jsonify({'error': f'ไม่พบ trace สำหรับ task {task_id}'}), 404
+    
+    if request.args.get('format') == 'text':
+        return Response(tracer.render_waterfall_text(waterfall), mimetype='text/plain; charset=utf-8')
+    return jsonify(waterfall)
+
+@app.route('/api/jobs/<task_id>/resources')
+def get_job_resources(task_id):
+    """CPU, RSS, disk, subprocess and network usage of a job, per stage"""
+    job = job_queue.get_job_status(task_id)
+    if job is None:
+        return jsonify({'error': f'ไม่พบงาน {task_id}'}), 404
+    
+    resources = job.get('resources') or resource_tracker.snapshot(job['task_id'])
+    return jsonify({
+        'task_id': job['task_id'],
+        'status': job['status'],
+        'final': job.get('resources') is not None,
+        'resources': resources
+    })
+
+@app.route('/api/jobs/<task_id>/profile', methods=['GET', 'POST'])
+def job_profile(task_id):
+    """Sampling profiler for one job: POST {"enabled": true|false} toggles it, GET shows the summary"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('enabled', True):
+            summary = job_queue.start_profiling(task_id)
+            if summary is None:
+                return jsonify({'error': f'ไม่พบงาน {task_id} ที่กำลังรอหรือกำลังประมวลผล'}), 404
+        else:
+            summary = job_queue.stop_profiling(task_id)
+            if summary is None:
+                return jsonify({'error': f'งาน {task_id} ไม่ได้เปิด profiling'}), 404
+        return jsonify(dict(summary, download_url=f'/api/jobs/{task_id}/profile/download'))
+    
+    profiler = job_queue.get_profile(task_id)
+    if profiler is None:
+        return jsonify({'error': f'งาน {task_id} ไม่ได้เปิด profiling'}), 404
+    return jsonify(dict(profiler.summary(), download_url=f'/api/jobs/{task_id}/profile/download'))
+
+@app.route('/api/jobs/<task_id>/profile/download')
+def download_job_profile(task_id):
+    """Collapsed stacks (flamegraph.pl / speedscope input)"""
+    profiler = job_queue.get_profile(task_id)
+    if profiler is None or not profiler.output_path.exists():
+        return jsonify({'error': f'ไม่พบไฟล์ profile สำหรับงาน {task_id}'}), 404
+    return send_file(str(profiler.output_path.resolve()), as_attachment=True, download_name=profiler.output_path.name, mimetype='text/plain')
+
 @app.route('/api/stop/<task_id>', methods=['POST'])
 def stop_processing(task_id):
     """Stop processing for a specific task"""
@@ -1120,7 +1561,8 @@ def get_model_download_status():
         
         return jsonify({
             'available': downloader.get_available_models(),
-            'missing': downloader.get_missing_models()
+            'missing': downloader.get_missing_models(),
+            'downloads': {model_name: downloader.get_download_progress(model_name) for model_name in downloader.download_paths}
         })
         
     except Exception as e:
@@ -1147,22 +1589,27 @@ def download_model(model_name):
                 'message': f'Model {model_name} already available'
             })
         
-        success = downloader.download_model(model_name)
-        
-        if success:
-            return jsonify({
-                'message': f'Model {model_name} downloaded successfully'
-            })
-        else:
-            return jsonify({
-                'error': f'Failed to download model {model_name}'
-            }), 500
+        # Runs in the background; poll /api/models/download/<model_name>/progress
+        progress = downloader.start_download(model_name)
+        return jsonify({
+            'message': f'Model {model_name} download started',
+            'progress': progress
+        }), 202
         
     except Exception as e:
         print(f"❌ Error downloading model: {str(e)}")
         cleanup_memory()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/models/download/<model_name>/progress')
+def get_model_download_progress(model_name):
+    """Bytes and files done/total for one model download"""
+    from services import ModelDownloader
+    progress = ModelDownloader().get_download_progress(model_name)
+    if progress is None:
+        return jsonify({'error': f'Model {model_name} not in download list'}), 404
+    return jsonify(progress)
+
 @app.route('/api/models/download/all', methods=['POST'])
 def download_all_missing_models():
     """Download all missing models with memory optimization"""
@@ -1177,15 +1624,14 @@ def download_all_missing_models():
         
         for model_name in missing_models:
             try:
-                success = downloader.download_model(model_name)
-                results[model_name] = 'success' if success else 'failed'
+                results[model_name] = downloader.start_download(model_name)
             except Exception as e:
-                results[model_name] = f'error: {str(e)}'
+                results[model_name] = {'state': 'error', 'error': str(e)}
         
         return jsonify({
-            'message': 'Model download completed',
+            'message': 'Model downloads started',
             'results': results
-        })
+        }), 202
         
     except Exception as e:
         print(f"❌ Error downloading all models: {str(e)}")
@@ -1241,6 +1687,7 @@ def cleanup_on_shutdown():
         # Stop job queue
         if job_queue:
             job_queue.stop()
+        metrics_sampler.stop()
         
         # Clear task data
         with tasks_data_lock:
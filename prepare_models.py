@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Model preparation: convert downloaded checkpoints to safetensors
+แปลงโมเดลที่ดาวน์โหลดแล้วเป็น safetensors เพื่อโหลดแบบ memory-mapped
+
+Runs ModelDownloader.prepare_model for each model under models/ (new downloads are
+prepared automatically). With --verify each model is then loaded the way the services
+load it and the RSS split is printed: weights served from the mmapped file show up as
+shared (page cache), unpickled weights as private memory.
+    
+    python prepare_models.py                      # every downloaded model
+    python prepare_models.py nllb-200-distilled --verify
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import psutil
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import ModelDownloader, pretrained_load_kwargs
+
+def verify_load(downloader, model_name):
+    """โหลดโมเดลแบบเดียวกับ services แล้ววัดหน่วยความจำ private / shared ที่เพิ่มขึ้น"""
+    from transformers import AutoModelForSeq2SeqLM, AutoModelForSpeechSeq2Seq
+    model_info = downloader.download_paths[model_name]
+    model_class = AutoModelForSpeechSeq2Seq if model_info['type'] == 'whisper' else AutoModelForSeq2SeqLM
+    
+    process = psutil.Process()
+    before = process.memory_info()
+    start = time.perf_counter()
+    model = model_class.from_pretrained(downloader.resolve_model_path(model_name), **pretrained_load_kwargs())
+    seconds = time.perf_counter() - start
+    after = process.memory_info()
+    
+    shared = after.shared - before.shared
+    private = (after.rss - after.shared) - (before.rss - before.shared)
+    del model
+    return seconds, private, shared
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description="Convert downloaded model checkpoints to safetensors")
+    parser.add_argument('models', nargs='*', help="ModelDownloader names (default: every downloaded model)")
+    parser.add_argument('--verify', action='store_true', help="Load each prepared model and report private/shared memory")
+    args = parser.parse_args()
+    
+    print("🚀 เริ่มเตรียมโมเดล (safetensors)")
+    print("=" * 50)
+    
+    downloader = ModelDownloader()
+    model_names = args.models or downloader.get_available_models()
+    if not model_names:
+        print("⚠️  ยังไม่มีโมเดลที่ดาวน์โหลดไว้ใน models/")
+        return 0
+    
+    failed = []
+    for model_name in model_names:
+        print(f"\n📦 {model_name}")
+        if not downloader.prepare_model(model_name):
+            print(f"❌ เตรียมโมเดลไม่สำเร็จ")
+            failed.append(model_name)
+            continue
+        print(f"✅ พร้อมใช้งาน: {downloader.download_paths[model_name]['local_path']}")
+        
+        if args.verify:
+            try:
+                seconds, private, shared = verify_load(downloader, model_name)
+                print(f"⏱️  โหลดใน {seconds:.1f}s - private {private / 1024 / 1024:.0f}MB, shared (page cache) {shared / 1024 / 1024:.0f}MB")
+            except Exception as e:
+                print(f"❌ โหลดทดสอบไม่สำเร็จ: {e}")
+                failed.append(model_name)
+    
+    print("\n" + "=" * 50)
+    if failed:
+        print(f"❌ ล้มเหลว: {', '.join(failed)}")
+        return 1
+    print(f"🎉 เตรียมโมเดลครบ {len(model_names)} รายการ")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
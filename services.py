@@ -5,6 +5,7 @@ Services for Video Translator Application
 
 import os
 import re
+import sys
 import subprocess
 import tempfile
 import warnings
@@ -16,71 +17,1328 @@ import zipfile
 import shutil
 from datetime import datetime
 from pathlib import Path
-import yt_dlp
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import urlparse, parse_qs, quote, unquote
 import uuid
+import hashlib
+import importlib
+import importlib.util
+import json
+import heapq
+import weakref
+import psutil
+import contextlib
+import logging
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import atexit
 import concurrent.futures
+import fnmatch
+from collections import OrderedDict, deque
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 # Import libraries
-import torch
-import torchaudio
-from transformers import WhisperProcessor, WhisperForConditionalGeneration, AutoTokenizer, AutoModelForSeq2SeqLM
-import librosa
 import soundfile as sf
 import numpy as np
-from gtts import gTTS
-from youtube_transcript_api._api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
-
-# Audio preprocessing imports
-try:
-    import noisereduce as nr
-    NOISEREDUCE_AVAILABLE = True
-except ImportError:
-    NOISEREDUCE_AVAILABLE = False
+
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access
+    
+    Heavy ML/media libraries (torch, librosa, yt-dlp, ...) take seconds and hundreds of MB
+    to import; deferring them keeps web-server startup and status/download-only processes
+    light. The first access is timed (videotranslat_lazy_import_seconds, trace span 'import').
+    """
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def _load(self):
+        if self._module is None:
+            if self._name in sys.modules:
+                self._module = sys.modules[self._name]
+            else:
+                start = time.time()
+                with tracer.span('import', module=self._name):
+                    module = importlib.import_module(self._name)
+                elapsed = time.time() - start
+                pipeline_metrics.observe('videotranslat_lazy_import_seconds', elapsed, module=self._name)
+                models_log.info(f"📦 Imported {self._name} on first use in {elapsed:.2f}s")
+                self._module = module
+        return self._module
+    
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+    
+    def __repr__(self):
+        return f"<lazy module '{self._name}' ({'loaded' if self._module is not None else 'not loaded'})>"
+
+def module_available(name):
+    """Whether a module can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+torch = LazyModule('torch')
+torchaudio = LazyModule('torchaudio')
+librosa = LazyModule('librosa')
+yt_dlp = LazyModule('yt_dlp')
+
+# Audio preprocessing imports (availability is checked now, the import happens on first use)
+NOISEREDUCE_AVAILABLE = module_available('noisereduce')
+nr = LazyModule('noisereduce')
+if not NOISEREDUCE_AVAILABLE:
     print("⚠️  noisereduce not available, noise reduction disabled")
 
-try:
-    import webrtcvad
-    WEBRTCVAD_AVAILABLE = True
-except ImportError:
-    WEBRTCVAD_AVAILABLE = False
+WEBRTCVAD_AVAILABLE = module_available('webrtcvad')
+webrtcvad = LazyModule('webrtcvad')
+if not WEBRTCVAD_AVAILABLE:
     print("⚠️  webrtcvad not available, VAD disabled")
 
-try:
-    from scipy import signal
-    SCIPY_AVAILABLE = True
-except ImportError:
-    SCIPY_AVAILABLE = False
+SCIPY_AVAILABLE = module_available('scipy')
+signal = LazyModule('scipy.signal')
+if not SCIPY_AVAILABLE:
     print("⚠️  scipy not available, bandpass filter disabled")
 
 # Ultimate Vocal Remover imports
-try:
-    import onnxruntime as ort
-    ONNX_AVAILABLE = True
-except ImportError:
-    ONNX_AVAILABLE = False
+ONNX_AVAILABLE = module_available('onnxruntime')
+ort = LazyModule('onnxruntime')
+if not ONNX_AVAILABLE:
     print("⚠️  onnxruntime not available, Ultimate Vocal Remover disabled")
 
-try:
-    import cv2
-    OPENCV_AVAILABLE = True
-except ImportError:
-    OPENCV_AVAILABLE = False
+OPENCV_AVAILABLE = module_available('cv2')
+cv2 = LazyModule('cv2')
+if not OPENCV_AVAILABLE:
     print("⚠️  opencv not available, some video processing features disabled")
 
 # Import configuration
 from config import *
 from config import STT_MODELS, TRANSLATION_MODELS, TTS_MODELS, UPLOADS_DIR, OUTPUTS_DIR, TEMP_DIR, TEXTS_DIR, cleanup_temp_files, cleanup_upload_file, generate_output_filename
 
+# Loaded models for per-model memory reporting: (label, id) -> model (dropped when the model is freed)
+loaded_models = weakref.WeakValueDictionary()
+
+def track_loaded_model(label, model):
+    """Register a loaded torch model so the metrics sampler can report its memory"""
+    try:
+        loaded_models[(label, id(model))] = model
+    except TypeError:
+        pass  # Objects without weakref support are simply not tracked
+
+def pretrained_load_kwargs():
+    """from_pretrained() options for memory-mapped loading of safetensors checkpoints
+    
+    safetensors maps the weight file copy-on-write; with low_cpu_mem_usage the CPU parameters
+    stay views of that mapping instead of private copies. Pickle (.bin) checkpoints still load.
+    """
+    if MODEL_MMAP_LOAD and module_available('accelerate'):
+        return {'low_cpu_mem_usage': True}
+    return {}
+
+class TraceSpan:
+    """One timed operation inside a job trace"""
+    
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start', 'end', 'attributes', 'status', 'error')
+    
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.end = None
+        self.attributes = dict(attributes)
+        self.status = 'ok'
+        self.error = None
+    
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+    
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'end': self.end,
+            'duration_ms': round((self.end - self.start) * 1000, 3),
+            'thread': threading.current_thread().name,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+class JobTracer:
+    """Lightweight per-job tracing: nested spans exported to a rotating JSONL file
+    
+    The current span is tracked per thread; work handed to another thread keeps its
+    parent through wrap(). Spans outside a job (no trace id) are timed but not exported.
+    """
+    
+    def __init__(self, path=TRACE_FILE, max_bytes=TRACE_FILE_MAX_BYTES, backups=TRACE_FILE_BACKUPS,
+                 memory_jobs=TRACE_MEMORY_JOBS, max_spans_per_job=TRACE_MAX_SPANS_PER_JOB):
+        self.path = Path(path)
+        self.backups = backups
+        self.memory_jobs = memory_jobs
+        self.max_spans_per_job = max_spans_per_job
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.recent = OrderedDict()  # trace_id -> [span dicts]
+        self.thread_traces = {}  # thread ident -> trace_id it is working on (used by the profiler)
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger('videotranslat.trace')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+    
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+    
+    def _sync_thread(self, stack):
+        ident = threading.get_ident()
+        if stack and stack[-1].trace_id is not None:
+            self.thread_traces[ident] = stack[-1].trace_id
+        else:
+            self.thread_traces.pop(ident, None)
+    
+    def threads_for(self, trace_id):
+        return [ident for ident, current in list(self.thread_traces.items()) if current == trace_id]
+    
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+    
+    def current_trace_id(self):
+        span = self.current()
+        return span.trace_id if span else None
+    
+    def current_step(self):
+        """(trace_id, name of the nearest pipeline step span) for resource accounting"""
+        stack = self._stack()
+        if not stack:
+            return None, None
+        step = next((span for span in reversed(stack) if span.attributes.get('kind') == 'step'), None)
+        return stack[-1].trace_id, step.name if step is not None else stack[-1].name
+    
+    def log_context(self):
+        """(trace_id, innermost span name, nearest chunk attribute) for log records"""
+        stack = self._stack()
+        if not stack:
+            return None, None, None
+        chunk = next((span.attributes['chunk'] for span in reversed(stack) if 'chunk' in span.attributes), None)
+        return stack[-1].trace_id, stack[-1].name, chunk
+    
+    def begin(self, name, trace_id=None, **attributes):
+        """Open a span as a child of this thread's current span (pair with end())"""
+        parent = self.current()
+        if trace_id is None and parent is not None:
+            trace_id = parent.trace_id
+        span = TraceSpan(name, trace_id, parent.span_id if parent is not None and parent.trace_id == trace_id else None, attributes)
+        stack = self._stack()
+        stack.append(span)
+        self._sync_thread(stack)
+        return span
+    
+    def end(self, span, error=None):
+        span.end = time.time()
+        if error is not None:
+            span.status = 'error'
+            span.error = str(error)[:500]
+        
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+        self._sync_thread(stack)
+        
+        if span.trace_id is not None:
+            self._export(span.to_dict())
+    
+    @contextlib.contextmanager
+    def span(self, name, trace_id=None, **attributes):
+        span = self.begin(name, trace_id, **attributes)
+        try:
+            yield span
+        except Exception as e:
+            self.end(span, e)
+            raise
+        self.end(span)
+    
+    def wrap(self, fn, name=None, **attributes):
+        """Carry the caller's span context into fn when it runs on another thread
+        
+        The CPU time and disk I/O of fn are charged to the caller's job stage.
+        """
+        caller_stack = list(self._stack())
+        
+        def run(*args, **kwargs):
+            stack = self._stack()
+            saved = list(stack)
+            stack[:] = caller_stack
+            self._sync_thread(stack)
+            try:
+                with resource_tracker.measure_thread():
+                    if name is None:
+                        return fn(*args, **kwargs)
+                    with self.span(name, **attributes):
+                        return fn(*args, **kwargs)
+            finally:
+                stack[:] = saved
+                self._sync_thread(stack)
+        
+        return run
+    
+    def _export(self, record):
+        with self.lock:
+            spans = self.recent.get(record['trace_id'])
+            if spans is None:
+                spans = self.recent[record['trace_id']] = []
+                while len(self.recent) > self.memory_jobs:
+                    self.recent.popitem(last=False)
+            if len(spans) < self.max_spans_per_job:
+                spans.append(record)
+        
+        try:
+            self.logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        except Exception as e:
+            metrics_log.warning(f"⚠️ Trace export error: {e}")
+    
+    def _read_spans_from_files(self, trace_id):
+        """Fall back to the JSONL files (current + rotated) for traces no longer in memory"""
+        needle = f'"trace_id": "{trace_id}"'
+        spans = []
+        paths = [self.path] + [Path(f"{self.path}.{i}") for i in range(1, self.backups + 1)]
+        for path in paths:
+            if not path.exists():
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if needle in line:
+                            spans.append(json.loads(line))
+            except Exception as e:
+                metrics_log.warning(f"⚠️ Trace read error ({path}): {e}")
+        return spans
+    
+    def get_spans(self, trace_id):
+        with self.lock:
+            spans = list(self.recent.get(trace_id, []))
+        return spans or self._read_spans_from_files(trace_id)
+    
+    def waterfall(self, trace_id):
+        """Spans ordered by start time with offset from the trace start and nesting depth"""
+        spans = sorted(self.get_spans(trace_id), key=lambda span: span['start'])
+        if not spans:
+            return None
+        
+        trace_start = spans[0]['start']
+        trace_end = max(span['end'] for span in spans)
+        parents = {span['span_id']: span['parent_id'] for span in spans}
+        
+        rows = []
+        for span in spans:
+            depth = 0
+            parent_id = span['parent_id']
+            while parent_id in parents and depth < 64:
+                depth += 1
+                parent_id = parents[parent_id]
+            rows.append(dict(span, offset_ms=round((span['start'] - trace_start) * 1000, 3), depth=depth))
+        
+        return {
+            'trace_id': trace_id,
+            'started_at': datetime.fromtimestamp(trace_start).isoformat(),
+            'duration_ms': round((trace_end - trace_start) * 1000, 3),
+            'span_count': len(rows),
+            'error_count': sum(1 for row in rows if row['status'] == 'error'),
+            'spans': rows
+        }
+    
+    def render_waterfall_text(self, waterfall, width=60):
+        """Plain-text waterfall (one bar per span) for terminals and quick looks"""
+        total = max(waterfall['duration_ms'], 0.001)
+        lines = [f"trace {waterfall['trace_id']}  {waterfall['duration_ms'] / 1000:.2f}s  {waterfall['span_count']} spans"]
+        for row in waterfall['spans']:
+            offset = int(row['offset_ms'] / total * width)
+            length = max(1, int(row['duration_ms'] / total * width))
+            bar = ' ' * offset + ('!' if row['status'] == 'error' else '#') * min(length, width - offset if offset < width else 1)
+            label = ('  ' * row['depth'] + row['name'])[:40]
+            lines.append(f"{label:<40} |{bar:<{width}}| {row['duration_ms'] / 1000:8.2f}s")
+        return '\n'.join(lines) + '\n'
+
+# Shared by every service instance so spans from any processor land in the job's trace
+tracer = JobTracer()
+
+def read_content_hash(file_path):
+    """SHA-256 stored by record_content_hash, or None when there is no sidecar or the file changed since"""
+    try:
+        stat = os.stat(file_path)
+        with open(f"{file_path}{MEDIA_HASH_SUFFIX}", 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record.get('size') != stat.st_size or record.get('mtime_ns') != stat.st_mtime_ns:
+        return None
+    return record.get('sha256')
+
+def record_content_hash(file_path):
+    """Hash a finished output once and keep the result in a '<file>.sha256' sidecar
+    
+    The media routes build strong ETags from the sidecar, so serving a multi-GB output
+    never reads the file through the web worker (and the hash survives restarts).
+    """
+    content_hash = read_content_hash(file_path)
+    if content_hash:
+        return content_hash
+    
+    stat = os.stat(file_path)
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(MEDIA_HASH_CHUNK_SIZE), b''):
+            hasher.update(block)
+    
+    sidecar_path = f"{file_path}{MEDIA_HASH_SUFFIX}"
+    with open(f"{sidecar_path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': hasher.hexdigest()}, f)
+    os.replace(f"{sidecar_path}.tmp", sidecar_path)
+    return hasher.hexdigest()
+
+def run_subprocess(cmd, capture_output=False, timeout=None, check=False, input=None, **popen_kwargs):
+    """subprocess.run replacement that traces the call and accounts its CPU, disk I/O and RSS
+    
+    The child is sampled with psutil while it runs (children of ffmpeg/sox are not followed),
+    so very short runs may report zero CPU. Usage is charged to the calling job's stage.
+    """
+    if capture_output:
+        popen_kwargs['stdout'] = subprocess.PIPE
+        popen_kwargs['stderr'] = subprocess.PIPE
+    if input is not None:
+        popen_kwargs['stdin'] = subprocess.PIPE
+    
+    program = cmd[0] if isinstance(cmd, (list, tuple)) else str(cmd).split()[0]
+    with tracer.span('subprocess', program=os.path.basename(str(program)), args=len(cmd) if isinstance(cmd, (list, tuple)) else 1) as span:
+        start = time.time()
+        usage = {'cpu': 0.0, 'read_bytes': 0, 'write_bytes': 0, 'peak_rss': 0}
+        try:
+            with subprocess.Popen(cmd, **popen_kwargs) as process:
+                try:
+                    child = psutil.Process(process.pid)
+                except psutil.Error:
+                    child = None
+                
+                while True:
+                    wait = RESOURCE_SUBPROCESS_POLL_INTERVAL
+                    if timeout is not None:
+                        wait = max(0.0, min(wait, start + timeout - time.time()))
+                    try:
+                        stdout, stderr = process.communicate(input, timeout=wait)
+                        break
+                    except subprocess.TimeoutExpired:
+                        input = None  # Already sent; communicate() must not be given it again
+                        if timeout is not None and time.time() - start >= timeout:
+                            process.kill()
+                            process.communicate()
+                            raise subprocess.TimeoutExpired(cmd, timeout)
+                        resource_tracker.sample_process(child, usage)
+        finally:
+            resource_tracker.charge(subprocess_count=1, subprocess_cpu_seconds=usage['cpu'],
+                                    disk_read_bytes=usage['read_bytes'], disk_write_bytes=usage['write_bytes'],
+                                    subprocess_peak_rss=usage['peak_rss'])
+        span.set(returncode=process.returncode, cpu_seconds=round(usage['cpu'], 3))
+        
+        if check and process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+class JobProfiler:
+    """Sampling profiler for the threads working on one job
+    
+    A background thread reads sys._current_frames() every interval and counts the
+    stacks of threads whose current trace is this job (worker + executor threads),
+    so nothing is hooked into the profiled code itself. Output is the collapsed-stack
+    format understood by flamegraph.pl and speedscope.
+    """
+    
+    def __init__(self, task_id, interval=PROFILER_SAMPLE_INTERVAL, output_dir=PROFILES_DIR, max_depth=PROFILER_MAX_DEPTH):
+        self.task_id = task_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_path = self.output_dir / f"{task_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed"
+        self.stacks = {}  # collapsed stack string -> sample count
+        self.samples = 0
+        self.sample_cost = 0.0  # Seconds spent inside the sampler
+        self.started_at = None
+        self.stopped_at = None
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._sample_loop, name=f"profiler-{self.task_id}")
+        self.thread.daemon = True
+        self.thread.start()
+        metrics_log.info(f"🔬 เริ่ม profiling งาน {self.task_id} (ทุก {self.interval * 1000:.0f}ms)")
+    
+    def _sample_loop(self):
+        while not self.stop_event.wait(self.interval):
+            sample_start = time.perf_counter()
+            try:
+                self._sample()
+            except Exception as e:
+                metrics_log.warning(f"⚠️ Profiler sample error: {e}")
+            self.sample_cost += time.perf_counter() - sample_start
+    
+    def _sample(self):
+        idents = tracer.threads_for(self.task_id)
+        if not idents:
+            return
+        
+        frames = sys._current_frames()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            
+            key = ';'.join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+    
+    def write(self):
+        """Write the collapsed stacks collected so far (safe to call while running)"""
+        lines = [f"{stack} {count}" for stack, count in sorted(dict(self.stacks).items())]
+        with open(self.output_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + ('\n' if lines else ''))
+        return str(self.output_path)
+    
+    def stop(self):
+        if self.thread is None or self.stopped_at is not None:
+            return self.summary()
+        self.stop_event.set()
+        self.thread.join(timeout=2)
+        self.stopped_at = time.time()
+        self.write()
+        summary = self.summary()
+        metrics_log.info(f"🔬 หยุด profiling งาน {self.task_id}: {summary['samples']} samples, overhead {summary['overhead_percent']}% -> {self.output_path}")
+        return summary
+    
+    def summary(self):
+        wall = ((self.stopped_at or time.time()) - self.started_at) if self.started_at else 0.0
+        leaf_counts = {}
+        for stack, count in list(self.stacks.items()):
+            leaf = stack.rsplit(';', 1)[-1]
+            leaf_counts[leaf] = leaf_counts.get(leaf, 0) + count
+        top = sorted(leaf_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+        
+        return {
+            'task_id': self.task_id,
+            'running': self.stopped_at is None,
+            'file': str(self.output_path),
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'unique_stacks': len(self.stacks),
+            'duration_seconds': round(wall, 3),
+            'sampler_cpu_seconds': round(self.sample_cost, 4),
+            'overhead_percent': round(self.sample_cost / wall * 100, 3) if wall > 0 else 0.0,
+            'top_frames': [{'frame': frame, 'samples': count, 'percent': round(count / self.samples * 100, 1)} for frame, count in top] if self.samples else []
+        }
+
+class LogContextFilter(logging.Filter):
+    """Adds task_id / stage / chunk from the calling thread's trace span (extra= values win)"""
+    
+    def filter(self, record):
+        task_id, stage, chunk = tracer.log_context()
+        if not hasattr(record, 'task_id'):
+            record.task_id = task_id or '-'
+        if not hasattr(record, 'stage'):
+            record.stage = stage or '-'
+        if not hasattr(record, 'chunk'):
+            record.chunk = chunk if chunk is not None else '-'
+        return True
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line with the structured fields as keys"""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'task_id': getattr(record, 'task_id', '-'),
+            'stage': getattr(record, 'stage', '-'),
+            'chunk': getattr(record, 'chunk', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking a worker when the listener falls behind"""
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+log_listener = None
+
+def setup_logging(level=LOG_LEVEL, module_levels=LOG_MODULE_LEVELS):
+    """Send the 'videotranslat.*' loggers through a queue to a background writer (console + rotating file)"""
+    global log_listener
+    if log_listener is not None:
+        return log_listener
+    
+    formatter = JsonLogFormatter() if LOG_JSON else logging.Formatter(LOG_FORMAT)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8', delay=True)
+    file_handler.setFormatter(formatter)
+    
+    # The filter runs on the calling thread, where the trace context lives
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(LogContextFilter())
+    
+    app_logger = logging.getLogger('videotranslat')
+    app_logger.setLevel(level)
+    app_logger.addHandler(queue_handler)
+    app_logger.propagate = False
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    
+    log_listener = QueueListener(queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)  # Flush whatever is still queued on shutdown
+    return log_listener
+
+# Loggers per area; levels are tuned with LOG_LEVEL / LOG_MODULE_LEVELS
+queue_log = logging.getLogger('videotranslat.queue')
+download_log = logging.getLogger('videotranslat.download')
+video_log = logging.getLogger('videotranslat.video')
+stt_log = logging.getLogger('videotranslat.stt')
+translation_log = logging.getLogger('videotranslat.translation')
+tts_log = logging.getLogger('videotranslat.tts')
+uvr_log = logging.getLogger('videotranslat.uvr')
+models_log = logging.getLogger('videotranslat.models')
+metrics_log = logging.getLogger('videotranslat.metrics')
+
+setup_logging()
+
+class JobResourceTracker:
+    """Per-job, per-stage resource accounting
+    
+    CPU time and disk I/O are read per thread (time.thread_time and, on Linux,
+    /proc/thread-self/io) and charged to the job stage the thread is working on, so
+    concurrent jobs do not inflate each other. Native torch/OpenMP threads are not
+    Python threads, so process_cpu_seconds (whole process while the stage was open,
+    shared with any concurrent job) is reported next to cpu_seconds. RSS is also
+    process-wide: peak_rss_delta is the rise over the RSS at stage start.
+    """
+    
+    SUM_FIELDS = ('wall_seconds', 'cpu_seconds', 'process_cpu_seconds', 'subprocess_cpu_seconds', 'subprocess_count',
+                  'disk_read_bytes', 'disk_write_bytes', 'network_bytes')
+    MAX_FIELDS = ('peak_rss_delta', 'subprocess_peak_rss')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = {}  # task_id -> {'stages': OrderedDict(stage -> usage), 'open': {stage -> start counters}}
+        self.process = psutil.Process()
+        self.thread_io_path = '/proc/thread-self/io' if os.path.exists('/proc/thread-self/io') else None
+    
+    def _usage_locked(self, task_id, stage):
+        job = self.jobs.get(task_id)
+        if job is None:
+            job = self.jobs[task_id] = {'stages': OrderedDict(), 'open': {}, 'started_at': time.time()}
+        usage = job['stages'].get(stage)
+        if usage is None:
+            usage = job['stages'][stage] = dict.fromkeys(self.SUM_FIELDS + self.MAX_FIELDS, 0)
+        return job, usage
+    
+    def thread_counters(self):
+        """(cpu seconds, disk read bytes, disk write bytes) of the calling thread"""
+        read_bytes = write_bytes = 0
+        if self.thread_io_path:
+            try:
+                with open(self.thread_io_path) as f:
+                    for line in f:
+                        if line.startswith('read_bytes:'):
+                            read_bytes = int(line.split()[1])
+                        elif line.startswith('write_bytes:'):
+                            write_bytes = int(line.split()[1])
+            except (OSError, ValueError):
+                pass
+        return time.thread_time(), read_bytes, write_bytes
+    
+    def _process_counters(self):
+        try:
+            times = self.process.cpu_times()
+            return times.user + times.system, self.process.memory_info().rss
+        except psutil.Error:
+            return 0.0, 0
+    
+    def charge(self, task_id=None, stage=None, **amounts):
+        """Add usage to a job stage (defaults to the calling thread's current job stage)"""
+        if task_id is None:
+            task_id, stage = tracer.current_step()
+            if task_id is None:
+                return
+        with self.lock:
+            _, usage = self._usage_locked(task_id, stage or 'job')
+            for key, value in amounts.items():
+                if key in self.MAX_FIELDS:
+                    usage[key] = max(usage[key], value)
+                else:
+                    usage[key] += value
+    
+    @contextlib.contextmanager
+    def measure_thread(self):
+        """Charge the calling thread's CPU time and disk I/O inside the block to its job stage"""
+        task_id, stage = tracer.current_step()
+        if task_id is None:
+            yield
+            return
+        start = self.thread_counters()
+        try:
+            yield
+        finally:
+            end = self.thread_counters()
+            self.charge(task_id, stage, cpu_seconds=end[0] - start[0],
+                        disk_read_bytes=end[1] - start[1], disk_write_bytes=end[2] - start[2])
+            self.observe_rss()
+    
+    def sample_process(self, child, usage):
+        """Update a running subprocess' CPU / I/O / peak RSS totals in usage"""
+        if child is None:
+            return
+        try:
+            with child.oneshot():
+                times = child.cpu_times()
+                usage['cpu'] = times.user + times.system
+                usage['peak_rss'] = max(usage['peak_rss'], child.memory_info().rss)
+                if hasattr(child, 'io_counters'):
+                    io = child.io_counters()
+                    usage['read_bytes'] = io.read_bytes
+                    usage['write_bytes'] = io.write_bytes
+        except psutil.Error:
+            pass  # Exited between polls; keep the last sample
+    
+    def begin_stage(self, task_id, stage):
+        """Open a stage on the calling (worker) thread"""
+        process_cpu, rss = self._process_counters()
+        with self.lock:
+            job, _ = self._usage_locked(task_id, stage)
+            job['open'][stage] = {'wall': time.time(), 'thread': self.thread_counters(),
+                                  'process_cpu': process_cpu, 'rss': rss, 'peak_rss': rss}
+    
+    def end_stage(self, task_id, stage):
+        """Close a stage opened by begin_stage on the same thread"""
+        counters = self.thread_counters()
+        process_cpu, rss = self._process_counters()
+        with self.lock:
+            job = self.jobs.get(task_id)
+            opened = job['open'].pop(stage, None) if job else None
+            if opened is None:
+                return
+            _, usage = self._usage_locked(task_id, stage)
+            usage['wall_seconds'] += time.time() - opened['wall']
+            usage['cpu_seconds'] += counters[0] - opened['thread'][0]
+            usage['disk_read_bytes'] += counters[1] - opened['thread'][1]
+            usage['disk_write_bytes'] += counters[2] - opened['thread'][2]
+            usage['process_cpu_seconds'] += process_cpu - opened['process_cpu']
+            usage['peak_rss_delta'] = max(usage['peak_rss_delta'], max(opened['peak_rss'], rss) - opened['rss'])
+    
+    def observe_rss(self, rss=None):
+        """Record the current process RSS against every open stage (called by samplers)"""
+        if rss is None:
+            rss = self._process_counters()[1]
+        with self.lock:
+            for job in self.jobs.values():
+                for opened in job['open'].values():
+                    opened['peak_rss'] = max(opened['peak_rss'], rss)
+    
+    def _report_locked(self, job):
+        stages = {}
+        totals = dict.fromkeys(self.SUM_FIELDS + self.MAX_FIELDS, 0)
+        for stage, usage in job['stages'].items():
+            stages[stage] = {key: round(value, 3) if isinstance(value, float) else value for key, value in usage.items()}
+            for key in self.SUM_FIELDS:
+                totals[key] += usage[key]
+            for key in self.MAX_FIELDS:
+                totals[key] = max(totals[key], usage[key])
+        return {
+            'stages': stages,
+            'totals': {key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()},
+            'open_stages': list(job['open']),
+            'per_thread_io': self.thread_io_path is not None
+        }
+    
+    def snapshot(self, task_id):
+        """Usage so far for a running job (None if nothing has been recorded)"""
+        with self.lock:
+            job = self.jobs.get(task_id)
+            return self._report_locked(job) if job else None
+    
+    def finish(self, task_id):
+        """Final report for a job; the tracker forgets it (the report lives on in the job record)"""
+        with self.lock:
+            job = self.jobs.pop(task_id, None)
+            return self._report_locked(job) if job else None
+
+resource_tracker = JobResourceTracker()
+
+class PipelineMetrics:
+    """In-process counters, histograms and gauges rendered in the Prometheus text format"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> {'counts', 'sum', 'count'}
+        self.gauges = {}  # name -> fn returning a number
+        self.meta = {}  # name -> (type, help, buckets)
+    
+    def describe(self, name, metric_type, help_text, buckets=None):
+        self.meta[name] = (metric_type, help_text, buckets or METRICS_STAGE_BUCKETS)
+    
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def observe(self, name, value, **labels):
+        buckets = self.meta.get(name, (None, None, METRICS_STAGE_BUCKETS))[2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+    
+    def observe_stage(self, stage, seconds, **labels):
+        self.observe('videotranslat_stage_seconds', seconds, stage=stage, **labels)
+    
+    @contextlib.contextmanager
+    def time_stage(self, stage, **labels):
+        """Time a pipeline stage (also traced as a span); failures are counted separately and not observed"""
+        start = time.time()
+        try:
+            with tracer.span(stage, **labels):
+                yield
+        except Exception:
+            self.inc('videotranslat_stage_errors_total', stage=stage)
+            raise
+        self.observe_stage(stage, time.time() - start, **labels)
+    
+    def register_gauge(self, name, help_text, fn):
+        self.describe(name, 'gauge', help_text)
+        self.gauges[name] = fn
+    
+    def _format_labels(self, labels, extra=None):
+        items = list(labels) + (extra or [])
+        if not items:
+            return ''
+        escaped = []
+        for key, value in items:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped.append(f'{key}="{value}"')
+        return '{' + ','.join(escaped) + '}'
+    
+    def render(self):
+        """Prometheus text exposition (version 0.0.4)"""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: dict(value, counts=list(value['counts'])) for key, value in self.histograms.items()}
+        
+        lines = []
+        names = sorted({name for name, _ in counters} | {name for name, _ in histograms} | set(self.gauges))
+        for name in names:
+            metric_type, help_text, buckets = self.meta.get(name, ('untyped', '', METRICS_STAGE_BUCKETS))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            
+            if name in self.gauges:
+                try:
+                    lines.append(f"{name} {float(self.gauges[name]())}")
+                except Exception as e:
+                    metrics_log.warning(f"⚠️ Gauge {name} error: {e}")
+                continue
+            
+            for (metric_name, labels), value in sorted(counters.items()):
+                if metric_name == name:
+                    lines.append(f"{name}{self._format_labels(labels)} {value}")
+            
+            for (metric_name, labels), histogram in sorted(histograms.items()):
+                if metric_name != name:
+                    continue
+                for bound, count in zip(buckets, histogram['counts']):
+                    lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {histogram['count']}")
+        
+        return '\n'.join(lines) + '\n'
+
+# Shared by every service instance (processors are created per job)
+pipeline_metrics = PipelineMetrics()
+pipeline_metrics.describe('videotranslat_stage_seconds', 'histogram', 'Pipeline stage latency in seconds')
+pipeline_metrics.describe('videotranslat_stage_errors_total', 'counter', 'Pipeline stage failures')
+pipeline_metrics.describe('videotranslat_job_wait_seconds', 'histogram', 'Time jobs spent queued before a worker picked them up')
+pipeline_metrics.describe('videotranslat_jobs_total', 'counter', 'Finished jobs by final status')
+pipeline_metrics.describe('videotranslat_model_load_seconds', 'histogram', 'Model load time in seconds')
+pipeline_metrics.describe('videotranslat_cache_requests_total', 'counter', 'Cache lookups by cache and result (hit, miss, coalesced)')
+pipeline_metrics.describe('videotranslat_lazy_import_seconds', 'histogram', 'First-use import time of heavy libraries')
+pipeline_metrics.describe('videotranslat_realtime_factor', 'histogram', 'STT processing time divided by audio duration', METRICS_RTF_BUCKETS)
+pipeline_metrics.describe('videotranslat_model_download_bytes_total', 'counter', 'Model weight bytes downloaded')
+pipeline_metrics.describe('videotranslat_model_warmup_seconds', 'histogram', 'Startup warm-up inference time per preloaded model')
+pipeline_metrics.describe('videotranslat_model_prefetch_seconds', 'histogram', 'Time spent prefetching a queued job\'s model, by outcome')
+pipeline_metrics.describe('videotranslat_model_prefetch_total', 'counter', 'Models needed by starting jobs, by prefetch result (loaded, warmed, in_progress, resident, miss, ...)')
+
+class ModelRegistry:
+    """Process-wide cache of loaded models shared by every job's service instances
+    
+    Each job builds its own VideoProcessor/TranslationService, so without this every job
+    loaded its own copy of Whisper/NLLB. Concurrent requests for one key wait for a single load.
+    """
+    
+    def __init__(self):
+        self.models = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+    
+    @staticmethod
+    def key(kind, model_name):
+        """Registry key; a configured short name and its repo id map to the same key"""
+        if kind == 'stt':
+            model_name = STT_MODELS.get(model_name, model_name)
+        elif kind == 'translation':
+            model_name = TRANSLATION_MODELS.get(model_name, model_name)
+        return f"{kind}:{model_name}"
+    
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() once if it is not loaded yet"""
+        with self.lock:
+            if key in self.models:
+                pipeline_metrics.inc('videotranslat_cache_requests_total', cache='model', result='hit')
+                return self.models[key]
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            with self.lock:
+                if key in self.models:
+                    # Another thread finished loading it while we waited
+                    pipeline_metrics.inc('videotranslat_cache_requests_total', cache='model', result='coalesced')
+                    return self.models[key]
+            pipeline_metrics.inc('videotranslat_cache_requests_total', cache='model', result='miss')
+            value = loader()
+            with self.lock:
+                self.models[key] = value
+            return value
+    
+    def get(self, key):
+        """Cached value for key, or None without loading anything"""
+        with self.lock:
+            value = self.models.get(key)
+        if value is not None:
+            pipeline_metrics.inc('videotranslat_cache_requests_total', cache='model', result='hit')
+        return value
+    
+    def is_loaded(self, key):
+        with self.lock:
+            return key in self.models
+    
+    def loaded_keys(self):
+        with self.lock:
+            return sorted(self.models)
+    
+    def evict(self, key):
+        """Drop a model so its memory can be freed once no job holds a reference to it"""
+        with self.lock:
+            return self.models.pop(key, None) is not None
+
+model_registry = ModelRegistry()
+
+class SystemMetricsSampler:
+    """Background sampler: CPU, RSS, disk, GPU, workers and model memory into a ring buffer
+    
+    Request handlers read latest() instead of calling psutil themselves.
+    """
+    
+    def __init__(self, interval=METRICS_SAMPLE_INTERVAL, history_size=METRICS_HISTORY_SIZE, worker_status_fn=None, on_sample=None):
+        self.interval = interval
+        self.history = deque(maxlen=history_size)
+        self.worker_status_fn = worker_status_fn
+        self.on_sample = on_sample
+        self.process = psutil.Process()
+        self.running = True
+        
+        # First cpu_percent(None) call only sets the baseline
+        psutil.cpu_percent(interval=None)
+        self.history.append(self._sample())
+        
+        self.thread = threading.Thread(target=self._sample_loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def latest(self):
+        """Most recent sample (no system calls)"""
+        return self.history[-1]
+    
+    def get_history(self, seconds=None):
+        """Samples from the last `seconds` (all buffered samples if None)"""
+        samples = list(self.history)
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            samples = [sample for sample in samples if sample['timestamp'] >= cutoff]
+        return samples
+    
+    def _sample_loop(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                sample = self._sample()
+                self.history.append(sample)
+                if self.on_sample:
+                    self.on_sample(sample)
+            except Exception as e:
+                metrics_log.warning(f"⚠️ Metrics sampling error: {e}")
+    
+    def _sample(self):
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(str(OUTPUTS_DIR.resolve()))
+        
+        children = []
+        for child in self.process.children(recursive=True):
+            try:
+                children.append({'pid': child.pid, 'name': child.name(), 'rss': child.memory_info().rss})
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        
+        # Only once a model has pulled torch in; the sampler must not import it by itself
+        gpu_memory_allocated = None
+        if 'torch' in sys.modules and torch.cuda.is_available():
+            gpu_memory_allocated = torch.cuda.memory_allocated()
+        
+        return {
+            'timestamp': time.time(),
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_total': memory.total,
+            'memory_available': memory.available,
+            'memory_percent': memory.percent,
+            'process_rss': self.process.memory_info().rss,
+            'children_rss': sum(child['rss'] for child in children),
+            'children': children,
+            'disk_total': disk.total,
+            'disk_free': disk.free,
+            'disk_percent': disk.percent,
+            'gpu_memory_allocated': gpu_memory_allocated,
+            'workers': self.worker_status_fn() if self.worker_status_fn else [],
+            'models': self._model_memory()
+        }
+    
+    def _model_memory(self):
+        """Parameter + buffer bytes per loaded model label"""
+        usage = {}
+        for (label, _), model in list(loaded_models.items()):
+            try:
+                tensors = list(model.parameters()) + list(model.buffers())
+                size = sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+            except Exception:
+                continue
+            usage[label] = usage.get(label, 0) + size
+        return usage
+    
+    def stop(self):
+        self.running = False
+
+class ModelDownloadManager:
+    """Background model downloads: parallel files, HTTP Range resume, manifest hash checks
+    
+    Each file is fetched into '<name>.incomplete', checked against the repo manifest (LFS
+    sha256, or the git blob sha1 for small files) and renamed into place. The model directory
+    only counts as complete once MODEL_COMPLETE_MARKER has been written, after every file.
+    """
+    
+    def __init__(self, endpoint=MODEL_DOWNLOAD_ENDPOINT, workers=MODEL_DOWNLOAD_WORKERS, token=MODEL_DOWNLOAD_TOKEN):
+        self.endpoint = endpoint.rstrip('/')
+        self.workers = workers
+        self.token = token
+        self.lock = threading.Lock()
+        # model_name -> progress dict, bytes on disk per file, and an event set when the run ends
+        self.downloads = {}
+        self.file_bytes = {}
+        self.done_events = {}
+    
+    def start(self, model_name, repo_id, local_path, on_complete=None):
+        """Start downloading repo_id into local_path (or join the running download); returns progress
+        
+        on_complete runs on the download thread after every file is verified and before the
+        completion marker is written (ModelDownloader uses it for the safetensors conversion).
+        """
+        with self.lock:
+            current = self.downloads.get(model_name)
+            if current and current['state'] in ('queued', 'downloading', 'preparing'):
+                return dict(current)
+            self.downloads[model_name] = {
+                'model': model_name, 'repo_id': repo_id, 'state': 'queued', 'revision': None,
+                'bytes_done': 0, 'bytes_total': None, 'files_done': 0, 'files_total': None,
+                'started_at': time.time(), 'finished_at': None, 'error': None
+            }
+            self.file_bytes[model_name] = {}
+            self.done_events[model_name] = threading.Event()
+        
+        thread = threading.Thread(target=self._run, args=(model_name, repo_id, Path(local_path), on_complete),
+                                  name=f"model-download-{model_name}")
+        thread.daemon = True
+        thread.start()
+        return self.progress(model_name)
+    
+    def progress(self, model_name):
+        """Progress snapshot (None if this process never started a download of the model)"""
+        with self.lock:
+            current = self.downloads.get(model_name)
+            if current is None:
+                return None
+            snapshot = dict(current)
+        snapshot['percent'] = round(100 * snapshot['bytes_done'] / snapshot['bytes_total'], 1) if snapshot['bytes_total'] else None
+        return snapshot
+    
+    def wait(self, model_name, timeout=None):
+        """Block until the download ends; True if it completed"""
+        with self.lock:
+            event = self.done_events.get(model_name)
+        if event is None or not event.wait(timeout):
+            return False
+        return self.progress(model_name)['state'] == 'complete'
+    
+    def _update(self, model_name, **fields):
+        with self.lock:
+            self.downloads[model_name].update(fields)
+    
+    def _set_file_bytes(self, model_name, file_name, size):
+        with self.lock:
+            self.file_bytes[model_name][file_name] = size
+            self.downloads[model_name]['bytes_done'] = sum(self.file_bytes[model_name].values())
+    
+    def _run(self, model_name, repo_id, local_path, on_complete):
+        try:
+            with tracer.span('model_download', model=model_name, repo=repo_id):
+                self._update(model_name, state='downloading')
+                manifest = self._fetch_manifest(repo_id)
+                revision = manifest.get('sha') or MODEL_DOWNLOAD_REVISION
+                files = self._select_files(manifest['siblings'], local_path)
+                self._update(model_name, revision=revision, files_total=len(files), bytes_total=sum(entry['size'] for entry in files))
+                models_log.info(f"📥 Downloading {model_name}: {len(files)} files, {sum(entry['size'] for entry in files) / 1024 / 1024:.0f}MB from {self.endpoint}")
+                
+                local_path.mkdir(parents=True, exist_ok=True)
+                failed = threading.Event()
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    futures = [executor.submit(tracer.wrap(self._download_file), model_name, repo_id, revision, entry, local_path, failed)
+                               for entry in files]
+                    try:
+                        for future in concurrent.futures.as_completed(futures):
+                            future.result()
+                    except Exception:
+                        # Stop the other files at their next chunk; their .incomplete parts stay for resume
+                        failed.set()
+                        raise
+                
+                if on_complete:
+                    self._update(model_name, state='preparing')
+                    on_complete()
+                
+                # Written last, via rename: the directory is either complete or has no marker at all
+                marker_tmp = local_path / (MODEL_COMPLETE_MARKER + '.tmp')
+                marker_tmp.write_text(json.dumps({
+                    'repo_id': repo_id,
+                    'revision': revision,
+                    'files': len(files),
+                    'bytes': sum(entry['size'] for entry in files),
+                    'completed_at': datetime.now().isoformat()
+                }, indent=2), encoding='utf-8')
+                os.replace(marker_tmp, local_path / MODEL_COMPLETE_MARKER)
+            
+            self._update(model_name, state='complete', finished_at=time.time())
+            models_log.info(f"✅ Downloaded and verified {model_name} ({repo_id}@{revision[:8]})")
+        except Exception as e:
+            self._update(model_name, state='error', error=str(e), finished_at=time.time())
+            models_log.error(f"❌ Error downloading {model_name}: {e}")
+        finally:
+            self.done_events[model_name].set()
+    
+    def _headers(self):
+        # identity: byte offsets for Range must refer to the stored file, not a gzip stream
+        headers = {'Accept-Encoding': 'identity'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        return headers
+    
+    def _local_path(self, url):
+        return unquote(urlparse(url).path)
+    
+    def _fetch_manifest(self, repo_id):
+        """Repo file list with sizes and hashes (/api/models/<repo>/revision/<rev>?blobs=true)"""
+        url = f"{self.endpoint}/api/models/{repo_id}/revision/{MODEL_DOWNLOAD_REVISION}"
+        if url.startswith('file://'):
+            with open(self._local_path(url), encoding='utf-8') as f:
+                manifest = json.load(f)
+        else:
+            response = requests.get(url, params={'blobs': 'true'}, headers=self._headers(), timeout=MODEL_DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            manifest = response.json()
+        
+        if 'siblings' not in manifest:
+            raise Exception(f"Manifest for {repo_id} has no file list")
+        return manifest
+    
+    def _select_files(self, siblings, local_path):
+        """Files to fetch: skip other frameworks' weights, and pickle weights when safetensors exist"""
+        names = {entry['rfilename'] for entry in siblings}
+        has_safetensors = any(name in names or (local_path / name).exists()
+                              for name in ('model.safetensors', 'model.safetensors.index.json'))
+        
+        files = []
+        for entry in siblings:
+            name = entry['rfilename']
+            if name.startswith('.') or any(fnmatch.fnmatch(name, pattern) for pattern in MODEL_DOWNLOAD_SKIP_PATTERNS):
+                continue
+            if has_safetensors and fnmatch.fnmatch(name, 'pytorch_model*.bin*'):
+                continue
+            
+            lfs = entry.get('lfs') or {}
+            size = lfs.get('size', entry.get('size'))
+            if size is None:
+                raise Exception(f"Manifest has no size for {name} (it must be fetched with ?blobs=true)")
+            files.append({
+                'name': name,
+                'size': size,
+                'sha256': lfs.get('sha256'),
+                'git_sha1': None if lfs else entry.get('blobId')
+            })
+        return files
+    
+    def _download_file(self, model_name, repo_id, revision, entry, local_path, failed):
+        """Fetch one file with resume and retries, verify it, then rename it into place"""
+        target = local_path / entry['name']
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + '.incomplete')
+        
+        # Left by an earlier run: verify instead of fetching it again
+        if target.exists():
+            if target.stat().st_size == entry['size'] and self._verify(target, entry):
+                self._set_file_bytes(model_name, entry['name'], entry['size'])
+                self._file_done(model_name)
+                return
+            target.unlink()
+        
+        url = f"{self.endpoint}/{repo_id}/resolve/{revision}/{quote(entry['name'])}"
+        for attempt in range(1, MODEL_DOWNLOAD_RETRIES + 1):
+            if failed.is_set():
+                raise Exception("Download stopped after another file failed")
+            try:
+                offset = partial.stat().st_size if partial.exists() else 0
+                if offset > entry['size']:
+                    partial.unlink()
+                    offset = 0
+                self._set_file_bytes(model_name, entry['name'], offset)
+                if offset < entry['size']:
+                    self._fetch(url, partial, offset, model_name, entry['name'], failed)
+                
+                size = partial.stat().st_size
+                if size != entry['size']:
+                    raise Exception(f"got {size} of {entry['size']} bytes")
+                if not self._verify(partial, entry):
+                    # Resuming would keep the bad bytes, so start this file over
+                    partial.unlink()
+                    raise Exception("hash does not match the manifest")
+                
+                os.replace(partial, target)
+                self._file_done(model_name)
+                return
+            except Exception as e:
+                if failed.is_set() or attempt == MODEL_DOWNLOAD_RETRIES:
+                    raise Exception(f"{entry['name']}: {e}")
+                delay = min(2 ** (attempt - 1), 30)
+                models_log.warning(f"⚠️  {model_name}/{entry['name']} attempt {attempt} failed ({e}), resuming in {delay}s")
+                time.sleep(delay)
+    
+    def _fetch(self, url, partial, offset, model_name, file_name, failed):
+        """Append the bytes after `offset` to the partial file"""
+        if url.startswith('file://'):
+            with open(self._local_path(url), 'rb') as source, open(partial, 'ab') as output:
+                source.seek(offset)
+                self._copy_stream(iter(lambda: source.read(MODEL_DOWNLOAD_CHUNK_SIZE), b''), output, model_name, file_name, failed)
+            return
+        
+        headers = self._headers()
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+        with requests.get(url, headers=headers, stream=True, timeout=MODEL_DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            # A server that ignores Range answers 200 with the whole file
+            mode = 'ab' if offset and response.status_code == 206 else 'wb'
+            with open(partial, mode) as output:
+                self._copy_stream(response.iter_content(chunk_size=MODEL_DOWNLOAD_CHUNK_SIZE), output, model_name, file_name, failed)
+    
+    def _copy_stream(self, chunks, output, model_name, file_name, failed):
+        for chunk in chunks:
+            if failed.is_set():
+                raise Exception("stopped")
+            output.write(chunk)
+            self._set_file_bytes(model_name, file_name, output.tell())
+            pipeline_metrics.inc('videotranslat_model_download_bytes_total', len(chunk), model=model_name)
+    
+    def _verify(self, path, entry):
+        """Compare against the manifest: sha256 for LFS files, git blob sha1 for the rest"""
+        if entry['sha256']:
+            digest, expected = hashlib.sha256(), entry['sha256']
+        elif entry['git_sha1']:
+            digest, expected = hashlib.sha1(f"blob {entry['size']}\0".encode()), entry['git_sha1']
+        else:
+            return True  # No hash in the manifest: the size check is all there is
+        
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(MODEL_DOWNLOAD_CHUNK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest() == expected
+    
+    def _file_done(self, model_name):
+        with self.lock:
+            self.downloads[model_name]['files_done'] += 1
+
+model_download_manager = ModelDownloadManager()
+
 class ModelDownloader:
     """Automatic model downloader for missing models"""
     
-    def __init__(self):
+    def __init__(self, download_manager=None):
+        self.download_manager = download_manager or model_download_manager
         self.download_paths = {
             # Biodatlab Thai Whisper Models (แนะนำสูงสุด)
             'biodatlab-large-v3': {
@@ -138,136 +1396,267 @@ class ModelDownloader:
         }
     
     def is_model_available(self, model_name):
-        """Check if model is available locally"""
+        """Check if model is available locally (fully downloaded and verified)"""
         if model_name not in self.download_paths:
             return True  # Assume available if not in download list
         
+        # The marker is written last, so a half-downloaded directory is not mistaken for a model
         local_path = Path(self.download_paths[model_name]['local_path'])
-        return local_path.exists() and any(local_path.iterdir())
+        return (local_path / MODEL_COMPLETE_MARKER).exists()
+    
+    def start_download(self, model_name):
+        """Start a background download (or join the running one) and return its progress"""
+        model_info = self.download_paths[model_name]
+        repo_id = model_info['url'].replace('https://huggingface.co/', '')
+        models_log.info(f"📥 Downloading model {model_name} from {repo_id}")
+        models_log.info(f"📁 Installing to: {model_info['local_path']}")
+        return self.download_manager.start(model_name, repo_id, model_info['local_path'],
+                                           on_complete=lambda: self._convert_to_safetensors(model_name))
     
-    def download_model(self, model_name, task_id=None):
-        """Download model if not available locally"""
+    def download_model(self, model_name, task_id=None, wait=True):
+        """Download model if not available locally (wait=False returns once the download has started)"""
         if model_name not in self.download_paths:
-            print(f"⚠️  Model {model_name} not in download list, skipping download")
+            models_log.warning(f"⚠️  Model {model_name} not in download list, skipping download")
             return True
         
         if self.is_model_available(model_name):
-            print(f"✅ Model {model_name} already available locally")
+            models_log.info(f"✅ Model {model_name} already available locally")
+            return True
+        
+        self.start_download(model_name)
+        if not wait:
+            return True
+        return self.download_manager.wait(model_name)
+    
+    def resolve_model_path(self, model_name):
+        """Path for from_pretrained(): the local models/ copy if downloaded, else the Hugging Face repo id"""
+        for name, model_info in self.download_paths.items():
+            repo_id = model_info['url'].replace('https://huggingface.co/', '')
+            if model_name in (name, repo_id) and self.is_model_available(name):
+                return model_info['local_path']
+        return STT_MODELS.get(model_name) or TRANSLATION_MODELS.get(model_name) or model_name
+    
+    def _has_safetensors(self, local_path):
+        # The single file or the shard index is what transformers looks for; stray shards alone do not count
+        return (local_path / 'model.safetensors').exists() or (local_path / 'model.safetensors.index.json').exists()
+    
+    def is_model_prepared(self, model_name):
+        """True when the local copy holds safetensors weights and no pickle checkpoint"""
+        local_path = Path(self.download_paths[model_name]['local_path'])
+        return self._has_safetensors(local_path) and not any(local_path.glob('pytorch_model*.bin'))
+    
+    def prepare_model(self, model_name):
+        """Convert a downloaded pickle checkpoint (pytorch_model*.bin) to safetensors in place
+        
+        safetensors files can be memory-mapped at load time (see pretrained_load_kwargs), so
+        several worker processes share one page-cache copy instead of each unpickling its own.
+        The converted files are moved in before the .bin files are removed, so an interrupted
+        run leaves a loadable directory.
+        """
+        if model_name not in self.download_paths:
+            models_log.warning(f"⚠️  Model {model_name} not in download list, nothing to prepare")
+            return False
+        if not self.is_model_available(model_name):
+            models_log.warning(f"⚠️  Model {model_name} is not downloaded yet")
+            return False
+        return self._convert_to_safetensors(model_name)
+    
+    def _convert_to_safetensors(self, model_name):
+        if self.is_model_prepared(model_name):
+            models_log.info(f"✅ Model {model_name} already stored as safetensors")
             return True
         
         model_info = self.download_paths[model_name]
         local_path = Path(model_info['local_path'])
-        
-        print(f"📥 Downloading model {model_name} from {model_info['url']}")
-        print(f"📁 Installing to: {local_path}")
+        staging_path = local_path.with_name(local_path.name + '.safetensors-tmp')
         
         try:
-            # Create directory if it doesn't exist
-            local_path.mkdir(parents=True, exist_ok=True)
-            
-            # Try huggingface_hub first (more reliable)
-            if self._download_with_huggingface_hub(model_info['url'], local_path):
-                print(f"✅ Successfully downloaded {model_name}")
-                return True
-            else:
-                print(f"❌ Failed to download {model_name} with huggingface_hub")
-                return False
+            from transformers import AutoModelForSeq2SeqLM, AutoModelForSpeechSeq2Seq
+            model_class = AutoModelForSpeechSeq2Seq if model_info['type'] == 'whisper' else AutoModelForSeq2SeqLM
+            
+            prepare_start = time.time()
+            with tracer.span('model_prepare', model=model_name):
+                if not self._has_safetensors(local_path):
+                    models_log.info(f"🔄 Converting {model_name} to safetensors...")
+                    model = model_class.from_pretrained(str(local_path), use_safetensors=False)
+                    shutil.rmtree(staging_path, ignore_errors=True)
+                    # save_pretrained drops tied duplicates (e.g. NLLB's shared embeddings), which safetensors cannot store
+                    model.save_pretrained(str(staging_path), safe_serialization=True, max_shard_size=MODEL_SAFETENSORS_MAX_SHARD_SIZE)
+                    del model
+                    
+                    # Shards first, then the index / single file that makes transformers pick them up
+                    converted = sorted(staging_path.glob('*.safetensors')) + sorted(staging_path.glob('*.safetensors.index.json'))
+                    for converted_file in converted:
+                        os.replace(converted_file, local_path / converted_file.name)
+                    shutil.rmtree(staging_path, ignore_errors=True)
                 
-        except Exception as e:
-            print(f"❌ Error downloading {model_name}: {e}")
-            return False
-    
-    def _download_with_git_lfs(self, url, local_path):
-        """Download model using git lfs"""
-        try:
-            # Check if git lfs is available
-            result = subprocess.run(['git', 'lfs', 'version'], 
-                                  capture_output=True, text=True, timeout=30)
-            if result.returncode != 0:
-                print("⚠️  Git LFS not available, trying alternative download method")
-                return self._download_with_huggingface_hub(url, local_path)
+                for pickle_file in list(local_path.glob('pytorch_model*.bin')) + list(local_path.glob('pytorch_model.bin.index.json')):
+                    pickle_file.unlink()
             
-            # Clone with git lfs
-            cmd = [
-                'git', 'clone', '--depth', '1', 
-                '--filter=blob:none', '--sparse',
-                url, str(local_path)
-            ]
-            
-            print(f"🔄 Running: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            models_log.info(f"✅ Prepared {model_name} as safetensors in {time.time() - prepare_start:.1f}s")
+            return True
             
-            if result.returncode == 0:
-                # Pull LFS files
-                lfs_cmd = ['git', 'lfs', 'pull']
-                subprocess.run(lfs_cmd, cwd=local_path, capture_output=True, timeout=300)
-                return True
-            else:
-                print(f"❌ Git clone failed: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print("⏰ Download timeout, trying alternative method")
-            return self._download_with_huggingface_hub(url, local_path)
         except Exception as e:
-            print(f"❌ Git LFS download failed: {e}")
-            return self._download_with_huggingface_hub(url, local_path)
+            shutil.rmtree(staging_path, ignore_errors=True)
+            models_log.error(f"❌ Error preparing {model_name}: {e}")
+            return False
     
-    def _download_with_huggingface_hub(self, url, local_path):
-        """Download using huggingface_hub library"""
-        try:
-            from huggingface_hub import snapshot_download
-            
-            # Extract repo_id from URL
-            repo_id = url.replace('https://huggingface.co/', '')
-            
-            print(f"🔄 Downloading with huggingface_hub: {repo_id}")
-            
-            # Download to specified location
-            downloaded_path = snapshot_download(
-                repo_id=repo_id,
-                local_dir=local_path,
-                local_dir_use_symlinks=False,
-                resume_download=True
-            )
-            
-            print(f"✅ Downloaded to: {downloaded_path}")
-            return True
+    def get_download_progress(self, model_name):
+        """Get download progress for a model (bytes and files done/total, state, error)"""
+        if model_name not in self.download_paths:
+            return None
+        
+        progress = self.download_manager.progress(model_name)
+        if progress is not None:
+            return progress
+        
+        # Nothing started in this process: report what is on disk
+        local_path = Path(self.download_paths[model_name]['local_path'])
+        progress = {'model': model_name, 'state': 'not_downloaded', 'bytes_done': 0, 'bytes_total': None,
+                    'files_done': 0, 'files_total': None, 'percent': None, 'error': None}
+        if self.is_model_available(model_name):
+            marker = json.loads((local_path / MODEL_COMPLETE_MARKER).read_text(encoding='utf-8'))
+            progress.update(state='complete', revision=marker['revision'], bytes_done=marker['bytes'], bytes_total=marker['bytes'],
+                            files_done=marker['files'], files_total=marker['files'], percent=100.0)
+        elif local_path.exists() and any(local_path.iterdir()):
+            progress['state'] = 'incomplete'  # Resumed by the next download_model/start_download
+        return progress
+    
+    def get_available_models(self):
+        """Get list of available models"""
+        available = []
+        for model_name in self.download_paths:
+            if self.is_model_available(model_name):
+                available.append(model_name)
+        return available
+    
+    def get_missing_models(self):
+        """Get list of missing models"""
+        missing = []
+        for model_name in self.download_paths:
+            if not self.is_model_available(model_name):
+                missing.append(model_name)
+        return missing
+
+class ProgressBroadcaster:
+    """Fan-out progress events ไปยังผู้ติดตามหลายรายต่องาน (ใช้กับ SSE)
+    
+    Subscribers are capped per job and in total: every open stream keeps one server thread
+    blocked on its queue, so the caps bound the threads progress streaming can take.
+    """
+    
+    def __init__(self, max_pending=PROGRESS_STREAM_MAX_PENDING, max_per_task=PROGRESS_STREAM_MAX_PER_JOB, max_total=PROGRESS_STREAM_MAX_TOTAL):
+        self.lock = threading.Lock()
+        self.subscribers = {}  # task_id -> set of subscriber queues
+        self.max_pending = max_pending
+        self.max_per_task = max_per_task
+        self.max_total = max_total
+    
+    def subscribe(self, task_id):
+        """Register a subscriber for task_id and return its event queue (None when a cap is reached)"""
+        subscriber = queue.Queue(maxsize=self.max_pending)
+        with self.lock:
+            task_subscribers = self.subscribers.get(task_id, ())
+            total = sum(len(subscribers) for subscribers in self.subscribers.values())
+            if len(task_subscribers) >= self.max_per_task or total >= self.max_total:
+                return None
+            self.subscribers.setdefault(task_id, set()).add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, task_id, subscriber):
+        with self.lock:
+            task_subscribers = self.subscribers.get(task_id)
+            if task_subscribers is not None:
+                task_subscribers.discard(subscriber)
+                if not task_subscribers:
+                    del self.subscribers[task_id]
+    
+    def publish(self, task_id, event):
+        """Deliver event to every subscriber of task_id without ever blocking the worker"""
+        with self.lock:
+            task_subscribers = list(self.subscribers.get(task_id, ()))
+        
+        for subscriber in task_subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Slow client: progress is cumulative, so drop the oldest event and keep the newest
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+    
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(task_subscribers) for task_subscribers in self.subscribers.values())
+
+class WebhookNotifier:
+    """ส่ง webhook callbacks แบบ background พร้อม retry และ exponential backoff
+    
+    The dispatcher thread only schedules: due deliveries run on a pool of WEBHOOK_WORKERS
+    threads, so a slow or dead endpoint does not hold up other jobs' callbacks.
+    """
+    
+    def __init__(self, workers=WEBHOOK_WORKERS):
+        self.pending = []  # heap of (due_time, sequence, attempt, url, payload)
+        self.sequence = 0
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webhook')
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._dispatch_loop)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def notify(self, url, payload):
+        """Queue a POST of payload (JSON) to url; never blocks the caller"""
+        self._schedule(time.time(), 1, url, payload)
+    
+    def _schedule(self, due_time, attempt, url, payload):
+        with self.condition:
+            self.sequence += 1
+            heapq.heappush(self.pending, (due_time, self.sequence, attempt, url, payload))
+            self.condition.notify()
+    
+    def _dispatch_loop(self):
+        while self.running:
+            with self.condition:
+                while self.running and (not self.pending or self.pending[0][0] > time.time()):
+                    timeout = self.pending[0][0] - time.time() if self.pending else None
+                    self.condition.wait(timeout)
+                if not self.running:
+                    break
+                _, _, attempt, url, payload = heapq.heappop(self.pending)
             
-        except ImportError:
-            print("❌ huggingface_hub not available, trying git lfs...")
-            return self._download_with_git_lfs(url, local_path)
-        except Exception as e:
-            print(f"❌ HuggingFace Hub download failed: {e}")
-            print("🔄 Trying git lfs as fallback...")
-            return self._download_with_git_lfs(url, local_path)
+            self.executor.submit(self._deliver, attempt, url, payload)
     
-    def get_download_progress(self, model_name):
-        """Get download progress for a model"""
-        if model_name not in self.download_paths:
-            return "Model not in download list"
+    def _deliver(self, attempt, url, payload):
+        try:
+            response = requests.post(url, json=payload, timeout=WEBHOOK_TIMEOUT)
+            if response.status_code < 400:
+                queue_log.info(f"📨 Webhook delivered: {payload.get('event')} -> {url}")
+                return
+            # Client errors other than rate limiting will not succeed on retry
+            if response.status_code < 500 and response.status_code != 429:
+                queue_log.error(f"❌ Webhook rejected ({response.status_code}): {url}")
+                return
+            error = f"HTTP {response.status_code}"
+        except Exception as e:
+            error = str(e)
         
-        local_path = Path(self.download_paths[model_name]['local_path'])
-        if local_path.exists():
-            return "Downloaded"
-        else:
-            return "Not downloaded"
-    
-    def get_available_models(self):
-        """Get list of available models"""
-        available = []
-        for model_name in self.download_paths:
-            if self.is_model_available(model_name):
-                available.append(model_name)
-        return available
+        if attempt >= WEBHOOK_MAX_ATTEMPTS:
+            queue_log.error(f"❌ Webhook failed after {attempt} attempts: {url} ({error})")
+            return
+        
+        delay = min(WEBHOOK_BACKOFF_BASE * (2 ** (attempt - 1)), WEBHOOK_BACKOFF_MAX)
+        queue_log.warning(f"⚠️ Webhook attempt {attempt} failed ({error}), retry in {delay}s: {url}")
+        self._schedule(time.time() + delay, attempt + 1, url, payload)
     
-    def get_missing_models(self):
-        """Get list of missing models"""
-        missing = []
-        for model_name in self.download_paths:
-            if not self.is_model_available(model_name):
-                missing.append(model_name)
-        return missing
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.executor.shutdown(wait=False)
 
 class JobQueue:
     """Queue system สำหรับจัดการงานหลายงาน"""
@@ -284,6 +1673,44 @@ class JobQueue:
         self.jobs_lock = threading.Lock()
         self.completed_lock = threading.Lock()
         
+        # Video streams still downloading in parallel with audio processing (task_id -> future)
+        self.video_downloads = {}
+        
+        # Shared YouTube download cache (same video/format downloaded once across jobs)
+        self.download_cache = YouTubeDownloadCache()
+        
+        # Result deduplication: dedup key -> task_id, and duplicate task_id -> original task_id
+        self.dedup_index = {}
+        self.job_aliases = {}
+        
+        # Push-based progress for SSE subscribers
+        self.progress_events = ProgressBroadcaster()
+        
+        # Completion callbacks and batch tracking (batch_id -> batch info, task_id -> batch_ids)
+        self.webhooks = WebhookNotifier()
+        self.batches = {}
+        self.batch_index = {}
+        
+        # Single-stage jobs from step-by-step mode (stage_id -> callable), kept out of the job dict
+        self.stage_callables = {}
+        
+        # What each worker thread is running (worker_id -> task_id, started_at)
+        self.worker_jobs = {}
+        
+        # Open trace span of the current pipeline step per job (kept out of the job dict)
+        self.step_spans = {}
+        
+        # Sampling profilers: task_id -> JobProfiler (running or finished)
+        self.profilers = {}
+        
+        # Loads/page-cache-warms the models of the next queued jobs while earlier jobs run
+        self.prefetcher = ModelPrefetcher()
+        
+        pipeline_metrics.register_gauge('videotranslat_queue_depth', 'Jobs waiting for a worker', self.queue.qsize)
+        pipeline_metrics.register_gauge('videotranslat_active_jobs', 'Jobs queued or processing', lambda: sum(1 for job in list(self.active_jobs.values()) if job['status'] in ('queued', 'processing')))
+        pipeline_metrics.register_gauge('videotranslat_busy_workers', 'Workers currently running a job', lambda: len(self.worker_jobs))
+        pipeline_metrics.register_gauge('videotranslat_progress_subscribers', 'Open SSE progress streams', self.progress_events.subscriber_count)
+        
         # Job timeout settings (in seconds)
         self.job_timeout = 1800  # 30 minutes timeout (เพิ่มเป็น 30 นาที)
         self.job_timeout_check_interval = 60  # Check every 60 seconds
@@ -301,7 +1728,26 @@ class JobQueue:
         self.timeout_monitor.start()
     
     def add_job(self, task_id, task_data):
-        """เพิ่มงานเข้า queue"""
+        """เพิ่มงานเข้า queue (หรือใช้ผลลัพธ์ของงานที่เหมือนกันที่มีอยู่แล้ว)"""
+        # A profiled run must actually execute, so it never reuses an earlier result
+        dedup_key = self._dedup_key(task_data) if ENABLE_RESULT_DEDUP and not task_data.get('force_reprocess') and not task_data.get('profile') else None
+        if dedup_key:
+            with self.jobs_lock:
+                existing_job = self._find_duplicate_locked(dedup_key)
+                if existing_job is not None:
+                    self.job_aliases[task_id] = existing_job['task_id']
+                    if task_data.get('webhook_url'):
+                        existing_job['webhook_urls'].append(task_data['webhook_url'])
+            pipeline_metrics.inc('videotranslat_cache_requests_total', cache='result', result='hit' if existing_job is not None else 'miss')
+            if existing_job is not None:
+                queue_log.info(f"♻️  งาน {task_id} ซ้ำกับงาน {existing_job['task_id']} ({existing_job['status']}) - ใช้ผลลัพธ์เดิม")
+                if task_data.get('webhook_url') and existing_job['status'] in PROGRESS_TERMINAL_STATES:
+                    self.webhooks.notify(task_data['webhook_url'], self._job_webhook_payload(existing_job))
+                video_input = task_data.get('video_input', '')
+                if video_input and self._is_new_upload(video_input):
+                    cleanup_upload_file(video_input)
+                return existing_job
+        
         job = {
             'task_id': task_id,
             'task_data': task_data,
@@ -312,15 +1758,36 @@ class JobQueue:
             'started_at': None,
             'completed_at': None,
             'error': None,
-            'temp_files': [] # Keep track of temporary files for this job
+            'temp_files': [], # Keep track of temporary files for this job
+            'dedup_key': dedup_key,
+            'webhook_urls': [task_data['webhook_url']] if task_data.get('webhook_url') else []
         }
         
-        self.queue.put(job)
         with self.jobs_lock:
             self.active_jobs[task_id] = job
-        print(f"📋 เพิ่มงาน {task_id} เข้า queue")
+            if dedup_key:
+                self.dedup_index[dedup_key] = task_id
+        if task_data.get('profile'):
+            self.start_profiling(task_id)
+        self.queue.put(job)
+        queue_log.info(f"📋 เพิ่มงาน {task_id} เข้า queue")
+        self.prefetcher.schedule(self._upcoming_jobs())
         return job
     
+    def _upcoming_jobs(self):
+        """Queued jobs in the order workers will pick them up"""
+        with self.queue.mutex:
+            return [job for job in self.queue.queue if job is not None]
+    
+    def add_stage_job(self, stage_id, stage_fn, task_data):
+        """เพิ่มงานขั้นตอนเดียว (step-by-step mode) เข้า queue เดียวกับงานปกติ
+        
+        stage_fn() runs on a worker thread; its return value (a small dict) becomes the stage result.
+        """
+        with self.jobs_lock:
+            self.stage_callables[stage_id] = stage_fn
+        return self.add_job(stage_id, dict(task_data, mode='step_stage'))
+    
     def _worker(self, worker_id):
         """Worker thread สำหรับประมวลผลงาน"""
         while self.running:
@@ -340,12 +1807,19 @@ class JobQueue:
                 job['current_step'] = 'เริ่มต้น'
                 job['total_steps'] = 7
                 job['step_progress'] = 0
+                self.worker_jobs[worker_id] = (task_id, time.time())
+                pipeline_metrics.observe('videotranslat_job_wait_seconds', (job['started_at'] - job['created_at']).total_seconds())
+                self._publish_progress(job)
+                job_span = tracer.begin('job', trace_id=task_id, mode=task_data.get('mode', 'full'), worker=worker_id)
+                self.prefetcher.job_started(job)
+                self.prefetcher.schedule(self._upcoming_jobs())
                 
-                print(f"🔧 Worker {worker_id} เริ่มประมวลผลงาน {task_id}")
+                queue_log.info(f"🔧 Worker {worker_id} เริ่มประมวลผลงาน {task_id}")
                 
                 try:
                     # ประมวลผลงาน
                     self._process_job(job)
+                    self._record_output_hashes(job)
                     
                     # อัปเดตสถานะเสร็จสิ้น
                     job['status'] = 'completed'
@@ -361,8 +1835,11 @@ class JobQueue:
                     with self.jobs_lock:
                         if task_id in self.active_jobs:
                             del self.active_jobs[task_id]
+                    self._publish_progress(job)
+                    self._notify_job_finished(job)
+                    pipeline_metrics.inc('videotranslat_jobs_total', status='completed')
                     
-                    print(f"✅ งาน {task_id} เสร็จสิ้น")
+                    queue_log.info(f"✅ งาน {task_id} เสร็จสิ้น")
                     
                 except Exception as e:
                     # อัปเดตสถานะข้อผิดพลาด
@@ -379,39 +1856,68 @@ class JobQueue:
                         'recovery_suggestion': 'ลองรีสตาร์ทระบบหรือตรวจสอบไฟล์อินพุต'
                     }
                     
-                    print(f"❌ งาน {task_id} เกิดข้อผิดพลาด: {e}")
-                    print(f"🔧 ข้อเสนอแนะการแก้ไข: {job['error_details']['recovery_suggestion']}")
+                    # ย้ายไปยัง completed_jobs; a failed result must not be reused by the next identical submission
+                    with self.completed_lock:
+                        self.completed_jobs[task_id] = job
+                    with self.jobs_lock:
+                        self.active_jobs.pop(task_id, None)
+                        if job.get('dedup_key') and self.dedup_index.get(job['dedup_key']) == task_id:
+                            del self.dedup_index[job['dedup_key']]
+                    self._publish_progress(job)
+                    self._notify_job_finished(job)
+                    pipeline_metrics.inc('videotranslat_jobs_total', status='error')
+                    
+                    queue_log.error(f"❌ งาน {task_id} เกิดข้อผิดพลาด: {e}")
+                    queue_log.info(f"🔧 ข้อเสนอแนะการแก้ไข: {job['error_details']['recovery_suggestion']}")
                 
                 finally:
+                    self.worker_jobs.pop(worker_id, None)
+                    self.stop_profiling(task_id)
+                    self._end_step_span(task_id, job.get('error') if job['status'] == 'error' else None)
+                    job_span.set(status=job['status'])
+                    tracer.end(job_span, job.get('error') if job['status'] == 'error' else None)
+                    job['resources'] = resource_tracker.finish(task_id)
+                    
+                    # Drop a parallel video download no step ended up waiting for
+                    with self.jobs_lock:
+                        pending_video = self.video_downloads.pop(task_id, None)
+                    if pending_video is not None:
+                        self._discard_video_download(task_id, pending_video)
+                    else:
+                        self.download_cache.release(task_id)
+                    
                     # Clean up temporary files associated with this job
                     try:
                         cleanup_temp_files(job['temp_files'])
                         job['temp_files'].clear() # Clear the list after cleanup
                     except Exception as cleanup_error:
-                        print(f"⚠️ Error cleaning up temp files for {task_id}: {cleanup_error}")
+                        queue_log.warning(f"⚠️ Error cleaning up temp files for {task_id}: {cleanup_error}")
                     
                     # Memory cleanup after each job
                     try:
                         import gc
                         gc.collect()
-                        import torch
-                        if torch.cuda.is_available():
+                        if 'torch' in sys.modules and torch.cuda.is_available():
                             torch.cuda.empty_cache()
                     except Exception as mem_error:
-                        print(f"⚠️ Memory cleanup error: {mem_error}")
+                        queue_log.warning(f"⚠️ Memory cleanup error: {mem_error}")
                     
                     self.queue.task_done()
                     
             except queue.Empty:
                 continue
             except Exception as e:
-                print(f"❌ Worker {worker_id} เกิดข้อผิดพลาด: {e}")
+                queue_log.error(f"❌ Worker {worker_id} เกิดข้อผิดพลาด: {e}")
     
     def _process_job(self, job):
         """ประมวลผลงาน"""
         task_id = job['task_id']
         task_data = job['task_data']
         
+        if task_data.get('mode') == 'step_stage':
+            self._process_stage_job(job)
+            return
+        
         # Update config based on advanced options
         if task_data.get('enable_preprocessing', True):
             import config
@@ -449,18 +1955,37 @@ class JobQueue:
             self._update_progress(job, 10, "กำลังประมวลผลวิดีโอ...", "ขั้นตอนที่ 1: Video Processing", 10)
             if 'video_input' not in task_data:
                 raise Exception("video_input is required")
-            video_path = video_processor.process_video_input(
-                task_data['video_input'], 
-                task_id, 
-                task_data.get('format_id'),
-                task_data.get('realtime', False)
-            )
-            job['video_path'] = video_path
-            if self._is_new_upload(task_data['video_input']): # Only add if it's an uploaded file
-                job['temp_files'].append(video_path)
+            if video_processor._is_youtube_url(task_data['video_input']):
+                # Fetch audio first; video (if any step needs it) keeps downloading in the background
+                need_video = 'video' in self._required_streams(task_data)
+                video_path, video_future = YouTubeDownloader(cache=self.download_cache).download_streams(
+                    task_data['video_input'],
+                    task_id,
+                    task_data.get('format_id'),
+                    need_video
+                )
+                job['video_path'] = None
+                if not self.download_cache.owns(video_path):
+                    job['temp_files'].append(video_path)
+                if video_future is not None:
+                    with self.jobs_lock:
+                        self.video_downloads[task_id] = video_future
+            else:
+                video_path = video_processor.process_video_input(
+                    task_data['video_input'], 
+                    task_id, 
+                    task_data.get('format_id'),
+                    task_data.get('realtime', False)
+                )
+                job['video_path'] = video_path
+                if self._is_new_upload(task_data['video_input']): # Only add if it's an uploaded file
+                    job['temp_files'].append(video_path)
             
+        # Subtitle mode only needs STT + translation: no UVR, TTS, mixing or re-encode
+        subtitle_mode = task_data.get('output_mode', 'dub') == 'subtitles'
+        
         # Step 2: Vocal Removal (ถ้าเปิดใช้งาน)
-        enable_vocal_removal_step = task_data.get('enable_step2_vocal_removal', True)
+        enable_vocal_removal_step = task_data.get('enable_step2_vocal_removal', True) and not subtitle_mode
         if enable_vocal_removal_step:
             self._update_progress(job, 20, "กำลังแยกเสียงพูดออกจากดนตรี (UVR)...", "ขั้นตอนที่ 2: Vocal Removal", 20)
             enable_vocal_removal = task_data.get('enable_vocal_removal', False) or True
@@ -471,11 +1996,11 @@ class JobQueue:
         # Step 2: Extract audio with optional vocal removal (ไร้ขีดจำกัด)
         self._update_progress(job, 25, "กำลังแยกเสียงจากวิดีโอ (ไร้ขีดจำกัด)...", "ขั้นตอนที่ 2: Audio Extraction", 25)
         
-        print(f"🔧 Unlimited Processing Mode:")
-        print(f"   - Audio length: Unlimited")
-        print(f"   - File size: Unlimited")
-        print(f"   - Memory usage: Unlimited")
-        print(f"   - Processing time: Unlimited")
+        queue_log.debug(f"🔧 Unlimited Processing Mode:")
+        queue_log.debug(f"   - Audio length: Unlimited")
+        queue_log.debug(f"   - File size: Unlimited")
+        queue_log.debug(f"   - Memory usage: Unlimited")
+        queue_log.debug(f"   - Processing time: Unlimited")
         
         if task_data.get('realtime', False):
             audio_path = video_processor.extract_audio_realtime(video_path, task_id)
@@ -491,7 +2016,7 @@ class JobQueue:
                 job['temp_files'].extend([audio_result['vocals'], audio_result['original_audio']])
                 if audio_result['instrumental']:
                     job['temp_files'].append(audio_result['instrumental'])
-                print(f"🎵 ใช้เสียงที่แยกแล้วสำหรับ STT: {audio_result['vocals']}")
+                queue_log.info(f"🎵 ใช้เสียงที่แยกแล้วสำหรับ STT: {audio_result['vocals']}")
                 audio_path = audio_result['vocals']
             else:
                 # Normal audio extraction
@@ -499,6 +2024,10 @@ class JobQueue:
                 job['temp_files'].append(audio_result)
                 audio_path = audio_result
         
+        if subtitle_mode:
+            self._process_subtitle_job(job, video_processor, translation_service, audio_path)
+            return
+        
         # Step 3: Speech-to-Text (ถ้าเปิดใช้งาน)
         enable_stt_step = task_data.get('enable_step3_stt', True)
         if enable_stt_step:
@@ -519,12 +2048,12 @@ class JobQueue:
             job['transcription_file'] = str(transcription_file)
             job['temp_files'].append(str(transcription_file))
             
-            print(f"📝 การแปลงเสียงเป็นข้อความเสร็จสิ้น: {len(original_text)} ตัวอักษร")
+            queue_log.info(f"📝 การแปลงเสียงเป็นข้อความเสร็จสิ้น: {len(original_text)} ตัวอักษร")
         else:
             self._update_progress(job, 40, "ข้ามขั้นตอนการแปลงเสียงเป็นข้อความ...", "ขั้นตอนที่ 3: STT", 40)
             original_text = task_data.get('custom_text', '')
             job['transcription'] = original_text
-            print(f"📝 ใช้ข้อความที่กำหนดเอง: {len(original_text)} ตัวอักษร")
+            queue_log.info(f"📝 ใช้ข้อความที่กำหนดเอง: {len(original_text)} ตัวอักษร")
         
         # Step 4: Translation (ถ้าเปิดใช้งาน)
         enable_translation_step = task_data.get('enable_step4_translation', True)
@@ -537,7 +2066,8 @@ class JobQueue:
                 task_data['translation_model']
             )
             
-            translated_text = translation_result.get('translation', '')
+            # translate() / synthesize_speech() return plain strings; accept dict results too
+            translated_text = translation_result.get('translation', '') if isinstance(translation_result, dict) else translation_result
             
             # Save translation to file
             translation_file = TEXTS_DIR / f"{task_id}_translation.txt"
@@ -548,12 +2078,12 @@ class JobQueue:
             job['translation_file'] = str(translation_file)
             job['temp_files'].append(str(translation_file))
             
-            print(f"🌐 การแปลเสร็จสิ้น: {len(translated_text)} ตัวอักษร")
+            queue_log.info(f"🌐 การแปลเสร็จสิ้น: {len(translated_text)} ตัวอักษร")
         else:
             self._update_progress(job, 60, "ข้ามขั้นตอนการแปล...", "ขั้นตอนที่ 4: Translation", 60)
             translated_text = original_text
             job['translation'] = translated_text
-            print(f"🌐 ใช้ข้อความต้นฉบับ: {len(translated_text)} ตัวอักษร")
+            queue_log.info(f"🌐 ใช้ข้อความต้นฉบับ: {len(translated_text)} ตัวอักษร")
         
         # Step 5: Text-to-Speech (ถ้าเปิดใช้งาน)
         enable_tts_step = task_data.get('enable_step5_tts', True)
@@ -568,15 +2098,15 @@ class JobQueue:
                 task_data.get('custom_coqui_model')
             )
             
-            tts_audio_path = tts_result.get('tts_audio_path', '')
+            tts_audio_path = tts_result.get('tts_audio_path', '') if isinstance(tts_result, dict) else tts_result
             job['tts_audio_path'] = tts_audio_path
             if tts_audio_path:
                 job['temp_files'].append(tts_audio_path)
             
-            print(f"🔊 การแปลงข้อความเป็นเสียงเสร็จสิ้น: {tts_audio_path}")
+            queue_log.info(f"🔊 การแปลงข้อความเป็นเสียงเสร็จสิ้น: {tts_audio_path}")
         else:
             self._update_progress(job, 80, "ข้ามขั้นตอนการแปลงข้อความเป็นเสียง...", "ขั้นตอนที่ 5: TTS", 80)
-            print(f"🔊 ข้ามการแปลงข้อความเป็นเสียง")
+            queue_log.info(f"🔊 ข้ามการแปลงข้อความเป็นเสียง")
         
         # Step 6: Audio Mixing (ถ้าเปิดใช้งาน)
         enable_audio_mixing_step = task_data.get('enable_step6_audio_mixing', True)
@@ -590,24 +2120,26 @@ class JobQueue:
             
             if tts_audio_path and os.path.exists(tts_audio_path):
                 # Merge audio with video
-                final_audio_path = video_processor.merge_audio_video(
-                    job['video_path'], 
-                    tts_audio_path, 
-                    task_id, 
-                    task_data['video_speed'],
-                    instrumental_path,
-                    sync_original_audio
-                )
+                video_path = self._wait_for_video(job)
+                with pipeline_metrics.time_stage('mix'):
+                    final_audio_path = video_processor.merge_audio_video(
+                        video_path, 
+                        tts_audio_path, 
+                        task_id, 
+                        task_data['video_speed'],
+                        instrumental_path,
+                        sync_original_audio
+                    )
                 
                 job['final_audio_path'] = final_audio_path
                 job['temp_files'].append(final_audio_path)
                 
-                print(f"🎵 การผสมเสียงเสร็จสิ้น: {final_audio_path}")
+                queue_log.info(f"🎵 การผสมเสียงเสร็จสิ้น: {final_audio_path}")
             else:
-                print(f"⚠️ ไม่พบไฟล์เสียง TTS สำหรับการผสม")
+                queue_log.warning(f"⚠️ ไม่พบไฟล์เสียง TTS สำหรับการผสม")
         else:
             self._update_progress(job, 90, "ข้ามขั้นตอนการผสมเสียง...", "ขั้นตอนที่ 6: Audio Mixing", 90)
-            print(f"🎵 ข้ามการผสมเสียง")
+            queue_log.info(f"🎵 ข้ามการผสมเสียง")
         
         # Step 7: Final Video Merge (ถ้าเปิดใช้งาน)
         enable_video_merge_step = task_data.get('enable_step7_video_merge', True)
@@ -619,32 +2151,158 @@ class JobQueue:
             
             if final_audio_path and os.path.exists(final_audio_path):
                 # Create final video
-                output_path = video_processor.merge_audio_video(
-                    job['video_path'], 
-                    final_audio_path, 
-                    task_id, 
-                    task_data['video_speed']
-                )
+                video_path = self._wait_for_video(job)
+                with pipeline_metrics.time_stage('mux'):
+                    output_path = video_processor.merge_audio_video(
+                        video_path, 
+                        final_audio_path, 
+                        task_id, 
+                        task_data['video_speed']
+                    )
                 
                 job['output_path'] = output_path
                 
-                print(f"🎬 วิดีโอสุดท้ายเสร็จสิ้น: {output_path}")
+                queue_log.info(f"🎬 วิดีโอสุดท้ายเสร็จสิ้น: {output_path}")
             else:
-                print(f"⚠️ ไม่พบไฟล์เสียงสำหรับการสร้างวิดีโอสุดท้าย")
+                queue_log.warning(f"⚠️ ไม่พบไฟล์เสียงสำหรับการสร้างวิดีโอสุดท้าย")
         else:
             self._update_progress(job, 95, "ข้ามขั้นตอนการสร้างวิดีโอสุดท้าย...", "ขั้นตอนที่ 7: Video Merge", 95)
-            print(f"🎬 ข้ามการสร้างวิดีโอสุดท้าย")
+            queue_log.info(f"🎬 ข้ามการสร้างวิดีโอสุดท้าย")
         
         # Final progress update
         self._update_progress(job, 100, "ประมวลผลเสร็จสิ้น", "เสร็จสิ้น", 100)
         
-        print(f"✅ การประมวลผลงาน {task_id} เสร็จสิ้น")
+        queue_log.info(f"✅ การประมวลผลงาน {task_id} เสร็จสิ้น")
+    
+    def _process_stage_job(self, job):
+        """ประมวลผลงานขั้นตอนเดียวจากโหมดทีละขั้นตอน"""
+        task_data = job['task_data']
+        with self.jobs_lock:
+            stage_fn = self.stage_callables.pop(job['task_id'], None)
+        if stage_fn is None:
+            raise Exception("ไม่พบฟังก์ชันของขั้นตอนนี้")
+        
+        step = task_data.get('step')
+        step_label = f"ขั้นตอนที่ {step}"
+        job['total_steps'] = 1
+        self._update_progress(job, 10, f"กำลังประมวลผล{step_label}...", step_label, 10)
+        
+        result = stage_fn()
+        job['stage_result'] = result
+        if isinstance(result, dict) and result.get('output_path'):
+            job['output_path'] = result['output_path']
+        
+        self._update_progress(job, 100, f"{step_label} เสร็จสิ้น", step_label, 100)
+    
+    def _required_streams(self, task_data):
+        """สตรีมที่ pipeline ต้องใช้: เสียงเสมอ, วิดีโอเฉพาะเมื่อมีขั้นตอนที่รวมเข้ากับวิดีโอ"""
+        if task_data.get('output_mode', 'dub') == 'subtitles':
+            need_video = task_data.get('enable_step7_video_merge', True)
+        else:
+            need_video = task_data.get('enable_step6_audio_mixing', True) or task_data.get('enable_step7_video_merge', True)
+        return {'audio', 'video'} if need_video else {'audio'}
+    
+    def _record_output_hashes(self, job):
+        """Hash the files the download routes serve while the job still owns the worker"""
+        output_paths = [job.get('output_path')] + list((job.get('subtitle_paths') or {}).values())
+        for path in output_paths:
+            if path and os.path.exists(path):
+                try:
+                    record_content_hash(path)
+                except OSError as e:
+                    queue_log.warning(f"⚠️ Could not hash output {path}: {e}")
+    
+    def _discard_video_download(self, task_id, video_future):
+        """Once an uncollected video download ends: delete its muxed file and release the job's cache pins"""
+        def finish(future):
+            if not future.cancelled() and future.exception() is None:
+                video_path = future.result()
+                if not self.download_cache.owns(video_path):
+                    cleanup_temp_files([video_path])
+            self.download_cache.release(task_id)
+        
+        # Runs right away when the download has already finished
+        video_future.add_done_callback(finish)
+    
+    def _wait_for_video(self, job):
+        """รอวิดีโอที่ดาวน์โหลดคู่ขนาน (ถ้ามี) แล้วคืน path ของวิดีโอ"""
+        with self.jobs_lock:
+            video_future = self.video_downloads.pop(job['task_id'], None)
+        if video_future is not None:
+            self._update_progress(job, job['progress'], "กำลังรอดาวน์โหลดวิดีโอ...", job.get('current_step'), job.get('step_progress'))
+            job['video_path'] = video_future.result()
+            if not self.download_cache.owns(job['video_path']):
+                job['temp_files'].append(job['video_path'])
+        if not job.get('video_path'):
+            raise Exception("ไม่มีวิดีโอสำหรับขั้นตอนนี้ (ดาวน์โหลดเฉพาะเสียง)")
+        return job['video_path']
+    
+    def _process_subtitle_job(self, job, video_processor, translation_service, audio_path):
+        """โหมดซับไตเติล: STT แบบมี timestamps -> แปลทีละ segment -> SRT/WebVTT -> mux แบบ soft subtitle"""
+        task_id = job['task_id']
+        task_data = job['task_data']
+        
+        # Step 3: Speech-to-Text with timestamps
+        self._update_progress(job, 40, "กำลังแปลงเสียงเป็นข้อความพร้อม timestamps...", "ขั้นตอนที่ 3: STT", 40)
+        stt_result = video_processor.transcribe_audio_segments(
+            audio_path,
+            task_data['stt_model'],
+            task_data['source_lang'],
+            task_id
+        )
+        segments = stt_result['segments']
+        if not segments:
+            raise Exception("ไม่พบเสียงพูดสำหรับสร้างซับไตเติล")
+        
+        transcription_file = TEXTS_DIR / f"{task_id}_transcription.txt"
+        with open(transcription_file, 'w', encoding='utf-8') as f:
+            f.write(stt_result['transcription'])
+        job['transcription'] = stt_result['transcription']
+        job['transcription_file'] = str(transcription_file)
+        job['temp_files'].append(str(transcription_file))
+        
+        # Step 4: Translation per segment so cues stay aligned with the audio
+        if task_data.get('enable_step4_translation', True):
+            self._update_progress(job, 60, "กำลังแปลซับไตเติล...", "ขั้นตอนที่ 4: Translation", 60)
+            segments = translation_service.translate_segments(
+                segments,
+                task_data['source_lang'],
+                task_data['target_lang'],
+                task_data['translation_model']
+            )
+        else:
+            self._update_progress(job, 60, "ข้ามขั้นตอนการแปล...", "ขั้นตอนที่ 4: Translation", 60)
+            segments = [dict(segment, translation=segment['text']) for segment in segments]
+        
+        job['translation'] = '\n'.join(segment['translation'] for segment in segments if segment['translation'])
+        
+        # Step 5: Subtitle files instead of TTS
+        self._update_progress(job, 85, "กำลังสร้างไฟล์ซับไตเติล SRT/WebVTT...", "ขั้นตอนที่ 5: Subtitles", 85)
+        subtitle_lang = task_data['target_lang'] if task_data.get('enable_step4_translation', True) else task_data['source_lang']
+        job['subtitle_paths'] = SubtitleExporter().write_subtitles(segments, task_id, subtitle_lang)
+        
+        # Step 7: Soft subtitle mux with stream copy
+        if task_data.get('enable_step7_video_merge', True):
+            self._update_progress(job, 95, "กำลังใส่ซับไตเติลลงในวิดีโอ (ไม่ re-encode)...", "ขั้นตอนที่ 7: Subtitle Mux", 95)
+            video_path = self._wait_for_video(job)
+            with pipeline_metrics.time_stage('mux', output_mode='subtitles'):
+                job['output_path'] = video_processor.mux_subtitles(video_path, job['subtitle_paths'], task_id)
+        else:
+            self._update_progress(job, 95, "ข้ามขั้นตอนการใส่ซับไตเติลลงในวิดีโอ...", "ขั้นตอนที่ 7: Subtitle Mux", 95)
+        
+        self._update_progress(job, 100, "ประมวลผลซับไตเติลเสร็จสิ้น", "เสร็จสิ้น", 100)
+        queue_log.info(f"✅ การประมวลผลซับไตเติลงาน {task_id} เสร็จสิ้น")
     
     def _update_progress(self, job, progress, message, current_step=None, step_progress=None):
         """อัปเดตความคืบหน้า"""
         job['progress'] = progress
         job['message'] = message
         if current_step:
+            if current_step != job.get('current_step') and tracer.current_trace_id() == job['task_id']:
+                # One trace span per pipeline step, opened on the worker thread that runs it
+                self._end_step_span(job['task_id'])
+                self.step_spans[job['task_id']] = tracer.begin(current_step, kind='step')
+                resource_tracker.begin_stage(job['task_id'], current_step)
             job['current_step'] = current_step
         if step_progress is not None:
             job['step_progress'] = step_progress
@@ -652,14 +2310,275 @@ class JobQueue:
         # เพิ่ม timestamp สำหรับ tracking
         job['last_update'] = datetime.now().isoformat()
         
+        self._publish_progress(job)
+        
         # Log progress สำหรับ debugging
-        print(f"📊 Job {job['task_id']}: {progress}% - {message}")
+        queue_log.debug(f"📊 {current_step or 'Progress'}: {progress}% - {message}")
+    
+    def start_profiling(self, task_id):
+        """Attach a sampling profiler to a queued or running job (returns its summary, None if unknown)"""
+        job = self.get_job_status(task_id)
+        if job is None or job['status'] in PROGRESS_TERMINAL_STATES:
+            return None
+        
+        with self.jobs_lock:
+            profiler = self.profilers.get(job['task_id'])
+            if profiler is None or profiler.stopped_at is not None:
+                profiler = self.profilers[job['task_id']] = JobProfiler(job['task_id'])
+                profiler.start()
+        return profiler.summary()
+    
+    def stop_profiling(self, task_id):
+        """Stop the job's profiler and write its collapsed stacks (None if it was never profiled)"""
+        with self.jobs_lock:
+            task_id = self.job_aliases.get(task_id, task_id)
+            profiler = self.profilers.get(task_id)
+        return profiler.stop() if profiler is not None else None
+    
+    def get_profile(self, task_id):
+        with self.jobs_lock:
+            profiler = self.profilers.get(self.job_aliases.get(task_id, task_id))
+        if profiler is None:
+            return None
+        if profiler.stopped_at is None:
+            profiler.write()  # Snapshot so a running profile can be downloaded too
+        return profiler
+    
+    def _end_step_span(self, task_id, error=None):
+        span = self.step_spans.pop(task_id, None)
+        if span is not None:
+            resource_tracker.end_stage(task_id, span.name)
+            tracer.end(span, error)
+    
+    def progress_event(self, job):
+        """Compact progress event (what SSE subscribers receive instead of the whole job dict)"""
+        return {
+            'task_id': job['task_id'],
+            'status': job['status'],
+            'progress': job.get('progress', 0),
+            'message': job.get('message', ''),
+            'stage': job.get('current_step'),
+            'step_progress': job.get('step_progress'),
+            'error': job.get('error')
+        }
+    
+    def status_projection(self, job):
+        """Fixed-size status for polling: state, progress, stage, ETA and artifact flags (no large text)"""
+        eta_seconds = None
+        progress = job.get('progress', 0) or 0
+        if job['status'] == 'processing' and job.get('started_at') and 0 < progress < 100:
+            elapsed = (datetime.now() - job['started_at']).total_seconds()
+            eta_seconds = round(elapsed * (100 - progress) / progress, 1)
+        
+        subtitle_paths = job.get('subtitle_paths') or {}
+        return {
+            'task_id': job['task_id'],
+            'status': job['status'],
+            'progress': progress,
+            'message': job.get('message', ''),
+            'stage': job.get('current_step'),
+            'step_progress': job.get('step_progress'),
+            'total_steps': job.get('total_steps'),
+            'eta_seconds': eta_seconds,
+            'created_at': job['created_at'].isoformat() if job.get('created_at') else None,
+            'started_at': job['started_at'].isoformat() if job.get('started_at') else None,
+            'completed_at': job['completed_at'].isoformat() if job.get('completed_at') else None,
+            'error': job.get('error'),
+            'artifacts': {
+                'transcription': bool(job.get('transcription')),
+                'translation': bool(job.get('translation')),
+                'tts_audio': bool(job.get('tts_audio_path')) and os.path.exists(job['tts_audio_path']),
+                'output': bool(job.get('output_path')) and os.path.exists(job['output_path']),
+                'subtitles': sorted(fmt for fmt, path in subtitle_paths.items() if os.path.exists(path))
+            },
+            'result': job.get('stage_result')
+        }
+    
+    def _publish_progress(self, job):
+        self.progress_events.publish(job['task_id'], self.progress_event(job))
+    
+    def _job_webhook_payload(self, job):
+        events = {'completed': 'job.completed', 'error': 'job.failed', 'stopped': 'job.stopped'}
+        payload = self.status_projection(job)
+        payload['event'] = events.get(job['status'], f"job.{job['status']}")
+        payload['batch_id'] = job['task_data'].get('batch_id')
+        return payload
+    
+    def _notify_job_finished(self, job):
+        """Fire per-job webhooks and, when this was the last job of its batch, the batch webhook"""
+        with self.jobs_lock:
+            # A stopped job's worker may still finish later - notify only once
+            if job.get('finish_notified'):
+                return
+            job['finish_notified'] = True
+        
+        payload = self._job_webhook_payload(job)
+        for url in list(job.get('webhook_urls', [])):
+            self.webhooks.notify(url, payload)
+        
+        with self.jobs_lock:
+            finished_batches = [
+                self.batches[batch_id] for batch_id in self.batch_index.get(job['task_id'], ())
+                if batch_id in self.batches and job['task_id'] not in self.batches[batch_id]['finished']
+            ]
+            for batch in finished_batches:
+                batch['finished'].add(job['task_id'])
+        
+        for batch in finished_batches:
+            self._maybe_finish_batch(batch)
+    
+    def register_batch(self, batch_id, task_ids, webhook_url=None):
+        """Track a batch of jobs; jobs that already finished (e.g. deduplicated) count immediately
+        
+        The scan and the insert share one jobs_lock section: a job that finishes meanwhile is
+        either already marked finish_notified here or finds the batch in _notify_job_finished.
+        """
+        with self.jobs_lock:
+            self._prune_batches_locked()
+            task_ids = [self.job_aliases.get(task_id, task_id) for task_id in task_ids]
+            batch = {
+                'batch_id': batch_id,
+                'task_ids': task_ids,
+                'webhook_url': webhook_url,
+                'created_at': datetime.now(),
+                'finished_at': None,
+                'finished': set(),
+                'notified': False
+            }
+            
+            for task_id in task_ids:
+                job = self.active_jobs.get(task_id)
+                if job is None:
+                    with self.completed_lock:
+                        job = self.completed_jobs.get(task_id)
+                # A stopped job has left both dicts and will never be notified again
+                if job is None or job.get('finish_notified'):
+                    batch['finished'].add(task_id)
+            
+            self.batches[batch_id] = batch
+            for task_id in set(task_ids):
+                self.batch_index.setdefault(task_id, []).append(batch_id)
+        
+        self._maybe_finish_batch(batch)
+        return batch
+    
+    def _prune_batches_locked(self):
+        """Forget batches finished longer ago than RESULT_DEDUP_RETENTION (caller holds jobs_lock)"""
+        now = datetime.now()
+        expired = [
+            batch_id for batch_id, batch in self.batches.items()
+            if batch['finished_at'] and (now - batch['finished_at']).total_seconds() > RESULT_DEDUP_RETENTION
+        ]
+        for batch_id in expired:
+            for task_id in set(self.batches.pop(batch_id)['task_ids']):
+                batch_ids = self.batch_index.get(task_id, [])
+                if batch_id in batch_ids:
+                    batch_ids.remove(batch_id)
+                if not batch_ids:
+                    self.batch_index.pop(task_id, None)
+    
+    def _maybe_finish_batch(self, batch):
+        with self.jobs_lock:
+            if batch['notified'] or len(batch['finished']) < len(set(batch['task_ids'])):
+                return
+            batch['notified'] = True
+            batch['finished_at'] = datetime.now()
+        
+        queue_log.info(f"📦 Batch {batch['batch_id']} เสร็จสิ้น ({len(batch['task_ids'])} งาน)")
+        if batch['webhook_url']:
+            payload = self.get_batch_status(batch['batch_id'])
+            payload['event'] = 'batch.completed'
+            self.webhooks.notify(batch['webhook_url'], payload)
+    
+    def get_batch_status(self, batch_id):
+        """Batch summary: counts per state plus the status projection of every job"""
+        with self.jobs_lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        
+        jobs = []
+        counts = {}
+        for task_id in batch['task_ids']:
+            job = self.get_job_status(task_id)
+            projection = self.status_projection(job) if job else {'task_id': task_id, 'status': 'unknown'}
+            counts[projection['status']] = counts.get(projection['status'], 0) + 1
+            jobs.append(projection)
+        
+        return {
+            'batch_id': batch_id,
+            'created_at': batch['created_at'].isoformat(),
+            'total': len(jobs),
+            'finished': len(batch['finished']),
+            'done': batch['notified'],
+            'counts': counts,
+            'jobs': jobs
+        }
+    
+    def _input_fingerprint(self, task_data):
+        """Content fingerprint of the job input: upload hash or YouTube video id"""
+        if task_data.get('input_fingerprint'):
+            return task_data['input_fingerprint']
+        
+        video_input = task_data.get('video_input', '')
+        if video_input and any(re.match(pattern, video_input) for pattern in YOUTUBE_PATTERNS):
+            video_id = YouTubeDownloader().extract_video_id(video_input)
+            if video_id:
+                return f"youtube:{video_id}"
+        return None
+    
+    def _dedup_key(self, task_data):
+        """Dedup key = input fingerprint + canonicalized processing parameters (None if not deduplicable)"""
+        fingerprint = self._input_fingerprint(task_data)
+        if not fingerprint or 'custom_text' in task_data:
+            return None
         
-        print(f"📊 {current_step or 'Progress'}: {progress}% - {message}")
+        params = {}
+        for key in RESULT_DEDUP_PARAM_KEYS:
+            value = task_data.get(key)
+            if isinstance(value, str) and value.lower() in ('true', 'false'):
+                value = value.lower() == 'true'
+            elif key == 'video_speed' and value is not None:
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    pass
+            params[key] = value
+        
+        canonical = json.dumps({'input': fingerprint, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    def _find_duplicate_locked(self, dedup_key):
+        """Find an in-flight or still-valid finished job with the same dedup key (caller holds jobs_lock)"""
+        task_id = self.dedup_index.get(dedup_key)
+        if task_id is None:
+            return None
+        
+        job = self.active_jobs.get(task_id)
+        if job is not None and job['status'] in ('queued', 'processing'):
+            return job
+        
+        if job is None:
+            with self.completed_lock:
+                job = self.completed_jobs.get(task_id)
+        
+        if job is not None and job['status'] == 'completed' and job.get('completed_at'):
+            age = (datetime.now() - job['completed_at']).total_seconds()
+            result_paths = [job.get('output_path')] + list((job.get('subtitle_paths') or {}).values())
+            if age <= RESULT_DEDUP_RETENTION and all(os.path.exists(path) for path in result_paths if path):
+                return job
+        
+        # Expired, failed or result files gone - forget it so the next submission reprocesses
+        del self.dedup_index[dedup_key]
+        for alias, original in list(self.job_aliases.items()):
+            if original == task_id:
+                del self.job_aliases[alias]
+        return None
     
     def get_job_status(self, task_id):
         """ดึงสถานะงาน"""
         with self.jobs_lock:
+            task_id = self.job_aliases.get(task_id, task_id)
             if task_id in self.active_jobs:
                 return self.active_jobs[task_id]
         
@@ -669,6 +2588,19 @@ class JobQueue:
         
         return None
     
+    def get_worker_status(self):
+        """สถานะของแต่ละ worker: งานที่กำลังทำและเวลาที่ใช้ไป"""
+        now = time.time()
+        worker_jobs = dict(self.worker_jobs)
+        return [
+            {
+                'worker_id': worker_id,
+                'task_id': worker_jobs[worker_id][0] if worker_id in worker_jobs else None,
+                'busy_seconds': round(now - worker_jobs[worker_id][1], 1) if worker_id in worker_jobs else 0
+            }
+            for worker_id in range(self.max_concurrent)
+        ]
+    
     def get_queue_status(self):
         """ดึงสถานะคิว"""
         with self.jobs_lock:
@@ -711,7 +2643,9 @@ class JobQueue:
         for worker in self.workers:
             worker.join(timeout=5)
         
-        print("🛑 Job queue stopped")
+        self.webhooks.stop()
+        self.prefetcher.stop()
+        queue_log.info("🛑 Job queue stopped")
     
     def stop_job(self, task_id):
         """หยุดการทำงานของ job ที่ระบุ"""
@@ -727,18 +2661,21 @@ class JobQueue:
                     try:
                         cleanup_temp_files(job.get('temp_files', []))
                     except Exception as e:
-                        print(f"⚠️ Error cleaning up temp files for stopped job {task_id}: {e}")
+                        queue_log.warning(f"⚠️ Error cleaning up temp files for stopped job {task_id}: {e}")
                     
                     # Remove from active jobs
                     del self.active_jobs[task_id]
+                    self._publish_progress(job)
                     
-                    print(f"🛑 หยุดการทำงานของ job {task_id}")
-                    return True
+                    queue_log.info(f"🛑 หยุดการทำงานของ job {task_id}")
                 else:
-                    print(f"⚠️ ไม่พบ job {task_id} ใน active jobs")
+                    queue_log.warning(f"⚠️ ไม่พบ job {task_id} ใน active jobs")
                     return False
+            
+            self._notify_job_finished(job)
+            return True
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการหยุด job {task_id}: {e}")
+            queue_log.error(f"❌ เกิดข้อผิดพลาดในการหยุด job {task_id}: {e}")
             return False
     
     def stop_all_jobs(self):
@@ -752,10 +2689,10 @@ class JobQueue:
                 if self.stop_job(task_id):
                     stopped_count += 1
             
-            print(f"🛑 หยุดการทำงานของ job ทั้งหมด {stopped_count} jobs")
+            queue_log.info(f"🛑 หยุดการทำงานของ job ทั้งหมด {stopped_count} jobs")
             return stopped_count
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการหยุด job ทั้งหมด: {e}")
+            queue_log.error(f"❌ เกิดข้อผิดพลาดในการหยุด job ทั้งหมด: {e}")
             return 0
     
     def _timeout_monitor(self):
@@ -776,22 +2713,153 @@ class JobQueue:
                 
                 # Stop timed out jobs
                 for task_id in jobs_to_stop:
-                    print(f"⏰ Job {task_id} timed out after {self.job_timeout} seconds")
+                    queue_log.info(f"⏰ Job {task_id} timed out after {self.job_timeout} seconds")
                     self.stop_job(task_id)
                     
             except Exception as e:
-                print(f"⚠️ Timeout monitor error: {e}")
+                queue_log.warning(f"⚠️ Timeout monitor error: {e}")
     
     def _is_new_upload(self, video_input):
         """ตรวจสอบว่าเป็นไฟล์อัปโหลดใหม่หรือไม่"""
         return video_input.startswith(str(UPLOADS_DIR))
 
+class YouTubeDownloadCache:
+    """Disk cache for YouTube downloads keyed by (video id, format) with LRU eviction under a byte quota
+    
+    Concurrent requests for the same key are coalesced: one caller downloads, the rest wait on it.
+    Files are pinned per owner (task_id) while a job uses them and never evicted until released.
+    """
+    
+    def __init__(self, cache_dir=YOUTUBE_CACHE_DIR, max_bytes=YOUTUBE_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> {'path', 'size'}, least recently used first
+        self.in_flight = {}  # key -> Future of the download in progress
+        self.owners = {}  # owner -> set of pinned keys
+        self._load_existing()
+    
+    def _load_existing(self):
+        """Rebuild the index from files left by a previous run (LRU order from mtime)"""
+        files = []
+        for file_path in self.cache_dir.iterdir():
+            parts = file_path.name.split('.')
+            if not file_path.is_file() or len(parts) != 3 or parts[-1] in ('part', 'ytdl'):
+                continue
+            files.append((file_path.stat().st_mtime, (parts[0], parts[1]), file_path))
+        
+        for _, key, file_path in sorted(files):
+            self.entries[key] = {'path': str(file_path), 'size': file_path.stat().st_size}
+        
+        if self.entries:
+            total_size = sum(entry['size'] for entry in self.entries.values())
+            download_log.info(f"📦 YouTube cache: {len(self.entries)} files ({total_size / (1024 * 1024):.1f}MB)")
+    
+    def _make_key(self, video_id, format_selector):
+        return (video_id, hashlib.sha1(str(format_selector).encode('utf-8')).hexdigest()[:12])
+    
+    def owns(self, file_path):
+        """Check whether a path lives in the cache (and must not be deleted as a temp file)"""
+        return Path(file_path).resolve().parent == self.cache_dir.resolve()
+    
+    def get_or_download(self, video_id, format_selector, download_fn, owner=None):
+        """Return the cached file for (video_id, format_selector), downloading it at most once
+        
+        download_fn(output_base) must download into output_base + '.<ext>' and return the final path.
+        """
+        key = self._make_key(video_id, format_selector)
+        
+        with self.lock:
+            if owner is not None:
+                self.owners.setdefault(owner, set()).add(key)
+            
+            entry = self.entries.get(key)
+            if entry and os.path.exists(entry['path']):
+                self.entries.move_to_end(key)
+                try:
+                    os.utime(entry['path'])
+                except OSError:
+                    pass
+                download_log.info(f"📦 YouTube cache hit: {video_id} ({format_selector})")
+                pipeline_metrics.inc('videotranslat_cache_requests_total', cache='youtube', result='hit')
+                return entry['path']
+            self.entries.pop(key, None)
+            
+            future = self.in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = concurrent.futures.Future()
+                self.in_flight[key] = future
+        
+        if not is_leader:
+            download_log.info(f"⏳ รอการดาวน์โหลดที่กำลังทำอยู่: {video_id} ({format_selector})")
+            pipeline_metrics.inc('videotranslat_cache_requests_total', cache='youtube', result='coalesced')
+            return future.result()
+        
+        pipeline_metrics.inc('videotranslat_cache_requests_total', cache='youtube', result='miss')
+        
+        try:
+            file_path = download_fn(str(self.cache_dir / f"{key[0]}.{key[1]}"))
+            with self.lock:
+                self.entries[key] = {'path': file_path, 'size': os.path.getsize(file_path)}
+                self.in_flight.pop(key, None)
+                self._evict_locked()
+            future.set_result(file_path)
+            return file_path
+        except Exception as e:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+    
+    def release(self, owner):
+        """Unpin every file held by owner so it becomes evictable"""
+        with self.lock:
+            self.owners.pop(owner, None)
+            self._evict_locked()
+    
+    def _evict_locked(self):
+        """Evict least recently used, unpinned files until the cache fits the quota (caller holds lock)"""
+        total_size = sum(entry['size'] for entry in self.entries.values())
+        if total_size <= self.max_bytes:
+            return
+        
+        pinned = set().union(*self.owners.values()) if self.owners else set()
+        for key in list(self.entries.keys()):
+            if total_size <= self.max_bytes:
+                break
+            if key in pinned:
+                continue
+            entry = self.entries.pop(key)
+            total_size -= entry['size']
+            try:
+                os.remove(entry['path'])
+                download_log.info(f"🗑️  YouTube cache evicted: {entry['path']}")
+            except OSError as e:
+                download_log.warning(f"⚠️  ไม่สามารถลบไฟล์ cache {entry['path']}: {e}")
+
 class YouTubeDownloader:
     """YouTube video downloader with resolution selection"""
     
-    def __init__(self):
+    def __init__(self, cache=None):
         self.temp_dir = TEMP_DIR
         self.temp_dir.mkdir(exist_ok=True)
+        self.cache = cache
+    
+    def extract_video_id(self, url):
+        """Extract YouTube video ID from URL (None if it cannot be found)"""
+        patterns = [
+            r'youtube\.com/watch\?(?:.*&)?v=([\w-]+)',
+            r'youtu\.be/([\w-]+)',
+            r'youtube\.com/embed/([\w-]+)',
+            r'youtube\.com/v/([\w-]+)'
+        ]
+        for pattern in patterns:
+            match = re.search(pattern, url)
+            if match:
+                return match.group(1)
+        return None
     
     def get_video_info(self, url):
         """Get YouTube video information"""
@@ -830,40 +2898,147 @@ class YouTubeDownloader:
         except Exception as e:
             raise Exception(f"Error getting video info: {str(e)}")
     
-    def download_video(self, url, format_id=None, task_id=None):
-        """Download YouTube video with specified format"""
+    def download_video(self, url, format_id=None, task_id=None):
+        """Download YouTube video with specified format"""
+        try:
+            output_path = self.temp_dir / f"{task_id}_youtube_video.mp4"
+            
+            ydl_opts = {
+                'outtmpl': str(output_path),
+                'quiet': False,
+                'progress_hooks': [self._progress_hook],
+                'concurrent_fragment_downloads': YOUTUBE_CONCURRENT_FRAGMENTS,
+            }
+            
+            if format_id:
+                ydl_opts['format'] = format_id
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.download([url])
+            
+            if output_path.exists():
+                return str(output_path)
+            else:
+                raise Exception("Downloaded file not found")
+                
+        except Exception as e:
+            raise Exception(f"Error downloading video: {str(e)}")
+    
+    def download_streams(self, url, task_id, format_id=None, need_video=True):
+        """Download only the streams the pipeline needs
+        
+        The audio stream is always fetched on its own (best-audio, no video bytes) and this
+        call returns as soon as it lands, so audio processing can start right away.
+        When need_video is True the video stream is downloaded in parallel and the returned
+        future resolves to a playable video file (muxed with the audio via stream copy).
+        
+        Returns (audio_path, video_future) - video_future is None for audio-only runs.
+        """
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        try:
+            audio_future = executor.submit(
+                tracer.wrap(self._cached_download, 'download_audio'), url, YOUTUBE_AUDIO_FORMAT, f"{task_id}_youtube_audio", task_id
+            )
+            
+            video_future = None
+            if need_video:
+                video_future = executor.submit(tracer.wrap(self._download_video_stream, 'download_video'), url, task_id, format_id, audio_future)
+            
+            try:
+                audio_path = audio_future.result()
+            except Exception:
+                # Nobody will collect the video now: let it end before the caller releases the cache pins
+                if video_future is not None and not video_future.cancel():
+                    concurrent.futures.wait([video_future])
+                    if video_future.exception() is None and not (self.cache and self.cache.owns(video_future.result())):
+                        cleanup_temp_files([video_future.result()])
+                raise
+            download_log.debug(f"✅ YouTube audio ready: {audio_path}" + (" (video still downloading)" if video_future and not video_future.done() else ""))
+            return audio_path, video_future
+        finally:
+            executor.shutdown(wait=False)
+    
+    def _download_video_stream(self, url, task_id, format_id, audio_future):
+        """Download the video stream and mux it with the audio stream (no re-encode)"""
+        if format_id:
+            # Formats listed by get_video_info are already muxed (audio + video)
+            return self._cached_download(url, format_id, f"{task_id}_youtube_video", task_id)
+        
+        video_only_path = self._cached_download(url, YOUTUBE_VIDEO_FORMAT, f"{task_id}_youtube_video_only", task_id)
+        try:
+            # Raises when the audio download failed; the video-only file is removed either way
+            audio_path = audio_future.result()
+            
+            # MP4 can hold H.264/AAC directly; anything else (VP9/Opus) goes into MKV
+            mp4_compatible = Path(video_only_path).suffix.lower() == '.mp4' and Path(audio_path).suffix.lower() in ('.m4a', '.mp4')
+            output_path = self.temp_dir / f"{task_id}_youtube_video{'.mp4' if mp4_compatible else '.mkv'}"
+            
+            cmd = [
+                'ffmpeg', '-i', video_only_path, '-i', audio_path,
+                '-map', '0:v:0', '-map', '1:a:0',
+                '-c', 'copy',
+                '-y', str(output_path)
+            ]
+            result = run_subprocess(cmd, capture_output=True, text=True)
+        finally:
+            if not (self.cache and self.cache.owns(video_only_path)):
+                try:
+                    os.remove(video_only_path)
+                except OSError:
+                    pass
+        
+        if result.returncode != 0 or not output_path.exists():
+            raise Exception(f"Error muxing YouTube streams: {result.stderr}")
+        
+        download_log.debug(f"✅ YouTube video ready: {output_path}")
+        return str(output_path)
+    
+    def _cached_download(self, url, format_selector, basename, task_id):
+        """Download through the shared cache when the video id is known, else into TEMP_DIR"""
+        video_id = self.extract_video_id(url) if self.cache else None
+        if video_id is None:
+            return self._download_format(url, format_selector, str(self.temp_dir / basename))
+        
+        return self.cache.get_or_download(
+            video_id,
+            format_selector,
+            lambda output_base: self._download_format(url, format_selector, output_base),
+            owner=task_id
+        )
+    
+    def _download_format(self, url, format_selector, output_base):
+        """Download a single yt-dlp format selection to output_base.<ext> and return the file path"""
         try:
-            output_path = self.temp_dir / f"{task_id}_youtube_video.mp4"
-            
             ydl_opts = {
-                'outtmpl': str(output_path),
+                'outtmpl': f"{output_base}.%(ext)s",
+                'format': format_selector,
                 'quiet': False,
                 'progress_hooks': [self._progress_hook],
+                'concurrent_fragment_downloads': YOUTUBE_CONCURRENT_FRAGMENTS,
             }
             
-            if format_id:
-                ydl_opts['format'] = format_id
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            with pipeline_metrics.time_stage('download'), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                file_path = ydl.prepare_filename(info)
             
-            if output_path.exists():
-                return str(output_path)
+            if os.path.exists(file_path):
+                resource_tracker.charge(network_bytes=os.path.getsize(file_path))
+                return file_path
             else:
                 raise Exception("Downloaded file not found")
                 
         except Exception as e:
-            raise Exception(f"Error downloading video: {str(e)}")
+            raise Exception(f"Error downloading {format_selector}: {str(e)}")
     
     def _progress_hook(self, d):
         """Progress hook for YouTube download"""
         if d['status'] == 'downloading':
             if 'total_bytes' in d and d['total_bytes']:
                 percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                print(f"📥 YouTube Download: {percent:.1f}%")
+                download_log.debug(f"📥 YouTube Download: {percent:.1f}%")
             elif 'total_bytes_estimate' in d and d['total_bytes_estimate']:
                 percent = (d['downloaded_bytes'] / d['total_bytes_estimate']) * 100
-                print(f"📥 YouTube Download: {percent:.1f}% (estimate)")
+                download_log.debug(f"📥 YouTube Download: {percent:.1f}% (estimate)")
 
 class VideoProcessor:
     """Video processing service with enhanced memory management and GPU support"""
@@ -880,7 +3055,7 @@ class VideoProcessor:
         # Determine device for GPU acceleration
         import torch
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        print(f"🎬 VideoProcessor initialized with device: {self.device}")
+        video_log.debug(f"🎬 VideoProcessor initialized with device: {self.device}")
     
     def _cleanup_memory(self):
         """Enhanced memory cleanup with better error handling and cooldown"""
@@ -897,9 +3072,9 @@ class VideoProcessor:
                 torch.cuda.empty_cache()
             
             self.last_cleanup_time = current_time
-            print("🧹 Memory cleanup completed")
+            video_log.debug("🧹 Memory cleanup completed")
         except Exception as e:
-            print(f"⚠️ Memory cleanup error: {e}")
+            video_log.warning(f"⚠️ Memory cleanup error: {e}")
     
     def _should_cleanup_memory(self):
         """Check if memory cleanup is needed with reduced frequency"""
@@ -913,7 +3088,7 @@ class VideoProcessor:
     def process_video_input(self, video_input, task_id, format_id=None, realtime=False):
         """Process video input with memory optimization"""
         try:
-            print(f"🎬 Processing video input: {video_input}")
+            video_log.debug(f"🎬 Processing video input: {video_input}")
             
             if self._is_youtube_url(video_input):
                 if realtime:
@@ -931,13 +3106,13 @@ class VideoProcessor:
                     raise Exception(f"Video file not found: {video_input}")
                     
         except Exception as e:
-            print(f"❌ Error processing video input: {e}")
+            video_log.error(f"❌ Error processing video input: {e}")
             raise
     
     def _process_youtube_realtime(self, youtube_url, task_id, format_id=None):
         """Process YouTube URL in real-time mode with memory optimization"""
         try:
-            print(f"📺 Processing YouTube URL in real-time: {youtube_url}")
+            video_log.debug(f"📺 Processing YouTube URL in real-time: {youtube_url}")
             
             downloader = YouTubeDownloader()
             video_path = downloader.download_video(youtube_url, format_id, task_id)
@@ -945,7 +3120,7 @@ class VideoProcessor:
             return video_path
             
         except Exception as e:
-            print(f"❌ Error in YouTube real-time processing: {e}")
+            video_log.error(f"❌ Error in YouTube real-time processing: {e}")
             raise
     
     def _is_youtube_url(self, url):
@@ -955,7 +3130,7 @@ class VideoProcessor:
     def create_video_preview(self, video_path, task_id):
         """Create video preview with memory optimization"""
         try:
-            print(f"🎬 Creating video preview for: {video_path}")
+            video_log.debug(f"🎬 Creating video preview for: {video_path}")
             
             if not os.path.exists(video_path):
                 raise Exception(f"Video file not found: {video_path}")
@@ -972,23 +3147,23 @@ class VideoProcessor:
                 '-y', str(preview_path)
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode == 0 and os.path.exists(preview_path):
-                print(f"✅ Preview created: {preview_path}")
+                video_log.debug(f"✅ Preview created: {preview_path}")
                 return str(preview_path)
             else:
-                print(f"⚠️ Preview creation failed: {result.stderr}")
+                video_log.warning(f"⚠️ Preview creation failed: {result.stderr}")
                 return None
                 
         except Exception as e:
-            print(f"❌ Error creating video preview: {e}")
+            video_log.error(f"❌ Error creating video preview: {e}")
             return None
     
     def extract_audio(self, video_path, task_id, enable_vocal_removal=False):
         """Extract audio with enhanced memory management"""
         try:
-            print(f"🎵 Extracting audio from: {video_path}")
+            video_log.debug(f"🎵 Extracting audio from: {video_path}")
             
             if not os.path.exists(video_path):
                 raise Exception(f"Video file not found: {video_path}")
@@ -1005,18 +3180,20 @@ class VideoProcessor:
                 '-y', str(audio_path)
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            with pipeline_metrics.time_stage('extract'):
+                result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode != 0 or not os.path.exists(audio_path):
                 raise Exception(f"Audio extraction failed: {result.stderr}")
             
-            print(f"✅ Audio extracted: {audio_path}")
+            video_log.debug(f"✅ Audio extracted: {audio_path}")
             
             # Apply vocal removal if enabled
             if enable_vocal_removal:
-                print("🎤 Applying vocal removal...")
+                video_log.debug("🎤 Applying vocal removal...")
                 vocal_remover = UltimateVocalRemover()
-                separation_result = vocal_remover.separate_audio(str(audio_path), task_id)
+                with pipeline_metrics.time_stage('uvr'):
+                    separation_result = vocal_remover.separate_audio(str(audio_path), task_id)
                 
                 # Memory cleanup after vocal removal (only if needed)
                 if self._should_cleanup_memory():
@@ -1027,7 +3204,7 @@ class VideoProcessor:
                     # Store in global task data for later use
                     if hasattr(self, 'tasks_data') and task_id in self.tasks_data:
                         self.tasks_data[task_id]['instrumental_path'] = separation_result['instrumental_path']
-                    print(f"🎵 เก็บเส้นทางดนตรีสำหรับการรวมวิดีโอ: {separation_result['instrumental_path']}")
+                    video_log.debug(f"🎵 เก็บเส้นทางดนตรีสำหรับการรวมวิดีโอ: {separation_result['instrumental_path']}")
                 
                 # Return vocals path for transcription
                 if separation_result and separation_result.get('vocals'):
@@ -1037,15 +3214,15 @@ class VideoProcessor:
                     try:
                         vocals_audio, vocals_sr = librosa.load(vocals_path, sr=None)
                         vocals_rms = np.sqrt(np.mean(vocals_audio**2))
-                        print(f"🎤 เสียงร้องที่แยกแล้ว: {len(vocals_audio)/vocals_sr:.1f}s, RMS: {vocals_rms:.6f}")
+                        video_log.debug(f"🎤 เสียงร้องที่แยกแล้ว: {len(vocals_audio)/vocals_sr:.1f}s, RMS: {vocals_rms:.6f}")
                         
                         if vocals_rms < 0.0001:
-                            print("⚠️  เสียงร้องที่แยกแล้วเงียบมาก ใช้ไฟล์เสียงต้นฉบับ")
+                            video_log.warning("⚠️  เสียงร้องที่แยกแล้วเงียบมาก ใช้ไฟล์เสียงต้นฉบับ")
                             return str(audio_path)
                         else:
                             return vocals_path
                     except Exception as e:
-                        print(f"⚠️  ไม่สามารถตรวจสอบไฟล์เสียงร้อง: {e}")
+                        video_log.warning(f"⚠️  ไม่สามารถตรวจสอบไฟล์เสียงร้อง: {e}")
                         return str(audio_path)
                 else:
                     return str(audio_path)
@@ -1053,25 +3230,25 @@ class VideoProcessor:
                 return str(audio_path)
                 
         except Exception as e:
-            print(f"❌ Error extracting audio: {e}")
+            video_log.error(f"❌ Error extracting audio: {e}")
             raise
     
     def extract_audio_realtime(self, video_path, task_id):
         """Extract audio in real-time mode with memory optimization"""
         try:
-            print(f"🎵 Extracting audio in real-time from: {video_path}")
+            video_log.debug(f"🎵 Extracting audio in real-time from: {video_path}")
             
             # Use the same extraction as normal mode but with memory optimization
             return self.extract_audio(video_path, task_id, enable_vocal_removal=False)
             
         except Exception as e:
-            print(f"❌ Error in real-time audio extraction: {e}")
+            video_log.error(f"❌ Error in real-time audio extraction: {e}")
             raise
     
     def transcribe_audio(self, audio_path, model_name, source_lang, task_id, task='transcribe', target_lang=None):
         """Transcribe audio with enhanced memory management and chunk timeout"""
         try:
-            print(f"🎧 Transcribing audio: {audio_path} (task: {task})")
+            stt_log.debug(f"🎧 Transcribing audio: {audio_path} (task: {task})")
             stt_start_time = time.time()
             
             if not os.path.exists(audio_path):
@@ -1083,61 +3260,39 @@ class VideoProcessor:
             # Debug audio information
             audio_duration = len(audio) / sr
             audio_rms = np.sqrt(np.mean(audio**2))
-            print(f"🎵 ไฟล์เสียง: {audio_path}")
-            print(f"🎵 ความยาว: {audio_duration:.1f} วินาที")
-            print(f"🎵 ระดับเสียง RMS: {audio_rms:.6f}")
-            print(f"🎵 Sample Rate: {sr} Hz")
+            stt_log.debug(f"🎵 ไฟล์เสียง: {audio_path}")
+            stt_log.debug(f"🎵 ความยาว: {audio_duration:.1f} วินาที")
+            stt_log.debug(f"🎵 ระดับเสียง RMS: {audio_rms:.6f}")
+            stt_log.debug(f"🎵 Sample Rate: {sr} Hz")
             
             # Check if audio is too quiet
             if audio_rms < 0.0001:
-                print("⚠️  ไฟล์เสียงเงียบมาก อาจไม่มีเสียงพูด")
+                stt_log.warning("⚠️  ไฟล์เสียงเงียบมาก อาจไม่มีเสียงพูด")
             
             # Memory cleanup after loading audio
             if self._should_cleanup_memory():
                 self._cleanup_memory()
             
             # Load Whisper model with increased timeout and better error handling
-            print(f"[STT] Loading Whisper model: {model_name}")
-            model_load_start = time.time()
-            with self.model_lock:
-                if self.whisper_model is None or getattr(self, 'current_model_name', None) != model_name:
-                    # Add timeout for model loading with increased timeout
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                        future = executor.submit(self._load_whisper_model, model_name)
-                        try:
-                            future.result(timeout=300)  # 5 minutes timeout for model loading
-                            self.current_model_name = model_name
-                            model_load_end = time.time()
-                            print(f"[STT] Model loaded in {model_load_end-model_load_start:.1f} seconds")
-                        except concurrent.futures.TimeoutError:
-                            print(f"[STT][TIMEOUT] Model loading timed out after 5 minutes!")
-                            print(f"[STT] Trying fallback to base model...")
-                            
-                            # Try fallback to base model
-                            try:
-                                fallback_future = executor.submit(self._load_whisper_model, "base")
-                                fallback_future.result(timeout=120)  # 2 minutes for fallback
-                                self.current_model_name = "base"
-                                print(f"[STT] Fallback to base model successful")
-                            except Exception as fallback_error:
-                                print(f"[STT][FALLBACK] Fallback failed: {fallback_error}")
-                                raise Exception("Whisper model loading failed with fallback")
+            self._ensure_whisper_model(model_name)
             
             # Transcribe with unlimited processing and timeout
-            print(f"[STT] Starting transcription...")
+            stt_log.debug(f"[STT] Starting transcription...")
             transcription_start = time.time()
             with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(self._transcribe_unlimited_audio_enhanced, audio, sr, source_lang, task_id, task, target_lang)
+                future = executor.submit(tracer.wrap(self._transcribe_unlimited_audio_enhanced, 'stt_transcribe', duration=round(audio_duration, 1)), audio, sr, source_lang, task_id, task, target_lang)
                 try:
                     transcription = future.result(timeout=600)  # 10 minutes timeout for entire transcription
                     transcription_end = time.time()
-                    print(f"[STT] Transcription completed in {transcription_end-transcription_start:.1f} seconds")
+                    stt_log.info(f"[STT] Transcription completed in {transcription_end-transcription_start:.1f} seconds")
                 except concurrent.futures.TimeoutError:
-                    print(f"[STT][TIMEOUT] Transcription timed out after 10 minutes!")
+                    stt_log.warning(f"[STT][TIMEOUT] Transcription timed out after 10 minutes!")
                     raise Exception("Transcription timed out")
             
             stt_end_time = time.time()
-            print(f"[STT] Total transcription time: {stt_end_time-stt_start_time:.1f} seconds")
+            stt_log.info(f"[STT] Total transcription time: {stt_end_time-stt_start_time:.1f} seconds")
+            if audio_duration > 0:
+                pipeline_metrics.observe('videotranslat_realtime_factor', (stt_end_time - stt_start_time) / audio_duration, model=model_name)
             
             # Memory cleanup after transcription (only if needed)
             if self._should_cleanup_memory():
@@ -1146,18 +3301,17 @@ class VideoProcessor:
             return transcription
             
         except Exception as e:
-            print(f"❌ Error transcribing audio: {e}")
+            stt_log.error(f"❌ Error transcribing audio: {e}")
             raise
     
     def _transcribe_with_timestamps(self, audio, sr, source_lang, task_id):
         """Transcribe with timestamps and memory optimization"""
         try:
-            print(f"⏰ Transcribing with timestamps...")
+            stt_log.debug(f"⏰ Transcribing with timestamps...")
             
-            # Load model if not loaded
-            with self.model_lock:
-                if self.whisper_model is None:
-                    self._load_whisper_model('base')  # Use base model for timestamps
+            # Load model if not loaded (_ensure_whisper_model takes model_lock itself)
+            if self.whisper_model is None:
+                self._ensure_whisper_model('base')  # Use base model for timestamps
             
             # Check if this is a Thonburian model
             is_thonburian = hasattr(self.whisper_model, 'transcribe')
@@ -1208,7 +3362,7 @@ class VideoProcessor:
                 # Generate with timestamps
                 generation_kwargs = {
                     "max_length": 2048,
-                    "num_beams": 5,
+                    "num_beams": WHISPER_NUM_BEAMS,
                     "early_stopping": True,
                     "return_timestamps": True,
                     "temperature": 0.0,
@@ -1247,7 +3401,7 @@ class VideoProcessor:
                 }
                 
         except Exception as e:
-            print(f"❌ Error in timestamp transcription: {e}")
+            stt_log.error(f"❌ Error in timestamp transcription: {e}")
             raise
     
     def _extract_timestamps_from_output(self, predicted_ids, transcription):
@@ -1270,7 +3424,7 @@ class VideoProcessor:
             return timestamps
             
         except Exception as e:
-            print(f"⚠️ Error extracting timestamps: {e}")
+            video_log.warning(f"⚠️ Error extracting timestamps: {e}")
             return []
     
     def _load_audio_with_fallback(self, audio_path):
@@ -1281,13 +3435,13 @@ class VideoProcessor:
                 audio, sr = librosa.load(audio_path, sr=16000)
                 return audio, sr
             except Exception as e:
-                print(f"⚠️ Librosa failed, trying ffmpeg: {e}")
+                video_log.warning(f"⚠️ Librosa failed, trying ffmpeg: {e}")
             
             # Try ffmpeg fallback
             return self._load_audio_with_ffmpeg(audio_path)
             
         except Exception as e:
-            print(f"❌ Error loading audio: {e}")
+            video_log.error(f"❌ Error loading audio: {e}")
             raise
     
     def _load_audio_with_ffmpeg(self, audio_path):
@@ -1303,7 +3457,7 @@ class VideoProcessor:
                 '-y', str(temp_output)
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode == 0 and os.path.exists(temp_output):
                 # Load with librosa
@@ -1317,38 +3471,31 @@ class VideoProcessor:
                 raise Exception(f"FFmpeg failed: {result.stderr}")
                 
         except Exception as e:
-            print(f"❌ Error loading audio with ffmpeg: {e}")
+            video_log.error(f"❌ Error loading audio with ffmpeg: {e}")
             raise
     
     def _transcribe_unlimited_audio_enhanced(self, audio, sr, source_lang, task_id, task='transcribe', target_lang=None):
         """Enhanced unlimited length audio transcription with better chunking and memory management, with chunk timeout and logging"""
         try:
-            print(f"🎧 Starting enhanced unlimited transcription (task: {task})...")
-            print(f"[STT] Audio length: {len(audio)/sr:.1f} seconds")
+            stt_log.debug(f"🎧 Starting enhanced unlimited transcription (task: {task})...")
+            stt_log.debug(f"[STT] Audio length: {len(audio)/sr:.1f} seconds")
             
             # Load Whisper model first (should already be loaded by transcribe_audio)
-            print(f"[STT] Checking Whisper model...")
-            with self.model_lock:
-                if self.whisper_model is None:
-                    print(f"[STT] Loading fallback Whisper model...")
-                    # Fallback to base model if somehow not loaded
-                    self._load_whisper_model('base')
-                else:
-                    print(f"[STT] Whisper model already loaded")
+            stt_log.debug(f"[STT] Checking Whisper model...")
+            if self.whisper_model is None:
+                stt_log.debug(f"[STT] Loading fallback Whisper model...")
+                # Fallback to base model if somehow not loaded (_ensure_whisper_model takes model_lock itself)
+                self._ensure_whisper_model('base')
+            else:
+                stt_log.debug(f"[STT] Whisper model already loaded")
             
             # Calculate chunk size based on memory optimization
             chunk_duration = UNLIMITED_CHUNK_DURATION if hasattr(self, 'UNLIMITED_CHUNK_DURATION') else 30  # Reduced from 60 to 30 seconds
             overlap_duration = UNLIMITED_OVERLAP_DURATION if hasattr(self, 'UNLIMITED_OVERLAP_DURATION') else 5   # Reduced from 30 to 5 seconds
             
-            print(f"[STT] Chunk duration: {chunk_duration}s, Overlap: {overlap_duration}s")
-            
-            # Calculate chunk parameters
-            chunk_samples = int(chunk_duration * sr)
-            overlap_samples = int(overlap_duration * sr)
+            stt_log.debug(f"[STT] Chunk duration: {chunk_duration}s, Overlap: {overlap_duration}s")
             
-            # Split audio into chunks
             audio_length = len(audio)
-            chunks = []
             
             # Check if audio has any content
             if audio_length == 0:
@@ -1357,58 +3504,51 @@ class VideoProcessor:
             # Check audio levels
             audio_rms = np.sqrt(np.mean(audio**2))
             if audio_rms < 0.001:  # Very low audio level
-                print("⚠️  ระดับเสียงต่ำมาก อาจไม่มีเสียงพูด")
-            
-            print(f"[STT] Creating chunks...")
-            for i in range(0, audio_length, chunk_samples - overlap_samples):
-                chunk = audio[i:i + chunk_samples]
-                if len(chunk) > sr:  # At least 1 second
-                    # Check if chunk has meaningful audio
-                    chunk_rms = np.sqrt(np.mean(chunk**2))
-                    if chunk_rms > 0.0001:  # Minimum audio level
-                        chunks.append(chunk)
-                    else:
-                        print(f"⚠️  ข้าม chunk {len(chunks)+1} เนื่องจากระดับเสียงต่ำเกินไป")
+                stt_log.warning("⚠️  ระดับเสียงต่ำมาก อาจไม่มีเสียงพูด")
             
-            print(f"📊 แยกไฟล์เสียงเป็น {len(chunks)} chunks (จาก {audio_length/sr:.1f} วินาที)")
+            stt_log.debug(f"[STT] Creating chunks...")
+            chunks = [chunk for _, chunk in self._split_audio_chunks(audio, sr, chunk_duration, overlap_duration)]
+            
+            stt_log.debug(f"📊 แยกไฟล์เสียงเป็น {len(chunks)} chunks (จาก {audio_length/sr:.1f} วินาที)")
             
             if len(chunks) == 0:
                 raise Exception("ไม่มี chunks ที่มีเสียงพูด")
             
-            print(f"📊 Split audio into {len(chunks)} chunks")
-            print(f"[STT] Starting chunk processing...")
+            stt_log.debug(f"📊 Split audio into {len(chunks)} chunks")
+            stt_log.debug(f"[STT] Starting chunk processing...")
             
             # Process chunks with memory optimization
             transcriptions = []
             
             for chunk_num, chunk in enumerate(chunks, 1):
                 chunk_start_time = time.time()
-                print(f"🔄 Processing chunk {chunk_num}/{len(chunks)}")
+                stt_log.debug(f"🔄 Processing chunk {chunk_num}/{len(chunks)}")
                 
                 # Debug chunk information
                 chunk_duration = len(chunk) / sr
                 chunk_rms = np.sqrt(np.mean(chunk**2))
-                print(f"🔍 Chunk {chunk_num}: {chunk_duration:.1f}s, RMS: {chunk_rms:.6f}")
+                stt_log.debug(f"🔍 Chunk {chunk_num}: {chunk_duration:.1f}s, RMS: {chunk_rms:.6f}")
                 
                 # Transcribe chunk with timeout
                 chunk_timeout_sec = 180  # 3 นาที/ชิ้น
-                print(f"[STT] Starting chunk {chunk_num} transcription (timeout: {chunk_timeout_sec}s)...")
+                stt_log.debug(f"[STT] Starting chunk {chunk_num} transcription (timeout: {chunk_timeout_sec}s)...")
                 with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(self._transcribe_audio_chunk_with_retry_enhanced, chunk, sr, source_lang, chunk_num, task_id, task, target_lang)
+                    future = executor.submit(tracer.wrap(self._transcribe_audio_chunk_with_retry_enhanced, 'stt_chunk', chunk=chunk_num, duration=round(chunk_duration, 1)), chunk, sr, source_lang, chunk_num, task_id, task, target_lang)
                     try:
                         chunk_transcription = future.result(timeout=chunk_timeout_sec)
                         chunk_end_time = time.time()
-                        print(f"[STT] Chunk {chunk_num} finished in {chunk_end_time-chunk_start_time:.1f} seconds")
+                        stt_log.debug(f"[STT] Chunk {chunk_num} finished in {chunk_end_time-chunk_start_time:.1f} seconds")
+                        pipeline_metrics.observe_stage('stt_chunk', chunk_end_time - chunk_start_time, model=getattr(self, 'current_model_name', 'unknown'))
                         if chunk_end_time-chunk_start_time > 60:
-                            print(f"[STT][WARNING] Chunk {chunk_num} took more than 1 minute!")
+                            stt_log.warning(f"[STT][WARNING] Chunk {chunk_num} took more than 1 minute!")
                     except concurrent.futures.TimeoutError:
-                        print(f"[STT][TIMEOUT] Chunk {chunk_num} timed out after {chunk_timeout_sec} seconds!")
+                        stt_log.warning(f"[STT][TIMEOUT] Chunk {chunk_num} timed out after {chunk_timeout_sec} seconds!")
                         chunk_transcription = ""
                 if chunk_transcription and chunk_transcription.strip():
                     transcriptions.append(chunk_transcription)
-                    print(f"✅ Chunk {chunk_num} transcribed: {len(chunk_transcription)} chars")
+                    stt_log.debug(f"✅ Chunk {chunk_num} transcribed: {len(chunk_transcription)} chars")
                 else:
-                    print(f"⚠️  Chunk {chunk_num} produced no transcription")
+                    stt_log.warning(f"⚠️  Chunk {chunk_num} produced no transcription")
                 
                 # Memory cleanup after each chunk
                 if ENABLE_MEMORY_OPTIMIZATION:
@@ -1417,54 +3557,250 @@ class VideoProcessor:
                     if torch.cuda.is_available():
                         torch.cuda.empty_cache()
             
-            print(f"[STT] All chunks processed. Found {len(transcriptions)} transcriptions")
+            stt_log.debug(f"[STT] All chunks processed. Found {len(transcriptions)} transcriptions")
             
             if not transcriptions:
-                print("⚠️  ไม่พบเสียงพูดในไฟล์เสียง")
-                print("🔄 ลองใช้วิธีการอื่น...")
+                stt_log.warning("⚠️  ไม่พบเสียงพูดในไฟล์เสียง")
+                stt_log.debug("🔄 ลองใช้วิธีการอื่น...")
                 
                 # Try alternative transcription methods
                 try:
                     # Try with different preprocessing
                     alternative_transcription = self._transcribe_with_enhanced_noise_handling(audio, sr, source_lang, task_id)
                     if alternative_transcription and alternative_transcription.strip():
-                        print("✅ ได้ผลลัพธ์จากการใช้วิธีการอื่น")
+                        stt_log.debug("✅ ได้ผลลัพธ์จากการใช้วิธีการอื่น")
                         return alternative_transcription
                 except Exception as e:
-                    print(f"⚠️  วิธีการอื่นล้มเหลว: {e}")
+                    stt_log.warning(f"⚠️  วิธีการอื่นล้มเหลว: {e}")
                 
                 # If still no transcription, return a placeholder
-                print("⚠️  ไม่สามารถถอดเสียงได้ ใช้ข้อความ placeholder")
+                stt_log.warning("⚠️  ไม่สามารถถอดเสียงได้ ใช้ข้อความ placeholder")
                 return "ไม่สามารถถอดเสียงจากไฟล์นี้ได้ กรุณาตรวจสอบไฟล์เสียง"
             
             # Combine transcriptions with better formatting
-            print(f"[STT] Combining transcriptions...")
+            stt_log.debug(f"[STT] Combining transcriptions...")
             full_transcription = self._combine_transcriptions_enhanced(transcriptions)
             
-            print(f"🎯 Total transcription length: {len(full_transcription)} characters")
-            print(f"🎯 Total transcription time: {len(full_transcription.split()) / 150:.1f} minutes (estimated)")
+            stt_log.debug(f"🎯 Total transcription length: {len(full_transcription)} characters")
+            stt_log.debug(f"🎯 Total transcription time: {len(full_transcription.split()) / 150:.1f} minutes (estimated)")
             return full_transcription
             
         except Exception as e:
-            print(f"[STT][ERROR] Error in enhanced unlimited transcription: {str(e)}")
+            stt_log.error(f"[STT][ERROR] Error in enhanced unlimited transcription: {str(e)}")
             raise Exception(f"Error in enhanced unlimited transcription: {str(e)}")
     
+    def _split_audio_chunks(self, audio, sr, chunk_duration, overlap_duration):
+        """Split audio into overlapping chunks, returning (start_seconds, chunk) for chunks with speech energy"""
+        chunk_samples = int(chunk_duration * sr)
+        overlap_samples = int(overlap_duration * sr)
+        chunks = []
+        
+        for i in range(0, len(audio), chunk_samples - overlap_samples):
+            chunk = audio[i:i + chunk_samples]
+            if len(chunk) > sr:  # At least 1 second
+                # Check if chunk has meaningful audio
+                chunk_rms = np.sqrt(np.mean(chunk**2))
+                if chunk_rms > 0.0001:  # Minimum audio level
+                    chunks.append((i / sr, chunk))
+                else:
+                    video_log.warning(f"⚠️  ข้าม chunk {len(chunks)+1} เนื่องจากระดับเสียงต่ำเกินไป")
+        
+        return chunks
+    
+    def transcribe_audio_segments(self, audio_path, model_name, source_lang, task_id):
+        """Transcribe audio into timestamped segments for subtitle output
+        
+        Returns {'transcription': str, 'segments': [{'start', 'end', 'text'}]} with times in seconds.
+        """
+        try:
+            stt_log.debug(f"🎧 Transcribing audio with timestamps: {audio_path}")
+            stt_start_time = time.time()
+            
+            if not os.path.exists(audio_path):
+                raise Exception(f"Audio file not found: {audio_path}")
+            
+            audio, sr = self._load_audio_with_fallback(audio_path)
+            if len(audio) == 0:
+                raise Exception("ไฟล์เสียงว่างเปล่า")
+            
+            self._ensure_whisper_model(model_name)
+            
+            chunks = self._split_audio_chunks(audio, sr, WHISPER_CHUNK_DURATION, WHISPER_CHUNK_OVERLAP)
+            stt_log.debug(f"📊 แยกไฟล์เสียงเป็น {len(chunks)} chunks สำหรับซับไตเติล")
+            
+            segments = []
+            last_end = 0.0
+            for chunk_num, (chunk_start, chunk) in enumerate(chunks, 1):
+                with pipeline_metrics.time_stage('stt_chunk', model=model_name):
+                    chunk_segments = self._transcribe_audio_chunk_segments(chunk, sr, source_lang)
+                stt_log.debug(f"✅ Chunk {chunk_num}/{len(chunks)}: {len(chunk_segments)} segments")
+                
+                for segment in chunk_segments:
+                    start = chunk_start + segment['start']
+                    end = chunk_start + segment['end']
+                    # Segments fully inside the overlap were already emitted by the previous chunk
+                    if end <= last_end + 0.05:
+                        continue
+                    start = max(start, last_end)
+                    segments.append({'start': round(start, 3), 'end': round(end, 3), 'text': segment['text']})
+                    last_end = end
+                
+                if ENABLE_MEMORY_OPTIMIZATION and self._should_cleanup_memory():
+                    self._cleanup_memory()
+            
+            transcription = self._combine_transcriptions_enhanced([segment['text'] for segment in segments])
+            stt_log.info(f"[STT] Timestamped transcription: {len(segments)} segments in {time.time()-stt_start_time:.1f} seconds")
+            pipeline_metrics.observe('videotranslat_realtime_factor', (time.time() - stt_start_time) / (len(audio) / sr), model=model_name)
+            
+            return {
+                'transcription': transcription,
+                'segments': segments
+            }
+            
+        except Exception as e:
+            stt_log.error(f"❌ Error transcribing audio with timestamps: {e}")
+            raise
+    
+    def _transcribe_audio_chunk_segments(self, audio_chunk, sr, source_lang):
+        """Transcribe one chunk and return segments with start/end relative to the chunk"""
+        chunk_duration = len(audio_chunk) / sr
+        try:
+            if self.whisper_model is None:
+                raise Exception("Whisper models not loaded")
+            
+            if hasattr(self.whisper_model, 'transcribe'):
+                # Original whisper library returns segments directly
+                import tempfile
+                
+                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
+                    sf.write(temp_file.name, audio_chunk, sr)
+                    temp_audio_path = temp_file.name
+                
+                try:
+                    result = self.whisper_model.transcribe(
+                        temp_audio_path,
+                        language=source_lang if source_lang != 'auto' else None,
+                        verbose=False
+                    )
+                finally:
+                    if os.path.exists(temp_audio_path):
+                        os.unlink(temp_audio_path)
+                
+                return [
+                    {'start': segment['start'], 'end': segment['end'], 'text': segment['text'].strip()}
+                    for segment in result.get('segments', []) if segment['text'].strip()
+                ]
+            
+            if self.whisper_processor is None:
+                raise Exception("Whisper processor not loaded")
+            
+            inputs = self.whisper_processor(audio_chunk, sampling_rate=sr, return_tensors="pt")
+            input_features = inputs.input_features
+            if self.device == 'cuda':
+                input_features = input_features.to(self.device)
+            
+            generation_kwargs = {
+                "num_beams": WHISPER_NUM_BEAMS,
+                "early_stopping": WHISPER_EARLY_STOPPING,
+                "return_timestamps": True,
+                "do_sample": False,
+                "task": "transcribe"
+            }
+            if source_lang != 'auto':
+                generation_kwargs["language"] = source_lang
+            
+            with torch.no_grad():
+                predicted_ids = self.whisper_model.generate(input_features, **generation_kwargs)
+            
+            decoded = self.whisper_processor.tokenizer.decode(
+                predicted_ids[0],
+                skip_special_tokens=True,
+                output_offsets=True
+            )
+            
+            segments = []
+            for offset in decoded.get('offsets', []):
+                text = offset['text'].strip()
+                start, end = offset['timestamp']
+                if text:
+                    segments.append({'start': start, 'end': end if end is not None else chunk_duration, 'text': text})
+            
+            # No timestamp tokens produced: treat the whole chunk as one cue
+            if not segments and decoded.get('text', '').strip():
+                segments.append({'start': 0.0, 'end': chunk_duration, 'text': decoded['text'].strip()})
+            
+            return segments
+            
+        except Exception as e:
+            stt_log.warning(f"⚠️  Error transcribing chunk with timestamps: {e}")
+            return []
+    
+    def transcribe_chunk_batch(self, audio_chunks, sr, source_lang, num_beams=None):
+        """Transcribe several 16kHz chunks with one generate() call (used by benchmark_stt.py)
+        
+        Returns (texts, generated_token_count). Models loaded through the original whisper
+        package have no batched decode, so their chunks are transcribed one after another.
+        """
+        num_beams = num_beams or WHISPER_NUM_BEAMS
+        if self.whisper_model is None:
+            raise Exception("Whisper models not loaded")
+        
+        if hasattr(self.whisper_model, 'transcribe'):
+            texts = []
+            token_count = 0
+            for chunk in audio_chunks:
+                result = self.whisper_model.transcribe(
+                    np.asarray(chunk, dtype=np.float32),
+                    language=source_lang if source_lang != 'auto' else None,
+                    beam_size=num_beams if num_beams > 1 else None,
+                    verbose=False
+                )
+                texts.append(result['text'].strip())
+                token_count += sum(len(segment.get('tokens', [])) for segment in result.get('segments', []))
+            return texts, token_count
+        
+        if self.whisper_processor is None:
+            raise Exception("Whisper processor not loaded")
+        
+        inputs = self.whisper_processor(list(audio_chunks), sampling_rate=sr, return_tensors="pt")
+        input_features = inputs.input_features
+        if self.device == 'cuda':
+            input_features = input_features.to(self.device)
+        
+        generation_kwargs = {"num_beams": num_beams, "do_sample": False, "task": "transcribe"}
+        if num_beams > 1:
+            generation_kwargs["early_stopping"] = WHISPER_EARLY_STOPPING
+        if source_lang != 'auto':
+            generation_kwargs["language"] = source_lang
+        
+        with torch.no_grad():
+            predicted_ids = self.whisper_model.generate(input_features, **generation_kwargs)
+        
+        texts = self.whisper_processor.batch_decode(predicted_ids, skip_special_tokens=True)
+        # Count only decoded text: the output also holds the forced prompt (startoftranscript,
+        # language, task, notimestamps) and <|endoftext|>, which Whisper uses as both EOS and pad
+        special_ids = set(self.whisper_processor.tokenizer.all_special_ids)
+        token_count = sum(1 for token_id in predicted_ids.flatten().tolist() if token_id not in special_ids)
+        return [text.strip() for text in texts], token_count
+    
     def _transcribe_audio_chunk_with_retry_enhanced(self, audio_chunk, sr, source_lang, chunk_num, task_id, task='transcribe', target_lang=None, max_retries=3):
         """Enhanced audio chunk transcription with better memory management"""
-        print(f"[STT] Starting chunk {chunk_num} transcription (attempts: {max_retries})")
+        stt_log.debug(f"[STT] Starting chunk {chunk_num} transcription (attempts: {max_retries})")
         for attempt in range(max_retries):
             try:
-                print(f"[STT] Chunk {chunk_num} attempt {attempt + 1}/{max_retries}")
-                transcription = self._transcribe_audio_chunk_enhanced(audio_chunk, sr, source_lang, task, target_lang)
+                stt_log.debug(f"[STT] Chunk {chunk_num} attempt {attempt + 1}/{max_retries}")
+                with tracer.span('stt_attempt', chunk=chunk_num, attempt=attempt + 1) as span:
+                    transcription = self._transcribe_audio_chunk_enhanced(audio_chunk, sr, source_lang, task, target_lang)
+                    span.set(chars=len(transcription.strip()) if transcription else 0)
                 if transcription and transcription.strip():
-                    print(f"[STT] Chunk {chunk_num} attempt {attempt + 1} successful")
+                    stt_log.debug(f"[STT] Chunk {chunk_num} attempt {attempt + 1} successful")
                     return transcription
                 else:
-                    print(f"⚠️  Attempt {attempt + 1}: No transcription for chunk {chunk_num}")
+                    stt_log.warning(f"⚠️  Attempt {attempt + 1}: No transcription for chunk {chunk_num}")
             except Exception as e:
-                print(f"⚠️  Attempt {attempt + 1} failed for chunk {chunk_num}: {e}")
+                stt_log.warning(f"⚠️  Attempt {attempt + 1} failed for chunk {chunk_num}: {e}")
                 if attempt == max_retries - 1:
-                    print(f"❌ All attempts failed for chunk {chunk_num}")
+                    stt_log.error(f"❌ All attempts failed for chunk {chunk_num}")
                     return ""
                 
                 # Memory cleanup between retries
@@ -1481,14 +3817,14 @@ class VideoProcessor:
     def _transcribe_audio_chunk_enhanced(self, audio_chunk, sr, source_lang, task='transcribe', target_lang=None):
         """Enhanced audio chunk transcription with better parameters"""
         try:
-            print(f"[STT] Processing chunk with Whisper...")
+            stt_log.debug(f"[STT] Processing chunk with Whisper...")
             # Check if models are loaded
             if self.whisper_model is None:
                 raise Exception("Whisper models not loaded")
             
             # Check if this is a Thonburian model
             is_thonburian = hasattr(self.whisper_model, 'transcribe')
-            print(f"[STT] Using {'Thonburian' if is_thonburian else 'Standard'} Whisper model")
+            stt_log.debug(f"[STT] Using {'Thonburian' if is_thonburian else 'Standard'} Whisper model")
             
             if is_thonburian:
                 # Use original whisper library for Thonburian models
@@ -1501,7 +3837,7 @@ class VideoProcessor:
                     temp_audio_path = temp_file.name
                 
                 try:
-                    print(f"[STT] Transcribing with Thonburian model...")
+                    stt_log.debug(f"[STT] Transcribing with Thonburian model...")
                     # Transcribe with original whisper
                     result = self.whisper_model.transcribe(
                         temp_audio_path,
@@ -1523,7 +3859,7 @@ class VideoProcessor:
                 if self.whisper_processor is None:
                     raise Exception("Whisper processor not loaded")
                 
-                print(f"[STT] Transcribing with Standard Whisper model...")
+                stt_log.debug(f"[STT] Transcribing with Standard Whisper model...")
                 # Prepare input for Whisper
                 inputs = self.whisper_processor(
                     audio_chunk, 
@@ -1534,7 +3870,7 @@ class VideoProcessor:
                 # Enhanced generation parameters for better accuracy
                 generation_kwargs = {
                     "max_length": 2048,
-                    "num_beams": 5,
+                    "num_beams": WHISPER_NUM_BEAMS,
                     "early_stopping": True,
                     "no_speech_threshold": 0.3,  # Lower threshold to detect more speech
                     "logprob_threshold": -1.0,
@@ -1565,7 +3901,7 @@ class VideoProcessor:
                         del generation_kwargs[param]
                 
                 # Generate transcription
-                print(f"[STT] Generating transcription...")
+                stt_log.debug(f"[STT] Generating transcription...")
                 with torch.no_grad():
                     predicted_ids = self.whisper_model.generate(
                         inputs.input_features,
@@ -1573,7 +3909,7 @@ class VideoProcessor:
                     )
                 
                 # Decode transcription
-                print(f"[STT] Decoding transcription...")
+                stt_log.debug(f"[STT] Decoding transcription...")
                 if hasattr(self.whisper_processor, 'batch_decode'):
                     transcription = self.whisper_processor.batch_decode(
                         predicted_ids, 
@@ -1586,11 +3922,11 @@ class VideoProcessor:
                         skip_special_tokens=True
                     )
                 
-                print(f"[STT] Chunk transcription completed: {len(transcription.strip())} chars")
+                stt_log.debug(f"[STT] Chunk transcription completed: {len(transcription.strip())} chars")
                 return transcription.strip()
             
         except Exception as e:
-            print(f"⚠️  Error transcribing chunk: {e}")
+            stt_log.warning(f"⚠️  Error transcribing chunk: {e}")
             return ""
     
     def _combine_transcriptions_enhanced(self, transcriptions):
@@ -1611,7 +3947,7 @@ class VideoProcessor:
             return cleaned.strip()
             
         except Exception as e:
-            print(f"⚠️  Error combining transcriptions: {e}")
+            stt_log.warning(f"⚠️  Error combining transcriptions: {e}")
             return ' '.join(transcriptions)
     
     def _clean_transcription_enhanced(self, transcription):
@@ -1638,7 +3974,7 @@ class VideoProcessor:
             return transcription.strip()
             
         except Exception as e:
-            print(f"⚠️  Error cleaning transcription: {e}")
+            stt_log.warning(f"⚠️  Error cleaning transcription: {e}")
             return transcription
     
     def _verify_text_file(self, file_path, expected_content):
@@ -1653,23 +3989,57 @@ class VideoProcessor:
             return content.strip() == expected_content.strip()
             
         except Exception as e:
-            print(f"⚠️  Error verifying text file: {e}")
+            video_log.warning(f"⚠️  Error verifying text file: {e}")
             return False
     
+    def _ensure_whisper_model(self, model_name):
+        """Load the requested Whisper model once per processor, with timeout and base fallback"""
+        with self.model_lock:
+            if self.whisper_model is not None and getattr(self, 'current_model_name', None) == model_name:
+                return
+            # Drop a different model so _load_whisper_model loads the requested one
+            self.whisper_model = None
+            self.whisper_processor = None
+        
+        # The lock is not held here: _load_whisper_model takes it on its own executor thread
+        stt_log.debug(f"[STT] Loading Whisper model: {model_name}")
+        model_load_start = time.time()
+        with tracer.span('model_load', model=f"stt:{model_name}"), concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(tracer.wrap(self._load_whisper_model), model_name)
+            try:
+                future.result(timeout=300)  # 5 minutes timeout for model loading
+                self.current_model_name = model_name
+                model_load_end = time.time()
+                stt_log.info(f"[STT] Model loaded in {model_load_end-model_load_start:.1f} seconds")
+                pipeline_metrics.observe('videotranslat_model_load_seconds', model_load_end - model_load_start, model=f"stt:{model_name}")
+            except concurrent.futures.TimeoutError:
+                stt_log.warning(f"[STT][TIMEOUT] Model loading timed out after 5 minutes!")
+                stt_log.debug(f"[STT] Trying fallback to base model...")
+                
+                # Try fallback to base model
+                try:
+                    fallback_future = executor.submit(tracer.wrap(self._load_whisper_model, 'model_load', model="stt:base", fallback=True), "base")
+                    fallback_future.result(timeout=120)  # 2 minutes for fallback
+                    self.current_model_name = "base"
+                    stt_log.info(f"[STT] Fallback to base model successful")
+                except Exception as fallback_error:
+                    stt_log.debug(f"[STT][FALLBACK] Fallback failed: {fallback_error}")
+                    raise Exception("Whisper model loading failed with fallback")
+    
     def _load_whisper_model(self, model_name):
         """Load Whisper model with memory optimization and GPU support"""
         try:
-            print(f"🤖 Loading Whisper model: {model_name}")
+            stt_log.debug(f"🤖 Loading Whisper model: {model_name}")
             
             # Determine device
             import torch
             device = 'cuda' if torch.cuda.is_available() else 'cpu'
-            print(f"🚀 Using device: {device}")
+            stt_log.debug(f"🚀 Using device: {device}")
             
             with self.model_lock:
                 # Check if model is already loaded
                 if self.whisper_model is not None:
-                    print("✅ Model already loaded")
+                    stt_log.debug("✅ Model already loaded")
                     return
                 
                 # Memory cleanup before loading model (only if needed)
@@ -1679,77 +4049,88 @@ class VideoProcessor:
                 # Load model based on type with increased timeout and fallback
                 if model_name.startswith('biodatlab') or model_name.startswith('thonburian'):
                     # Use original whisper library for Thai models
-                    print(f"[STT] Loading Thonburian model: {model_name}")
-                    print(f"[STT] This may take several minutes for large models...")
+                    stt_log.debug(f"[STT] Loading Thonburian model: {model_name}")
+                    stt_log.debug(f"[STT] This may take several minutes for large models...")
                     import whisper
                     
                     # Try loading with increased timeout
                     with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                        future = executor.submit(whisper.load_model, model_name, device=device)
+                        future = executor.submit(tracer.wrap(model_registry.get_or_load), model_registry.key('stt', model_name),
+                                                 lambda: (None, whisper.load_model(model_name, device=device)))
                         try:
-                            self.whisper_model = future.result(timeout=300)  # 5 minutes timeout
-                            print(f"✅ Loaded {model_name} with original whisper on {device}")
+                            _, self.whisper_model = future.result(timeout=300)  # 5 minutes timeout
+                            stt_log.debug(f"✅ Loaded {model_name} with original whisper on {device}")
                         except concurrent.futures.TimeoutError:
-                            print(f"[STT][TIMEOUT] Model loading timed out after 5 minutes!")
-                            print(f"[STT] Trying fallback to base model...")
+                            stt_log.warning(f"[STT][TIMEOUT] Model loading timed out after 5 minutes!")
+                            stt_log.debug(f"[STT] Trying fallback to base model...")
                             
                             # Fallback to base model
                             try:
-                                self.whisper_model = executor.submit(whisper.load_model, "base", device=device).result(timeout=60)
-                                print(f"✅ Loaded fallback base model on {device}")
+                                _, self.whisper_model = executor.submit(
+                                    tracer.wrap(model_registry.get_or_load), "stt:whisper:base",
+                                    lambda: (None, whisper.load_model("base", device=device))
+                                ).result(timeout=60)
+                                stt_log.debug(f"✅ Loaded fallback base model on {device}")
                             except Exception as fallback_error:
-                                print(f"[STT][FALLBACK] Fallback failed: {fallback_error}")
+                                stt_log.debug(f"[STT][FALLBACK] Fallback failed: {fallback_error}")
                                 raise Exception("Whisper model loading failed with fallback")
                 else:
                     # Use transformers for OpenAI models
-                    print(f"[STT] Loading Standard Whisper model: {model_name}")
+                    stt_log.debug(f"[STT] Loading Standard Whisper model: {model_name}")
                     from transformers import WhisperProcessor, WhisperForConditionalGeneration
                     
                     # Try loading with increased timeout
                     with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                        future = executor.submit(self._load_transformers_model, model_name, device)
+                        future = executor.submit(tracer.wrap(self._load_transformers_model), STT_MODELS.get(model_name, model_name), device)
                         try:
                             self.whisper_processor, self.whisper_model = future.result(timeout=300)  # 5 minutes timeout
-                            print(f"✅ Loaded {model_name} with transformers on {device}")
+                            stt_log.debug(f"✅ Loaded {model_name} with transformers on {device}")
                         except concurrent.futures.TimeoutError:
-                            print(f"[STT][TIMEOUT] Model loading timed out after 5 minutes!")
-                            print(f"[STT] Trying fallback to base model...")
+                            stt_log.warning(f"[STT][TIMEOUT] Model loading timed out after 5 minutes!")
+                            stt_log.debug(f"[STT] Trying fallback to base model...")
                             
                             # Fallback to base model
                             try:
                                 self.whisper_processor, self.whisper_model = executor.submit(
                                     self._load_transformers_model, "openai/whisper-base", device
                                 ).result(timeout=60)
-                                print(f"✅ Loaded fallback base model on {device}")
+                                stt_log.debug(f"✅ Loaded fallback base model on {device}")
                             except Exception as fallback_error:
-                                print(f"[STT][FALLBACK] Fallback failed: {fallback_error}")
+                                stt_log.debug(f"[STT][FALLBACK] Fallback failed: {fallback_error}")
                                 raise Exception("Whisper model loading failed with fallback")
                 
+                track_loaded_model(f"stt:{model_name}", self.whisper_model)
+                
                 # Memory cleanup after loading (only if needed)
                 if self._should_cleanup_memory():
                     self._cleanup_memory()
                 
         except Exception as e:
-            print(f"❌ Error loading Whisper model: {e}")
+            stt_log.error(f"❌ Error loading Whisper model: {e}")
             raise
     
     def _load_transformers_model(self, model_name, device):
-        """Helper function to load transformers model with timeout"""
-        from transformers import WhisperProcessor, WhisperForConditionalGeneration
-        
-        self.whisper_processor = WhisperProcessor.from_pretrained(model_name)
-        self.whisper_model = WhisperForConditionalGeneration.from_pretrained(model_name)
-        
-        # Move model to GPU if available
-        if device == 'cuda':
-            self.whisper_model = self.whisper_model.to(device)
+        """Helper function to load transformers model with timeout (shared through model_registry)"""
+        def load():
+            from transformers import WhisperProcessor, WhisperForConditionalGeneration
+            
+            # Local prepared copy under models/ when there is one, otherwise the Hugging Face cache
+            model_path = ModelDownloader().resolve_model_path(model_name)
+            processor = WhisperProcessor.from_pretrained(model_path)
+            model = WhisperForConditionalGeneration.from_pretrained(model_path, **pretrained_load_kwargs())
+            
+            # Move model to GPU if available
+            if device == 'cuda':
+                model = model.to(device)
+            return processor, model
         
+        self.whisper_processor, self.whisper_model = model_registry.get_or_load(model_registry.key('stt', model_name), load)
         return self.whisper_processor, self.whisper_model
     
     def _enhanced_audio_preprocessing(self, audio_path, task_id):
         """Enhanced audio preprocessing with memory optimization"""
         try:
-            print(f"🎵 Enhanced audio preprocessing for: {audio_path}")
+            video_log.debug(f"🎵 Enhanced audio preprocessing for: {audio_path}")
             
             # Load audio
             audio, sr = librosa.load(audio_path, sr=16000)
@@ -1772,7 +4153,7 @@ class VideoProcessor:
             return str(processed_path)
             
         except Exception as e:
-            print(f"❌ Error in enhanced audio preprocessing: {e}")
+            video_log.error(f"❌ Error in enhanced audio preprocessing: {e}")
             raise
     
     def _aggressive_noise_reduction(self, audio, sr):
@@ -1785,7 +4166,7 @@ class VideoProcessor:
             else:
                 return audio
         except Exception as e:
-            print(f"⚠️  Noise reduction failed: {e}")
+            video_log.warning(f"⚠️  Noise reduction failed: {e}")
             return audio
     
     def _remove_music_and_background(self, audio, sr):
@@ -1803,7 +4184,7 @@ class VideoProcessor:
             else:
                 return audio
         except Exception as e:
-            print(f"⚠️  Music removal failed: {e}")
+            video_log.warning(f"⚠️  Music removal failed: {e}")
             return audio
     
     def _enhance_speech(self, audio, sr):
@@ -1821,7 +4202,7 @@ class VideoProcessor:
             else:
                 return audio
         except Exception as e:
-            print(f"⚠️  Speech enhancement failed: {e}")
+            video_log.warning(f"⚠️  Speech enhancement failed: {e}")
             return audio
     
     def _adaptive_filtering(self, audio, sr):
@@ -1831,7 +4212,7 @@ class VideoProcessor:
             audio = audio / np.max(np.abs(audio))
             return audio
         except Exception as e:
-            print(f"⚠️  Adaptive filtering failed: {e}")
+            video_log.warning(f"⚠️  Adaptive filtering failed: {e}")
             return audio
     
     def _final_normalization(self, audio):
@@ -1843,13 +4224,13 @@ class VideoProcessor:
                 audio = audio / max_val * 0.95
             return audio
         except Exception as e:
-            print(f"⚠️  Final normalization failed: {e}")
+            video_log.warning(f"⚠️  Final normalization failed: {e}")
             return audio
     
     def _transcribe_with_enhanced_noise_handling(self, audio, sr, source_lang, task_id):
         """Transcribe with enhanced noise handling"""
         try:
-            print(f"🎧 Transcribing with enhanced noise handling...")
+            stt_log.debug(f"🎧 Transcribing with enhanced noise handling...")
             
             # Try multiple preprocessing approaches
             approaches = [
@@ -1860,7 +4241,7 @@ class VideoProcessor:
             
             for i, approach in enumerate(approaches):
                 try:
-                    print(f"🔄 Trying approach {i + 1}/{len(approaches)}")
+                    stt_log.debug(f"🔄 Trying approach {i + 1}/{len(approaches)}")
                     
                     # Apply preprocessing
                     processed_audio = approach(audio, sr)
@@ -1869,27 +4250,27 @@ class VideoProcessor:
                     transcription = self._transcribe_audio_chunk_enhanced(processed_audio, sr, source_lang)
                     
                     if transcription and len(transcription.strip()) > 10:
-                        print(f"✅ Approach {i + 1} successful")
+                        stt_log.debug(f"✅ Approach {i + 1} successful")
                         return transcription
                     else:
-                        print(f"⚠️  Approach {i + 1} produced insufficient transcription")
+                        stt_log.warning(f"⚠️  Approach {i + 1} produced insufficient transcription")
                         
                 except Exception as e:
-                    print(f"⚠️  Approach {i + 1} failed: {e}")
+                    stt_log.warning(f"⚠️  Approach {i + 1} failed: {e}")
                     continue
             
             # If all approaches fail, return empty string
-            print("❌ All transcription approaches failed")
+            stt_log.error("❌ All transcription approaches failed")
             return ""
             
         except Exception as e:
-            print(f"❌ Error in enhanced noise handling: {e}")
+            stt_log.error(f"❌ Error in enhanced noise handling: {e}")
             return ""
     
     def _transcribe_with_alternative_preprocessing(self, audio_path, source_lang, task_id):
         """Transcribe with alternative preprocessing methods"""
         try:
-            print(f"🎧 Transcribing with alternative preprocessing...")
+            stt_log.debug(f"🎧 Transcribing with alternative preprocessing...")
             
             # Load audio
             audio, sr = librosa.load(audio_path, sr=16000)
@@ -1903,24 +4284,24 @@ class VideoProcessor:
             
             for method_name, method_func in methods:
                 try:
-                    print(f"🔄 Trying {method_name} preprocessing...")
+                    stt_log.debug(f"🔄 Trying {method_name} preprocessing...")
                     
                     processed_audio = method_func(audio, sr)
                     transcription = self._transcribe_audio_chunk_enhanced(processed_audio, sr, source_lang)
                     
                     if transcription and len(transcription.strip()) > 10:
-                        print(f"✅ {method_name} preprocessing successful")
+                        stt_log.debug(f"✅ {method_name} preprocessing successful")
                         return transcription
                         
                 except Exception as e:
-                    print(f"⚠️  {method_name} preprocessing failed: {e}")
+                    stt_log.warning(f"⚠️  {method_name} preprocessing failed: {e}")
                     continue
             
-            print("❌ All preprocessing methods failed")
+            stt_log.error("❌ All preprocessing methods failed")
             return ""
             
         except Exception as e:
-            print(f"❌ Error in alternative preprocessing: {e}")
+            stt_log.error(f"❌ Error in alternative preprocessing: {e}")
             return ""
     
     def _minimal_preprocessing(self, audio, sr):
@@ -1930,7 +4311,7 @@ class VideoProcessor:
             audio = audio / np.max(np.abs(audio)) if np.max(np.abs(audio)) > 0 else audio
             return audio
         except Exception as e:
-            print(f"⚠️  Minimal preprocessing failed: {e}")
+            video_log.warning(f"⚠️  Minimal preprocessing failed: {e}")
             return audio
     
     def _aggressive_preprocessing(self, audio, sr):
@@ -1944,13 +4325,13 @@ class VideoProcessor:
             audio = self._final_normalization(audio)
             return audio
         except Exception as e:
-            print(f"⚠️  Aggressive preprocessing failed: {e}")
+            video_log.warning(f"⚠️  Aggressive preprocessing failed: {e}")
             return audio
     
     def merge_audio_video(self, video_path, audio_path, task_id, video_speed='1.0', instrumental_path=None, sync_original_audio=False):
         """Merge audio and video with memory optimization"""
         try:
-            print(f"🎬 Merging audio and video...")
+            video_log.debug(f"🎬 Merging audio and video...")
             
             if not os.path.exists(video_path):
                 raise Exception(f"Video file not found: {video_path}")
@@ -1978,7 +4359,7 @@ class VideoProcessor:
             
             # Add instrumental mixing if provided
             if instrumental_path and os.path.exists(instrumental_path):
-                print(f"🎵 Adding instrumental mixing...")
+                video_log.debug(f"🎵 Adding instrumental mixing...")
                 cmd.extend(['-i', instrumental_path])
                 cmd.extend(['-filter_complex', '[1:a][2:a]amix=inputs=2:duration=first[aout]'])
                 cmd.extend(['-map', '0:v:0', '-map', '[aout]'])
@@ -1986,10 +4367,10 @@ class VideoProcessor:
             cmd.extend(['-y', str(output_path)])
             
             # Execute ffmpeg command
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode == 0 and os.path.exists(output_path):
-                print(f"✅ Video merged successfully: {output_path}")
+                video_log.debug(f"✅ Video merged successfully: {output_path}")
                 
                 # Memory cleanup after merging (only if needed)
                 if self._should_cleanup_memory():
@@ -2000,7 +4381,50 @@ class VideoProcessor:
                 raise Exception(f"FFmpeg failed: {result.stderr}")
                 
         except Exception as e:
-            print(f"❌ Error merging audio and video: {e}")
+            video_log.error(f"❌ Error merging audio and video: {e}")
+            raise
+    
+    def mux_subtitles(self, video_path, subtitle_paths, task_id):
+        """Mux subtitles as a soft track with stream copy (no audio/video re-encode)
+        
+        MP4/MOV get mov_text, WebM gets webvtt, everything else is remuxed into MKV with SRT.
+        """
+        try:
+            video_log.debug(f"📝 Muxing soft subtitles into video...")
+            
+            if not os.path.exists(video_path):
+                raise Exception(f"Video file not found: {video_path}")
+            
+            extension = Path(video_path).suffix.lower()
+            if extension in ('.mp4', '.mov', '.m4v'):
+                subtitle_path, subtitle_codec = subtitle_paths['srt'], 'mov_text'
+            elif extension == '.webm':
+                subtitle_path, subtitle_codec = subtitle_paths['vtt'], 'webvtt'
+            else:
+                extension = '.mkv'
+                subtitle_path, subtitle_codec = subtitle_paths['srt'], 'srt'
+            
+            output_path = OUTPUTS_DIR / f"{task_id}_output{extension}"
+            
+            cmd = [
+                'ffmpeg', '-i', video_path,
+                '-i', subtitle_path,
+                '-map', '0:v?', '-map', '0:a?', '-map', '1:0',
+                '-c', 'copy',
+                '-c:s', subtitle_codec,
+                '-y', str(output_path)
+            ]
+            
+            result = run_subprocess(cmd, capture_output=True, text=True)
+            
+            if result.returncode == 0 and os.path.exists(output_path):
+                video_log.debug(f"✅ Subtitles muxed successfully: {output_path}")
+                return str(output_path)
+            else:
+                raise Exception(f"FFmpeg failed: {result.stderr}")
+                
+        except Exception as e:
+            video_log.error(f"❌ Error muxing subtitles: {e}")
             raise
     
     def _get_video_duration(self, video_path):
@@ -2013,7 +4437,7 @@ class VideoProcessor:
                 video_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode == 0:
                 duration = float(result.stdout.strip())
@@ -2022,7 +4446,7 @@ class VideoProcessor:
                 return None
                 
         except Exception as e:
-            print(f"⚠️  Error getting video duration: {e}")
+            video_log.warning(f"⚠️  Error getting video duration: {e}")
             return None
     
     def _get_audio_duration(self, audio_path):
@@ -2035,7 +4459,7 @@ class VideoProcessor:
                 audio_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode == 0:
                 duration = float(result.stdout.strip())
@@ -2044,19 +4468,19 @@ class VideoProcessor:
                 return None
                 
         except Exception as e:
-            print(f"⚠️  Error getting audio duration: {e}")
+            video_log.warning(f"⚠️  Error getting audio duration: {e}")
             return None
     
     def _create_advanced_audio_mix(self, tts_audio_path, instrumental_path, task_id, sync_original_audio=False):
         """Create advanced audio mix with memory optimization"""
         try:
-            print(f"🎵 Creating advanced audio mix...")
+            video_log.debug(f"🎵 Creating advanced audio mix...")
             
             if not os.path.exists(tts_audio_path):
                 raise Exception(f"TTS audio not found: {tts_audio_path}")
             
             if not instrumental_path or not os.path.exists(instrumental_path):
-                print(f"⚠️  No instrumental path provided, using TTS audio only")
+                video_log.warning(f"⚠️  No instrumental path provided, using TTS audio only")
                 return tts_audio_path
             
             # Create mixed audio path
@@ -2072,10 +4496,10 @@ class VideoProcessor:
             ]
             
             # Execute mixing
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode == 0 and os.path.exists(mixed_audio_path):
-                print(f"✅ Audio mix created: {mixed_audio_path}")
+                video_log.debug(f"✅ Audio mix created: {mixed_audio_path}")
                 
                 # Memory cleanup after mixing (only if needed)
                 if self._should_cleanup_memory():
@@ -2086,19 +4510,19 @@ class VideoProcessor:
                 raise Exception(f"Audio mixing failed: {result.stderr}")
                 
         except Exception as e:
-            print(f"❌ Error creating audio mix: {e}")
+            video_log.error(f"❌ Error creating audio mix: {e}")
             return tts_audio_path
     
     def _create_timestamp_sync_audio_mix(self, tts_audio_path, instrumental_path, task_id):
         """Create timestamp-synchronized audio mix"""
         try:
-            print(f"⏰ Creating timestamp-synchronized audio mix...")
+            video_log.debug(f"⏰ Creating timestamp-synchronized audio mix...")
             
             if not os.path.exists(tts_audio_path):
                 raise Exception(f"TTS audio not found: {tts_audio_path}")
             
             if not instrumental_path or not os.path.exists(instrumental_path):
-                print(f"⚠️  No instrumental path provided, using TTS audio only")
+                video_log.warning(f"⚠️  No instrumental path provided, using TTS audio only")
                 return tts_audio_path
             
             # Get durations
@@ -2106,7 +4530,7 @@ class VideoProcessor:
             instrumental_duration = self._get_audio_duration(instrumental_path)
             
             if not tts_duration or not instrumental_duration:
-                print(f"⚠️  Could not get durations, using simple mix")
+                video_log.warning(f"⚠️  Could not get durations, using simple mix")
                 return self._create_advanced_audio_mix(tts_audio_path, instrumental_path, task_id)
             
             # Create synchronized mix
@@ -2125,10 +4549,10 @@ class VideoProcessor:
             ]
             
             # Execute synchronized mixing
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             
             if result.returncode == 0 and os.path.exists(sync_audio_path):
-                print(f"✅ Synchronized audio mix created: {sync_audio_path}")
+                video_log.debug(f"✅ Synchronized audio mix created: {sync_audio_path}")
                 
                 # Memory cleanup after mixing (only if needed)
                 if self._should_cleanup_memory():
@@ -2139,7 +4563,7 @@ class VideoProcessor:
                 raise Exception(f"Synchronized mixing failed: {result.stderr}")
                 
         except Exception as e:
-            print(f"❌ Error creating synchronized audio mix: {e}")
+            video_log.error(f"❌ Error creating synchronized audio mix: {e}")
             return tts_audio_path
 
 class TranslationService:
@@ -2152,24 +4576,24 @@ class TranslationService:
         # Determine device for GPU acceleration
         import torch
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        print(f"🌐 TranslationService initialized with device: {self.device}")
+        translation_log.debug(f"🌐 TranslationService initialized with device: {self.device}")
     
     def translate(self, text, source_lang, target_lang, model_name):
         """Translate text using specified model with unlimited length support"""
         try:
-            print(f"🔧 Translating unlimited text using {model_name}")
-            print(f"   Source: {source_lang} -> Target: {target_lang}")
-            print(f"   Text length: {len(text)} characters")
+            translation_log.debug(f"🔧 Translating unlimited text using {model_name}")
+            translation_log.debug(f"   Source: {source_lang} -> Target: {target_lang}")
+            translation_log.debug(f"   Text length: {len(text)} characters")
             
             # Check if text is too long for single translation
             if UNLIMITED_TRANSLATION and len(text) > 5000:  # Split if longer than 5000 chars
-                print(f"📊 Text is long ({len(text)} chars), using chunked translation")
+                translation_log.debug(f"📊 Text is long ({len(text)} chars), using chunked translation")
                 return self._translate_unlimited_text(text, source_lang, target_lang, model_name)
             else:
                 return self._translate_single_text(text, source_lang, target_lang, model_name)
             
         except Exception as e:
-            print(f"❌ Error translating text: {str(e)}")
+            translation_log.error(f"❌ Error translating text: {str(e)}")
             raise Exception(f"Error translating text: {str(e)}")
     
     def _translate_single_text(self, text, source_lang, target_lang, model_name):
@@ -2182,8 +4606,8 @@ class TranslationService:
             source_code = self._get_nllb_lang_code(source_lang)
             target_code = self._get_nllb_lang_code(target_lang)
             
-            print(f"🔧 Source language: {source_lang} -> {source_code}")
-            print(f"🔧 Target language: {target_lang} -> {target_code}")
+            translation_log.debug(f"🔧 Source language: {source_lang} -> {source_code}")
+            translation_log.debug(f"🔧 Target language: {target_lang} -> {target_code}")
             
             # Prepare input
             if model_name.startswith('nllb'):
@@ -2193,8 +4617,8 @@ class TranslationService:
                 # T5 format
                 input_text = f"translate {source_lang} to {target_lang}: {text}"
             
-            print(f"   Input format: {input_text[:100]}...")
-            print(f"🔧 Target NLLB Code: {target_code}")
+            translation_log.debug(f"   Input format: {input_text[:100]}...")
+            translation_log.debug(f"🔧 Target NLLB Code: {target_code}")
             
             # Tokenize without length limit
             inputs = self.tokenizers[model_name](
@@ -2211,26 +4635,7 @@ class TranslationService:
             # Generate translation with unlimited length
             with torch.no_grad():
                 # Get forced_bos_token_id for target language
-                forced_bos_token_id = None
-                if model_name.startswith('nllb'):
-                    try:
-                        # Try to get forced_bos_token_id using different methods
-                        if hasattr(self.tokenizers[model_name], 'lang_code_to_id'):
-                            forced_bos_token_id = self.tokenizers[model_name].lang_code_to_id[target_code]
-                        elif hasattr(self.tokenizers[model_name], 'convert_tokens_to_ids'):
-                            # Try to convert target code to token ID
-                            forced_bos_token_id = self.tokenizers[model_name].convert_tokens_to_ids(target_code)
-                        else:
-                            # Fallback: try to find the token ID manually
-                            forced_bos_token_id = self.tokenizers[model_name].convert_tokens_to_ids(f"__{target_code}__")
-                        
-                        if forced_bos_token_id is not None:
-                            print(f"🔧 Forced BOS Token ID: {forced_bos_token_id} for {target_code}")
-                        else:
-                            print(f"⚠️  Warning: Could not find forced_bos_token_id for {target_code}")
-                    except Exception as e:
-                        print(f"⚠️  Warning: Could not set forced_bos_token_id for {target_code}: {e}")
-                        forced_bos_token_id = None
+                forced_bos_token_id = self._get_forced_bos_token_id(model_name, target_code)
                 
                 outputs = self.models[model_name].generate(
                     **inputs,
@@ -2247,35 +4652,111 @@ class TranslationService:
                 skip_special_tokens=True
             )
             
-            print(f"✅ Translation completed: {translation[:100]}...")
+            translation_log.debug(f"✅ Translation completed: {translation[:100]}...")
             return translation.strip()
             
         except Exception as e:
-            print(f"❌ Error in single text translation: {str(e)}")
+            translation_log.error(f"❌ Error in single text translation: {str(e)}")
             raise Exception(f"Error in single text translation: {str(e)}")
     
+    def _get_forced_bos_token_id(self, model_name, target_code):
+        """Resolve the NLLB forced BOS token for the target language (None for other models)"""
+        if not model_name.startswith('nllb'):
+            return None
+        
+        try:
+            tokenizer = self.tokenizers[model_name]
+            # Try to get forced_bos_token_id using different methods
+            if hasattr(tokenizer, 'lang_code_to_id'):
+                forced_bos_token_id = tokenizer.lang_code_to_id[target_code]
+            elif hasattr(tokenizer, 'convert_tokens_to_ids'):
+                # Try to convert target code to token ID
+                forced_bos_token_id = tokenizer.convert_tokens_to_ids(target_code)
+            else:
+                # Fallback: try to find the token ID manually
+                forced_bos_token_id = tokenizer.convert_tokens_to_ids(f"__{target_code}__")
+            
+            if forced_bos_token_id is not None:
+                translation_log.debug(f"🔧 Forced BOS Token ID: {forced_bos_token_id} for {target_code}")
+            else:
+                translation_log.warning(f"⚠️  Warning: Could not find forced_bos_token_id for {target_code}")
+            return forced_bos_token_id
+        except Exception as e:
+            translation_log.warning(f"⚠️  Warning: Could not set forced_bos_token_id for {target_code}: {e}")
+            return None
+    
+    def translate_segments(self, segments, source_lang, target_lang, model_name, batch_size=SUBTITLE_TRANSLATION_BATCH_SIZE):
+        """Translate timestamped segments one cue at a time, batching generation for throughput
+        
+        Each segment keeps its start/end and gains a 'translation' key.
+        """
+        try:
+            translation_log.debug(f"🔧 Translating {len(segments)} subtitle segments using {model_name}")
+            self._load_translation_model(model_name)
+            
+            source_code = self._get_nllb_lang_code(source_lang)
+            target_code = self._get_nllb_lang_code(target_lang)
+            tokenizer = self.tokenizers[model_name]
+            forced_bos_token_id = self._get_forced_bos_token_id(model_name, target_code)
+            
+            translated_segments = [dict(segment, translation='') for segment in segments]
+            pending = [i for i, segment in enumerate(segments) if segment.get('text', '').strip()]
+            
+            for batch_start in range(0, len(pending), batch_size):
+                batch_indices = pending[batch_start:batch_start + batch_size]
+                if model_name.startswith('nllb'):
+                    input_texts = [f"{source_code} {target_code} {segments[i]['text']}" for i in batch_indices]
+                else:
+                    input_texts = [f"translate {source_lang} to {target_lang}: {segments[i]['text']}" for i in batch_indices]
+                
+                inputs = tokenizer(input_texts, return_tensors="pt", padding=True, truncation=False)
+                if self.device == 'cuda':
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                
+                with pipeline_metrics.time_stage('translation_batch', model=model_name), torch.no_grad():
+                    outputs = self.models[model_name].generate(
+                        **inputs,
+                        max_length=512,
+                        num_beams=5,
+                        early_stopping=True,
+                        do_sample=False,
+                        forced_bos_token_id=forced_bos_token_id
+                    )
+                
+                for i, translation in zip(batch_indices, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                    translated_segments[i]['translation'] = translation.strip()
+                
+                translation_log.debug(f"✅ Translated segments {batch_start + 1}-{batch_start + len(batch_indices)}/{len(pending)}")
+            
+            return translated_segments
+            
+        except Exception as e:
+            translation_log.error(f"❌ Error translating segments: {str(e)}")
+            raise Exception(f"Error translating segments: {str(e)}")
+    
     def _translate_unlimited_text(self, text, source_lang, target_lang, model_name):
         """Translate unlimited length text using chunking"""
         try:
-            print(f"📊 Starting unlimited translation: {len(text)} characters")
+            translation_log.debug(f"📊 Starting unlimited translation: {len(text)} characters")
             
             # Split text into manageable chunks
             chunks = self._split_text_for_translation(text, max_length=4000)
-            print(f"📊 Split into {len(chunks)} chunks for translation")
+            translation_log.debug(f"📊 Split into {len(chunks)} chunks for translation")
             
             translations = []
             
             for i, chunk in enumerate(chunks):
-                print(f"🔧 Translating chunk {i+1}/{len(chunks)} ({len(chunk)} chars)")
+                translation_log.debug(f"🔧 Translating chunk {i+1}/{len(chunks)} ({len(chunk)} chars)")
                 
                 # Translate chunk
-                chunk_translation = self._translate_single_text(chunk, source_lang, target_lang, model_name)
+                with pipeline_metrics.time_stage('translation_batch', model=model_name):
+                    chunk_translation = self._translate_single_text(chunk, source_lang, target_lang, model_name)
                 
                 if chunk_translation and chunk_translation.strip():
                     translations.append(chunk_translation)
-                    print(f"✅ Chunk {i+1} translated: {len(chunk_translation)} chars")
+                    translation_log.debug(f"✅ Chunk {i+1} translated: {len(chunk_translation)} chars")
                 else:
-                    print(f"⚠️  Chunk {i+1} produced no translation")
+                    translation_log.warning(f"⚠️  Chunk {i+1} produced no translation")
                 
                 # Memory cleanup between chunks
                 if ENABLE_MEMORY_OPTIMIZATION:
@@ -2290,11 +4771,11 @@ class TranslationService:
             # Combine translations
             full_translation = self._combine_translations(translations)
             
-            print(f"🎯 Total translation length: {len(full_translation)} characters")
+            translation_log.debug(f"🎯 Total translation length: {len(full_translation)} characters")
             return full_translation
             
         except Exception as e:
-            print(f"❌ Error in unlimited translation: {str(e)}")
+            translation_log.error(f"❌ Error in unlimited translation: {str(e)}")
             raise Exception(f"Error in unlimited translation: {str(e)}")
     
     def _split_text_for_translation(self, text, max_length=4000):
@@ -2329,7 +4810,7 @@ class TranslationService:
             return chunks if chunks else [text]
             
         except Exception as e:
-            print(f"⚠️  Error splitting text for translation: {e}")
+            translation_log.warning(f"⚠️  Error splitting text for translation: {e}")
             # Fallback: split by length
             return [text[i:i+max_length] for i in range(0, len(text), max_length)]
     
@@ -2347,52 +4828,69 @@ class TranslationService:
             return cleaned.strip()
             
         except Exception as e:
-            print(f"⚠️  Error combining translations: {e}")
+            translation_log.warning(f"⚠️  Error combining translations: {e}")
             return ' '.join(translations)
     
     def _load_translation_model(self, model_name):
         """Load translation model if not already loaded"""
+        resident = model_registry.get(model_registry.key('translation', model_name))
+        if model_name not in self.models and resident is not None:
+            # Already loaded by the preloader or another job: skip the download check as well
+            self.tokenizers[model_name], self.models[model_name] = resident
+        
         if model_name not in self.models:
             try:
-                print(f"🔄 Loading translation model: {model_name}")
+                translation_log.debug(f"🔄 Loading translation model: {model_name}")
                 
                 # Initialize model downloader
                 model_downloader = ModelDownloader()
                 
                 # Check if model needs to be downloaded
                 if not model_downloader.is_model_available(model_name):
-                    print(f"📥 Model {model_name} not found locally, downloading...")
+                    translation_log.debug(f"📥 Model {model_name} not found locally, downloading...")
                     if not model_downloader.download_model(model_name):
                         raise Exception(f"Failed to download model {model_name}")
-                    print(f"✅ Model {model_name} downloaded successfully")
+                    translation_log.debug(f"✅ Model {model_name} downloaded successfully")
                 
-                model_path = TRANSLATION_MODELS.get(model_name, model_name)
+                model_path = model_downloader.resolve_model_path(model_name)
                 if model_path is None:
                     raise Exception(f"Unknown model name: {model_name}")
                 
                 # Add error handling for model loading
                 try:
-                    self.tokenizers[model_name] = AutoTokenizer.from_pretrained(model_path)
-                    self.models[model_name] = AutoModelForSeq2SeqLM.from_pretrained(model_path)
-                    
-                    # Move model to GPU if available
-                    if self.device == 'cuda':
-                        self.models[model_name] = self.models[model_name].to(self.device)
-                        print(f"✅ Moved translation model to GPU")
+                    def load():
+                        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+                        model_load_start = time.time()
+                        with tracer.span('model_load', model=f"translation:{model_name}", device=self.device):
+                            tokenizer = AutoTokenizer.from_pretrained(model_path)
+                            model = AutoModelForSeq2SeqLM.from_pretrained(model_path, **pretrained_load_kwargs())
+                            
+                            # Move model to GPU if available
+                            if self.device == 'cuda':
+                                model = model.to(self.device)
+                                translation_log.debug(f"✅ Moved translation model to GPU")
+                        
+                        track_loaded_model(f"translation:{model_name}", model)
+                        pipeline_metrics.observe('videotranslat_model_load_seconds', time.time() - model_load_start, model=f"translation:{model_name}")
+                        translation_log.info(f"✅ Loaded translation model: {model_name} on {self.device}")
+                        return tokenizer, model
                     
-                    print(f"✅ Loaded translation model: {model_name} on {self.device}")
+                    # Shared with every other job's TranslationService through model_registry
+                    self.tokenizers[model_name], self.models[model_name] = model_registry.get_or_load(
+                        model_registry.key('translation', model_name), load
+                    )
                     
                 except Exception as model_error:
-                    print(f"❌ Error loading translation model {model_name}: {model_error}")
+                    translation_log.error(f"❌ Error loading translation model {model_name}: {model_error}")
                     # Try fallback to distilled model
                     if model_name == 'nllb-200':
-                        print(f"🔄 Trying fallback to NLLB-200 Distilled...")
+                        translation_log.debug(f"🔄 Trying fallback to NLLB-200 Distilled...")
                         return self._load_translation_model('nllb-200-distilled')
                     else:
                         raise Exception(f"Failed to load translation model: {str(model_error)}")
                 
             except Exception as e:
-                print(f"❌ Critical error loading translation model: {e}")
+                translation_log.error(f"❌ Critical error loading translation model: {e}")
                 raise Exception(f"Error loading translation model {model_name}: {str(e)}")
     
     def _get_nllb_lang_code(self, lang):
@@ -2481,7 +4979,7 @@ class TranslationService:
                 return 'en'  # Default to English
                 
         except Exception as e:
-            print(f"⚠️  Error detecting language: {e}")
+            translation_log.warning(f"⚠️  Error detecting language: {e}")
             return 'auto'
 
 class TTSService:
@@ -2498,35 +4996,35 @@ class TTSService:
         # Determine device for GPU acceleration
         import torch
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        print(f"🎤 TTS Service initialized with device: {self.device}")
+        tts_log.debug(f"🎤 TTS Service initialized with device: {self.device}")
     
     def synthesize_speech(self, text, target_lang, model_name, task_id, voice_mode='female', custom_coqui_model=None):
         """Synthesize speech from text with timestamp sync support"""
         try:
-            print(f"🎤 เริ่มการแปลงข้อความเป็นเสียง")
-            print(f"📊 Language: {target_lang}, Model: {model_name}, Voice: {voice_mode}")
+            tts_log.debug(f"🎤 เริ่มการแปลงข้อความเป็นเสียง")
+            tts_log.debug(f"📊 Language: {target_lang}, Model: {model_name}, Voice: {voice_mode}")
             
             # Check if timestamp sync is enabled
             if ENABLE_TTS_SYNC:
                 # Try to load timestamps for sync
                 timestamps_path = TEXTS_DIR / f"{task_id}_timestamps.json"
                 if timestamps_path.exists():
-                    print("🔄 Using timestamp sync for TTS")
+                    tts_log.debug("🔄 Using timestamp sync for TTS")
                     audio_path = self._synthesize_with_timestamp_sync(
                         text, target_lang, model_name, task_id, voice_mode, custom_coqui_model, timestamps_path
                     )
                 else:
-                    print("⚠️  No timestamps found, using standard TTS")
+                    tts_log.warning("⚠️  No timestamps found, using standard TTS")
                     audio_path = self._synthesize_standard(text, target_lang, model_name, task_id, voice_mode, custom_coqui_model)
             else:
                 # Standard TTS without sync
                 audio_path = self._synthesize_standard(text, target_lang, model_name, task_id, voice_mode, custom_coqui_model)
             
-            print(f"✅ การแปลงข้อความเป็นเสียงเสร็จสิ้น: {audio_path}")
+            tts_log.debug(f"✅ การแปลงข้อความเป็นเสียงเสร็จสิ้น: {audio_path}")
             return audio_path
             
         except Exception as e:
-            print(f"❌ Error synthesizing speech: {str(e)}")
+            tts_log.error(f"❌ Error synthesizing speech: {str(e)}")
             raise Exception(f"Error synthesizing speech: {str(e)}")
     
     def _synthesize_standard(self, text, target_lang, model_name, task_id, voice_mode, custom_coqui_model=None):
@@ -2556,8 +5054,8 @@ class TTSService:
             word_timestamps = timestamps_data.get('word_timestamps', [])
             audio_duration = timestamps_data.get('audio_duration', 0)
             
-            print(f"📊 Found {len(segments)} segments and {len(word_timestamps)} words for sync")
-            print(f"⏱️  Total audio duration: {audio_duration:.2f} seconds")
+            tts_log.debug(f"📊 Found {len(segments)} segments and {len(word_timestamps)} words for sync")
+            tts_log.debug(f"⏱️  Total audio duration: {audio_duration:.2f} seconds")
             
             # Create output audio path
             output_filename = f"{task_id}_tts_sync.wav"
@@ -2575,7 +5073,7 @@ class TTSService:
                 if not segment_text:
                     continue
                 
-                print(f"🎤 Processing segment {i+1}/{len(segments)}: {segment_text[:50]}...")
+                tts_log.debug(f"🎤 Processing segment {i+1}/{len(segments)}: {segment_text[:50]}...")
                 
                 # Add silence before segment if needed
                 if segment_start > current_time + TTS_SILENCE_PADDING:
@@ -2648,14 +5146,14 @@ class TTSService:
                         'tts_audio_path': str(output_path)
                     }, f, ensure_ascii=False, indent=2)
                 
-                print(f"✅ Timestamp sync TTS completed: {len(audio_segments)} segments")
-                print(f"💾 Saved sync metadata: {sync_metadata_path}")
+                tts_log.debug(f"✅ Timestamp sync TTS completed: {len(audio_segments)} segments")
+                tts_log.debug(f"💾 Saved sync metadata: {sync_metadata_path}")
                 return str(output_path)
             else:
                 raise Exception("No audio segments generated")
                 
         except Exception as e:
-            print(f"⚠️  Timestamp sync failed: {e}, falling back to standard TTS")
+            tts_log.warning(f"⚠️  Timestamp sync failed: {e}, falling back to standard TTS")
             return self._synthesize_standard(text, target_lang, model_name, task_id, voice_mode, custom_coqui_model)
     
     def _split_text_for_tts(self, text, max_length=None):
@@ -2689,6 +5187,12 @@ class TTSService:
         return chunks if chunks else [text]
     
     def _synthesize_single_chunk(self, text, target_lang, model_name, task_id, voice_mode, custom_coqui_model=None):
+        """Synthesize speech for a single text chunk (timed per engine)"""
+        engine = 'lao' if target_lang == 'lo' else model_name
+        with pipeline_metrics.time_stage('tts_segment', engine=engine):
+            return self._synthesize_chunk_with_fallback(text, target_lang, model_name, task_id, voice_mode, custom_coqui_model)
+    
+    def _synthesize_chunk_with_fallback(self, text, target_lang, model_name, task_id, voice_mode, custom_coqui_model=None):
         """Synthesize speech for a single text chunk with fallback"""
         try:
             output_path = TEMP_DIR / f"{task_id}_tts.wav"
@@ -2716,24 +5220,24 @@ class TTSService:
                         # Default to gTTS
                         result = self._synthesize_with_gtts(text, target_lang, str(output_path), voice_mode)
                 except Exception as primary_error:
-                    print(f"⚠️  Primary TTS engine failed: {primary_error}")
+                    tts_log.warning(f"⚠️  Primary TTS engine failed: {primary_error}")
                     result = None
                 
                 # If primary engine failed or returned None, try gTTS fallback
                 if result is None or not os.path.exists(result):
-                    print(f"🔄 Primary TTS failed, falling back to gTTS...")
+                    tts_log.debug(f"🔄 Primary TTS failed, falling back to gTTS...")
                     try:
                         result = self._synthesize_with_gtts(text, target_lang, str(output_path), voice_mode)
                     except Exception as fallback_error:
-                        print(f"⚠️  gTTS fallback also failed: {fallback_error}")
+                        tts_log.warning(f"⚠️  gTTS fallback also failed: {fallback_error}")
                         result = None
             
             # Verify that the audio file was actually created
             if not os.path.exists(result):
-                print(f"⚠️  TTS returned path but file doesn't exist: {result}")
+                tts_log.warning(f"⚠️  TTS returned path but file doesn't exist: {result}")
                 # Try to create a fallback audio file
                 fallback_path = TEMP_DIR / f"{task_id}_fallback.wav"
-                print(f"🔄 Creating fallback audio file: {fallback_path}")
+                tts_log.debug(f"🔄 Creating fallback audio file: {fallback_path}")
                 
                 # Create a simple beep sound using FFmpeg
                 cmd = [
@@ -2741,21 +5245,20 @@ class TTSService:
                     str(fallback_path), '-y'
                 ]
                 
-                import subprocess
-                subprocess.run(cmd, capture_output=True, text=True)
+                run_subprocess(cmd, capture_output=True, text=True)
                 
                 if os.path.exists(fallback_path):
-                    print(f"✅ Created fallback audio: {fallback_path}")
+                    tts_log.debug(f"✅ Created fallback audio: {fallback_path}")
                     return str(fallback_path)
                 else:
                     raise Exception(f"Failed to create fallback audio file")
             
             # Apply voice effects if specified
             if voice_mode not in ['female', 'male']:
-                print(f"🎭 Applying {voice_mode} voice effect...")
+                tts_log.debug(f"🎭 Applying {voice_mode} voice effect...")
                 result = self._apply_voice_effects(result, voice_mode)
             
-            print(f"✅ TTS synthesis completed: {result}")
+            tts_log.debug(f"✅ TTS synthesis completed: {result}")
             return result
                     
         except Exception as e:
@@ -2764,12 +5267,12 @@ class TTSService:
     def _synthesize_multiple_chunks(self, text_chunks, target_lang, model_name, task_id, voice_mode, custom_coqui_model=None):
         """Synthesize speech for multiple text chunks with unlimited length support"""
         try:
-            print(f"📊 Processing {len(text_chunks)} TTS chunks for unlimited synthesis")
+            tts_log.debug(f"📊 Processing {len(text_chunks)} TTS chunks for unlimited synthesis")
             audio_files = []
             
             for i, chunk in enumerate(text_chunks):
                 chunk_task_id = f"{task_id}_chunk_{i}"
-                print(f"🎤 Synthesizing chunk {i+1}/{len(text_chunks)} ({len(chunk)} chars)")
+                tts_log.debug(f"🎤 Synthesizing chunk {i+1}/{len(text_chunks)} ({len(chunk)} chars)")
                 
                 audio_file = self._synthesize_single_chunk(chunk, target_lang, model_name, chunk_task_id, voice_mode, custom_coqui_model)
                 audio_files.append(audio_file)
@@ -2782,7 +5285,7 @@ class TTSService:
                         torch.cuda.empty_cache()
             
             # Concatenate audio files
-            print(f"🔗 Concatenating {len(audio_files)} audio files...")
+            tts_log.debug(f"🔗 Concatenating {len(audio_files)} audio files...")
             return self._concatenate_audio_files_enhanced(audio_files, task_id)
             
         except Exception as e:
@@ -2794,7 +5297,7 @@ class TTSService:
             if len(audio_files) == 1:
                 return audio_files[0]
             
-            print(f"🔗 Concatenating {len(audio_files)} audio files...")
+            tts_log.debug(f"🔗 Concatenating {len(audio_files)} audio files...")
             
             # Create file list for FFmpeg
             file_list_path = TEMP_DIR / f"{task_id}_filelist.txt"
@@ -2803,7 +5306,7 @@ class TTSService:
                     if os.path.exists(audio_file):
                         f.write(f"file '{audio_file}'\n")
                     else:
-                        print(f"⚠️  Audio file not found: {audio_file}")
+                        tts_log.warning(f"⚠️  Audio file not found: {audio_file}")
             
             # Concatenate using FFmpeg with enhanced options
             output_path = TEMP_DIR / f"{task_id}_concatenated.wav"
@@ -2815,15 +5318,15 @@ class TTSService:
                 str(output_path), '-y'
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             if result.returncode != 0:
-                print(f"⚠️  FFmpeg concatenation error: {result.stderr}")
+                tts_log.warning(f"⚠️  FFmpeg concatenation error: {result.stderr}")
                 # Try alternative concatenation method
                 return self._concatenate_audio_files_alternative(audio_files, task_id)
             
             # Verify output file
             if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
-                print(f"⚠️  Concatenated file is empty or missing, trying alternative method")
+                tts_log.warning(f"⚠️  Concatenated file is empty or missing, trying alternative method")
                 return self._concatenate_audio_files_alternative(audio_files, task_id)
             
             # Clean up individual files
@@ -2831,9 +5334,9 @@ class TTSService:
                 try:
                     if os.path.exists(audio_file):
                         os.remove(audio_file)
-                        print(f"🗑️  Cleaned up: {audio_file}")
+                        tts_log.debug(f"🗑️  Cleaned up: {audio_file}")
                 except Exception as e:
-                    print(f"⚠️  Could not clean up {audio_file}: {e}")
+                    tts_log.warning(f"⚠️  Could not clean up {audio_file}: {e}")
             
             # Clean up file list
             try:
@@ -2841,18 +5344,18 @@ class TTSService:
             except:
                 pass
             
-            print(f"✅ Concatenation completed: {output_path}")
+            tts_log.debug(f"✅ Concatenation completed: {output_path}")
             return str(output_path)
             
         except Exception as e:
-            print(f"❌ Error in enhanced concatenation: {e}")
+            tts_log.error(f"❌ Error in enhanced concatenation: {e}")
             # Fallback to alternative method
             return self._concatenate_audio_files_alternative(audio_files, task_id)
     
     def _concatenate_audio_files_alternative(self, audio_files, task_id):
         """Alternative concatenation method using sox or direct file copying"""
         try:
-            print(f"🔄 Using alternative concatenation method...")
+            tts_log.debug(f"🔄 Using alternative concatenation method...")
             
             if len(audio_files) == 1:
                 return audio_files[0]
@@ -2868,20 +5371,20 @@ class TTSService:
                         sox_cmd.append(audio_file)
                 sox_cmd.append(str(output_path))
                 
-                result = subprocess.run(sox_cmd, capture_output=True, text=True)
+                result = run_subprocess(sox_cmd, capture_output=True, text=True)
                 if result.returncode == 0 and os.path.exists(output_path):
-                    print(f"✅ Alternative concatenation successful with sox")
+                    tts_log.debug(f"✅ Alternative concatenation successful with sox")
                     return str(output_path)
             except:
                 pass
             
             # Fallback: return the longest audio file
             longest_file = max(audio_files, key=lambda f: os.path.getsize(f) if os.path.exists(f) else 0)
-            print(f"⚠️  Using longest audio file as fallback: {longest_file}")
+            tts_log.warning(f"⚠️  Using longest audio file as fallback: {longest_file}")
             return longest_file
             
         except Exception as e:
-            print(f"❌ Alternative concatenation failed: {e}")
+            tts_log.error(f"❌ Alternative concatenation failed: {e}")
             # Return first available file
             for audio_file in audio_files:
                 if os.path.exists(audio_file):
@@ -2907,13 +5410,16 @@ class TTSService:
             
             # For Lao, try to use Thai TTS as they are similar
             if target_lang == 'lo':
-                print(f"🔄 Using Thai TTS for Lao text (Lao not supported by gTTS)")
+                tts_log.debug(f"🔄 Using Thai TTS for Lao text (Lao not supported by gTTS)")
             
-            tts = gTTS(text=text, lang=tts_lang, slow=False)
-            tts.save(output_path)
+            from gtts import gTTS
+            with tracer.span('gtts_request', lang=tts_lang, chars=len(text)):
+                tts = gTTS(text=text, lang=tts_lang, slow=False)
+                tts.save(output_path)
             
             # Verify file was created
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                resource_tracker.charge(network_bytes=os.path.getsize(output_path))
                 return output_path
             else:
                 raise Exception("gTTS failed to create audio file")
@@ -2921,40 +5427,46 @@ class TTSService:
         except Exception as e:
             raise Exception(f"gTTS error: {str(e)}")
     
+    @staticmethod
+    def _coqui_model_name(target_lang, custom_coqui_model=None):
+        """Coqui model id for a language (custom model wins); None if the language has none"""
+        if custom_coqui_model:
+            return custom_coqui_model
+        coqui_models = {
+            'th': 'tts_models/thai/thai_female/glow-tts',
+            'lo': 'tts_models/multilingual/multi-dataset/your_lao_model'
+        }
+        return coqui_models.get(target_lang)
+    
     def _synthesize_with_coqui(self, text, target_lang, output_path, voice_mode='female', custom_coqui_model=None):
         """Synthesize speech using Coqui TTS (Thai/Lao/Custom) with .pth file support and GPU acceleration"""
         try:
             from TTS.api import TTS
             import torch
 
-            # ใช้ custom model ถ้ามี
-            if custom_coqui_model:
-                model_path = custom_coqui_model
-                
-                # ตรวจสอบว่าเป็น path ของ .pth file หรือไม่
-                if model_path.endswith('.pth'):
-                    # โหลด .pth file โดยตรง
-                    print(f"🔄 Loading .pth model: {model_path}")
-                    return self._synthesize_with_pth_model(text, model_path, output_path, voice_mode)
-                else:
-                    model_name = model_path
-            else:
-                coqui_models = {
-                    'th': 'tts_models/thai/thai_female/glow-tts',
-                    'lo': 'tts_models/multilingual/multi-dataset/your_lao_model'
-                }
-                model_name = coqui_models.get(target_lang)
-                if not model_name:
-                    raise Exception(f"Coqui TTS does not support language: {target_lang}")
+            # ตรวจสอบว่าเป็น path ของ .pth file หรือไม่
+            if custom_coqui_model and custom_coqui_model.endswith('.pth'):
+                # โหลด .pth file โดยตรง
+                tts_log.debug(f"🔄 Loading .pth model: {custom_coqui_model}")
+                return self._synthesize_with_pth_model(text, custom_coqui_model, output_path, voice_mode)
+            
+            model_name = self._coqui_model_name(target_lang, custom_coqui_model)
+            if not model_name:
+                raise Exception(f"Coqui TTS does not support language: {target_lang}")
 
-            # ใช้ TTS API สำหรับโมเดลปกติ
-            print(f"🚀 Loading Coqui TTS model on {self.device}")
-            tts = TTS(model_name)
+            # ใช้ TTS API สำหรับโมเดลปกติ (โหลดครั้งเดียวแล้วใช้ร่วมกันทุกงาน)
+            def load():
+                tts_log.debug(f"🚀 Loading Coqui TTS model on {self.device}")
+                tts = TTS(model_name)
+                
+                # Move model to GPU if available
+                if self.device == 'cuda':
+                    tts.model = tts.model.to(self.device)
+                    tts_log.debug(f"✅ Moved Coqui TTS model to GPU")
+                # The synthesizer keeps per-call state, so jobs sharing the model take turns
+                return tts, threading.Lock()
             
-            # Move model to GPU if available
-            if self.device == 'cuda':
-                tts.model = tts.model.to(self.device)
-                print(f"✅ Moved Coqui TTS model to GPU")
+            tts, tts_lock = model_registry.get_or_load(f"tts:coqui:{model_name}", load)
             
             # เลือก speaker/voice ถ้าโมเดลรองรับ
             speaker = None
@@ -2964,13 +5476,14 @@ class TTSService:
                 speaker = 'female'
             # เพิ่ม voice_mode อื่นๆ ได้ถ้าโมเดลรองรับ
 
-            tts.tts_to_file(text=text, file_path=output_path, speaker=speaker)
+            with tts_lock:
+                tts.tts_to_file(text=text, file_path=output_path, speaker=speaker)
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
                 return output_path
             else:
                 raise Exception("Coqui TTS failed to create audio file")
         except Exception as e:
-            print(f"⚠️  Coqui TTS error: {e}")
+            tts_log.warning(f"⚠️  Coqui TTS error: {e}")
             return None
 
     def _synthesize_with_pth_model(self, text, pth_path, output_path, voice_mode='female'):
@@ -2984,8 +5497,8 @@ class TTSService:
             from TTS.tts.utils.text.tokenizer import TTSTokenizer
             import numpy as np
             
-            print(f"🔄 Loading .pth model from: {pth_path}")
-            print(f"🚀 Using device: {self.device}")
+            tts_log.debug(f"🔄 Loading .pth model from: {pth_path}")
+            tts_log.debug(f"🚀 Using device: {self.device}")
             
             # ตรวจสอบว่าไฟล์ .pth มีอยู่จริง
             if not os.path.exists(pth_path):
@@ -2997,7 +5510,7 @@ class TTSService:
             
             if not os.path.exists(config_path):
                 # สร้าง config เริ่มต้นถ้าไม่มี
-                print(f"⚠️  Config file not found, using default config")
+                tts_log.warning(f"⚠️  Config file not found, using default config")
                 config = self._create_default_config()
             else:
                 # โหลด config จากไฟล์
@@ -3011,7 +5524,7 @@ class TTSService:
             # Move model to GPU if available
             if self.device == 'cuda':
                 model = model.to(self.device)
-                print(f"✅ Moved .pth model to GPU")
+                tts_log.debug(f"✅ Moved .pth model to GPU")
             
             # เตรียม text input
             if hasattr(model, 'tokenizer'):
@@ -3050,13 +5563,13 @@ class TTSService:
             
             # ตรวจสอบไฟล์ที่สร้าง
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                print(f"✅ Successfully generated audio from .pth model: {output_path}")
+                tts_log.debug(f"✅ Successfully generated audio from .pth model: {output_path}")
                 return output_path
             else:
                 raise Exception("Failed to create audio file from .pth model")
                 
         except Exception as e:
-            print(f"⚠️  Error with .pth model: {e}")
+            tts_log.warning(f"⚠️  Error with .pth model: {e}")
             return None
 
     def _create_default_config(self):
@@ -3087,7 +5600,7 @@ class TTSService:
             try:
                 subprocess.run(['espeak-ng', '--version'], capture_output=True, check=True)
             except (subprocess.CalledProcessError, FileNotFoundError):
-                print("⚠️  eSpeak-ng not installed, skipping...")
+                tts_log.warning("⚠️  eSpeak-ng not installed, skipping...")
                 raise Exception("eSpeak-ng not installed")
             
             # Map language codes for better support
@@ -3108,14 +5621,14 @@ class TTSService:
             
             # For Lao, use Thai voice
             if target_lang == 'lo':
-                print(f"🔄 Using Thai voice for Lao text in eSpeak")
+                tts_log.debug(f"🔄 Using Thai voice for Lao text in eSpeak")
             
             cmd = [
                 'espeak-ng', '-v', f'{espeak_lang}+{espeak_voice}',
                 '-w', output_path, text
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             if result.returncode != 0:
                 raise Exception(f"eSpeak-ng error: {result.stderr}")
             
@@ -3150,7 +5663,7 @@ class TTSService:
             
             # For Lao, use Thai voice as fallback
             if target_lang == 'lo':
-                print(f"🔄 Using Thai voice for Lao text in Edge TTS")
+                tts_log.debug(f"🔄 Using Thai voice for Lao text in Edge TTS")
             
             # Create TTS object with proper text encoding
             tts = edge_tts.Communicate(text, voice)
@@ -3170,15 +5683,16 @@ class TTSService:
                 if os.path.exists(output_path):
                     file_size = os.path.getsize(output_path)
                     if file_size > 0:
-                        print(f"✅ Edge TTS file created: {output_path} ({file_size} bytes)")
+                        tts_log.debug(f"✅ Edge TTS file created: {output_path} ({file_size} bytes)")
+                        resource_tracker.charge(network_bytes=file_size)
                         return output_path
                 time.sleep(wait_time)
             
-            print(f"⚠️  Edge TTS file not created or empty: {output_path}")
+            tts_log.warning(f"⚠️  Edge TTS file not created or empty: {output_path}")
             return None
             
         except Exception as e:
-            print(f"⚠️  Edge TTS error: {str(e)}")
+            tts_log.warning(f"⚠️  Edge TTS error: {str(e)}")
             return None
     
     def _synthesize_with_festival(self, text, target_lang, output_path, voice_mode='female'):
@@ -3204,41 +5718,41 @@ class TTSService:
         try:
             # Try Coqui TTS first if available
             try:
-                print(f"🔄 Trying Coqui TTS for Lao text...")
+                tts_log.debug(f"🔄 Trying Coqui TTS for Lao text...")
                 result = self._synthesize_with_coqui(text, 'lo', output_path, voice_mode, custom_coqui_model)
                 if result and os.path.exists(result) and os.path.getsize(result) > 0:
                     return result
             except Exception as e:
-                print(f"⚠️  Coqui TTS failed: {e}")
+                tts_log.warning(f"⚠️  Coqui TTS failed: {e}")
             # Try Edge TTS first (best quality for Lao)
             try:
-                print(f"🔄 Trying Edge TTS for Lao text...")
+                tts_log.debug(f"🔄 Trying Edge TTS for Lao text...")
                 result = self._synthesize_with_edge(text, 'lo', output_path, voice_mode)
                 if result and os.path.exists(result) and os.path.getsize(result) > 0:
                     return result
             except Exception as e:
-                print(f"⚠️  Edge TTS failed: {e}")
+                tts_log.warning(f"⚠️  Edge TTS failed: {e}")
             
             # Try gTTS with Thai voice (Lao and Thai are similar)
             try:
-                print(f"🔄 Trying gTTS with Thai voice for Lao text...")
+                tts_log.debug(f"🔄 Trying gTTS with Thai voice for Lao text...")
                 result = self._synthesize_with_gtts(text, 'lo', output_path, voice_mode)
                 if result and os.path.exists(result) and os.path.getsize(result) > 0:
                     return result
             except Exception as e:
-                print(f"⚠️  gTTS failed: {e}")
+                tts_log.warning(f"⚠️  gTTS failed: {e}")
             
             # Try eSpeak as last resort
             try:
-                print(f"🔄 Trying eSpeak for Lao text...")
+                tts_log.debug(f"🔄 Trying eSpeak for Lao text...")
                 result = self._synthesize_with_espeak(text, 'lo', output_path, voice_mode)
                 if result and os.path.exists(result) and os.path.getsize(result) > 0:
                     return result
             except Exception as e:
-                print(f"⚠️  eSpeak failed: {e}")
+                tts_log.warning(f"⚠️  eSpeak failed: {e}")
             
             # Final fallback - create a simple beep sound
-            print(f"🔄 Creating fallback audio for Lao text...")
+            tts_log.debug(f"🔄 Creating fallback audio for Lao text...")
             fallback_path = output_path.replace('.wav', '_fallback.wav')
             
             # Create a simple beep sound using FFmpeg
@@ -3247,10 +5761,10 @@ class TTSService:
                 fallback_path, '-y'
             ]
             
-            subprocess.run(cmd, capture_output=True, text=True)
+            run_subprocess(cmd, capture_output=True, text=True)
             
             if os.path.exists(fallback_path) and os.path.getsize(fallback_path) > 0:
-                print(f"✅ Created fallback audio: {fallback_path}")
+                tts_log.debug(f"✅ Created fallback audio: {fallback_path}")
                 return fallback_path
             else:
                 raise Exception("All TTS methods failed for Lao text")
@@ -3309,18 +5823,290 @@ class TTSService:
                 # No effect for female/male
                 return audio_path
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_subprocess(cmd, capture_output=True, text=True)
             if result.returncode == 0 and os.path.exists(output_path):
-                print(f"✅ Applied {voice_mode} voice effect")
+                tts_log.debug(f"✅ Applied {voice_mode} voice effect")
                 return output_path
             else:
-                print(f"⚠️  Failed to apply {voice_mode} effect, using original")
+                tts_log.warning(f"⚠️  Failed to apply {voice_mode} effect, using original")
                 return audio_path
                 
         except Exception as e:
-            print(f"⚠️  Error applying voice effects: {e}")
+            tts_log.warning(f"⚠️  Error applying voice effects: {e}")
             return audio_path 
 
+class ModelPreloader:
+    """Background startup loader for PRELOAD_MODELS with one warm-up inference per model
+    
+    Models land in model_registry, so the first job after a deploy finds them resident and
+    already past first-inference initialisation. status() backs the /api/ready endpoint.
+    """
+    
+    def __init__(self, models=PRELOAD_MODELS, warmup=PRELOAD_WARMUP):
+        self.models = list(models)
+        self.warmup = warmup
+        self.lock = threading.Lock()
+        self.started_at = None
+        self.states = {
+            entry: {'state': 'pending', 'load_seconds': None, 'warmup_seconds': None, 'error': None}
+            for entry in self.models
+        }
+        self.thread = None
+        
+        pipeline_metrics.register_gauge('videotranslat_preloaded_models_ready', 'Preloaded models loaded and warmed up',
+                                        lambda: sum(1 for state in self.status()['models'].values() if state['state'] == 'ready'))
+    
+    def start(self):
+        if not self.models:
+            return
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, name='model-preloader')
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def _set_state(self, entry, **fields):
+        with self.lock:
+            self.states[entry].update(fields)
+    
+    def _run(self):
+        # One model at a time: parallel multi-GB loads only compete for disk and memory
+        for entry in self.models:
+            kind, _, name = entry.partition(':')
+            loader = getattr(self, f"_load_{kind}", None)
+            try:
+                if loader is None or not name:
+                    raise Exception(f"Unknown preload entry '{entry}' (expected stt:<name>, translation:<name> or tts:<engine>)")
+                
+                with tracer.span('preload', model=entry):
+                    self._set_state(entry, state='loading')
+                    load_start = time.time()
+                    warm_up = loader(name)
+                    self._set_state(entry, load_seconds=round(time.time() - load_start, 2))
+                    
+                    if self.warmup:
+                        self._set_state(entry, state='warming')
+                        warmup_start = time.time()
+                        warm_up()
+                        warmup_seconds = time.time() - warmup_start
+                        pipeline_metrics.observe('videotranslat_model_warmup_seconds', warmup_seconds, model=entry)
+                        self._set_state(entry, warmup_seconds=round(warmup_seconds, 2))
+                
+                self._set_state(entry, state='ready')
+                models_log.info(f"🔥 Preloaded {entry} (load {self.states[entry]['load_seconds']}s, warm-up {self.states[entry]['warmup_seconds']}s)")
+            except Exception as e:
+                self._set_state(entry, state='error', error=str(e))
+                models_log.error(f"❌ Preload of {entry} failed: {e}")
+    
+    def _load_stt(self, name):
+        processor = VideoProcessor()
+        processor._ensure_whisper_model(name)
+        if processor.current_model_name != name:
+            raise Exception(f"STT model {name} did not load in time (fell back to {processor.current_model_name})")
+        
+        silence = np.zeros(AUDIO_SAMPLE_RATE, dtype=np.float32)
+        return lambda: processor.transcribe_chunk_batch([silence], AUDIO_SAMPLE_RATE, 'en', 1)
+    
+    def _load_translation(self, name):
+        service = TranslationService()
+        service._load_translation_model(name)
+        return lambda: service._translate_single_text(PRELOAD_WARMUP_TEXT, 'en', PRELOAD_WARMUP_TARGET_LANG, name)
+    
+    def _load_tts(self, name):
+        # gTTS/Edge are remote services: the warm-up imports the client and opens the first
+        # connection; Coqui loads its model into model_registry on this first synthesis
+        service = TTSService()
+        synthesize = getattr(service, f"_synthesize_with_{name}", None)
+        if synthesize is None:
+            raise Exception(f"Unknown TTS engine: {name}")
+        
+        def warm_up():
+            output_path = TEMP_DIR / f"preload_{name}_{uuid.uuid4().hex[:8]}.wav"
+            try:
+                result = synthesize(PRELOAD_WARMUP_TEXT, PRELOAD_WARMUP_TARGET_LANG, str(output_path))
+                if not result or not os.path.exists(result):
+                    raise Exception(f"TTS engine {name} produced no audio")
+            finally:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+        return warm_up
+    
+    def status(self):
+        """Per-model readiness; ready only once every configured model is loaded and warm"""
+        with self.lock:
+            models = {entry: dict(state) for entry, state in self.states.items()}
+        return {
+            'ready': all(state['state'] == 'ready' for state in models.values()),
+            'started_at': self.started_at,
+            'models': models
+        }
+
+class ModelPrefetcher:
+    """Prepares the models of the next queued jobs on a background thread while earlier jobs run
+    
+    Per model: start the background download if it is missing, load it into model_registry
+    if it fits in memory, otherwise read its weight files into the page cache. job_started()
+    records in videotranslat_model_prefetch_total whether that work was done before the job
+    needed the model.
+    """
+    
+    def __init__(self, lookahead=PREFETCH_LOOKAHEAD, full_load=PREFETCH_FULL_LOAD, memory_reserve=PREFETCH_MEMORY_RESERVE):
+        self.lookahead = lookahead
+        self.full_load = full_load
+        self.memory_reserve = memory_reserve
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        # registry key -> pending, running, downloading, loaded, warmed, skipped or failed
+        self.states = {}
+        
+        self.thread = threading.Thread(target=self._prefetch_loop, name='model-prefetch')
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def required_models(self, task_data):
+        """(kind, name, registry key) for each model the job will load, in pipeline order"""
+        if task_data.get('mode') == 'step_stage':
+            step = task_data.get('step')
+            stt = step == 3
+            translation = step == 4
+            tts = step == 5
+        else:
+            stt = task_data.get('enable_step3_stt', True) and 'custom_text' not in task_data
+            translation = task_data.get('enable_step4_translation', True)
+            tts = task_data.get('enable_step5_tts', True) and task_data.get('output_mode', 'dub') != 'subtitles'
+        
+        models = []
+        if stt and task_data.get('stt_model'):
+            models.append(('stt', task_data['stt_model'], model_registry.key('stt', task_data['stt_model'])))
+        if translation and task_data.get('translation_model'):
+            models.append(('translation', task_data['translation_model'], model_registry.key('translation', task_data['translation_model'])))
+        # gTTS/Edge are remote services; only Coqui has weights to prepare
+        custom_coqui_model = task_data.get('custom_coqui_model')
+        if tts and task_data.get('tts_model') == 'coqui' and task_data.get('target_lang') != 'lo' and not (custom_coqui_model or '').endswith('.pth'):
+            coqui_model = TTSService._coqui_model_name(task_data.get('target_lang'), custom_coqui_model)
+            if coqui_model:
+                models.append(('tts', coqui_model, f"tts:coqui:{coqui_model}"))
+        return models
+    
+    def schedule(self, upcoming_jobs):
+        """Queue prefetches for the models of the next `lookahead` jobs that are not resident yet"""
+        for job in upcoming_jobs[:self.lookahead]:
+            for kind, name, key in self.required_models(job['task_data']):
+                with self.lock:
+                    if key in self.states or model_registry.is_loaded(key):
+                        continue
+                    self.states[key] = 'pending'
+                self.requests.put((kind, name, key, job['task_data']))
+    
+    def job_started(self, job):
+        """Count, per model the job needs, whether the prefetch got there first"""
+        for kind, name, key in self.required_models(job['task_data']):
+            with self.lock:
+                state = self.states.pop(key, None)
+            if state in ('loaded', 'warmed', 'skipped', 'failed'):
+                result = state
+            elif state in ('pending', 'running', 'downloading'):
+                result = 'in_progress'
+            elif model_registry.is_loaded(key):
+                result = 'resident'
+            else:
+                result = 'miss'
+            pipeline_metrics.inc('videotranslat_model_prefetch_total', model=key, result=result)
+            queue_log.debug(f"🔮 Prefetch {key} for {job['task_id']}: {result}")
+    
+    def _finish(self, key, state):
+        with self.lock:
+            # A job that already started owns the model now; don't leave a stale state behind
+            if key in self.states:
+                self.states[key] = state
+    
+    def _prefetch_loop(self):
+        while True:
+            kind, name, key, task_data = self.requests.get()
+            if kind is None:
+                break
+            with self.lock:
+                if self.states.get(key) != 'pending':
+                    continue  # The job started before its turn came
+                self.states[key] = 'running'
+            
+            try:
+                prefetch_start = time.time()
+                with tracer.span('model_prefetch', model=key) as span:
+                    state = self._prefetch(kind, name, key, task_data)
+                    span.set(result=state)
+                pipeline_metrics.observe('videotranslat_model_prefetch_seconds', time.time() - prefetch_start, action=state)
+                models_log.info(f"🔮 Prefetched {key}: {state} in {time.time() - prefetch_start:.1f}s")
+            except Exception as e:
+                state = 'failed'
+                models_log.warning(f"⚠️  Prefetch of {key} failed: {e}")
+            self._finish(key, state)
+    
+    def _prefetch(self, kind, name, key, task_data):
+        if model_registry.is_loaded(key):
+            return 'loaded'
+        
+        if kind == 'tts':
+            # Coqui weights live in the TTS package cache: load by synthesising one short sentence
+            output_path = TEMP_DIR / f"prefetch_{uuid.uuid4().hex[:8]}.wav"
+            try:
+                TTSService()._synthesize_with_coqui(PRELOAD_WARMUP_TEXT, task_data.get('target_lang'), str(output_path),
+                                                    custom_coqui_model=task_data.get('custom_coqui_model'))
+            finally:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+            return 'loaded' if model_registry.is_loaded(key) else 'failed'
+        
+        downloader = ModelDownloader()
+        if kind == 'translation' and name in downloader.download_paths and not downloader.is_model_available(name):
+            # The job's own download_model() joins this download instead of starting from zero
+            downloader.start_download(name)
+            return 'downloading'
+        
+        files = self._model_files(downloader.resolve_model_path(name))
+        weight_bytes = sum(size for path, size in files if path.suffix in ('.safetensors', '.bin', '.pt'))
+        available = psutil.virtual_memory().available
+        
+        if self.full_load and weight_bytes and weight_bytes + self.memory_reserve < available:
+            if kind == 'stt':
+                VideoProcessor()._ensure_whisper_model(name)
+            else:
+                TranslationService()._load_translation_model(name)
+            return 'loaded'
+        
+        if files and sum(size for _, size in files) < available:
+            self._warm_page_cache(files)
+            return 'warmed'
+        return 'skipped'
+    
+    def _model_files(self, model_path):
+        """(path, size) of a model's files: its models/ directory or its Hugging Face cache snapshot"""
+        directory = Path(model_path)
+        if not directory.is_dir():
+            hf_home = Path(os.environ.get('HF_HOME', Path.home() / '.cache' / 'huggingface'))
+            cache_dir = Path(os.environ.get('HF_HUB_CACHE', hf_home / 'hub'))
+            directory = cache_dir / f"models--{model_path.replace('/', '--')}" / 'snapshots'
+            if not directory.is_dir():
+                return []
+        
+        # Snapshot entries are symlinks into blobs/; resolve so shared blobs are read once
+        files = {}
+        for path in directory.rglob('*'):
+            if path.is_file() and not path.name.endswith('.incomplete'):
+                files[path.resolve()] = path.stat().st_size
+        return sorted(files.items())
+    
+    def _warm_page_cache(self, files):
+        """Read the files once so the job's from_pretrained() hits memory instead of disk"""
+        for path, _ in files:
+            with open(path, 'rb') as f:
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                while f.read(PREFETCH_READ_BLOCK):
+                    pass
+    
+    def stop(self):
+        self.requests.put((None, None, None, None))
+
 class AdvancedSubtitleService:
     """บริการดึงและแปลซับไตเติลจาก YouTube แบบ Real-time"""
     def __init__(self):
@@ -3328,6 +6114,8 @@ class AdvancedSubtitleService:
 
     def get_youtube_subtitles(self, youtube_url, lang_code='auto'):
         """ดึงซับไตเติลจาก YouTube (auto-generated หรือ manual)"""
+        from youtube_transcript_api._api import YouTubeTranscriptApi
+        from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
         try:
             video_id = self.extract_video_id(youtube_url)
             # ถ้า lang_code เป็น auto จะดึงภาษาแรกที่เจอ
@@ -3432,6 +6220,52 @@ class AdvancedSubtitleService:
             'translated_text': translated_text
         } 
 
+class SubtitleExporter:
+    """สร้างไฟล์ซับไตเติล SRT/WebVTT จาก segments ที่มี timestamps"""
+    
+    def write_subtitles(self, segments, task_id, lang, text_key='translation'):
+        """Write SRT and WebVTT files to OUTPUTS_DIR and return {'srt': path, 'vtt': path}"""
+        cues = [
+            (segment['start'], segment['end'], (segment.get(text_key) or segment.get('text', '')).strip())
+            for segment in segments
+        ]
+        cues = [cue for cue in cues if cue[2]]
+        if not cues:
+            raise Exception("No subtitle cues to write")
+        
+        srt_path = OUTPUTS_DIR / f"{task_id}_subtitles.{lang}.srt"
+        vtt_path = OUTPUTS_DIR / f"{task_id}_subtitles.{lang}.vtt"
+        
+        with open(srt_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_srt(cues))
+        with open(vtt_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_webvtt(cues))
+        
+        video_log.debug(f"📝 สร้างซับไตเติล {len(cues)} cues: {srt_path}, {vtt_path}")
+        return {'srt': str(srt_path), 'vtt': str(vtt_path)}
+    
+    def to_srt(self, cues):
+        """Format (start, end, text) cues as SubRip"""
+        blocks = []
+        for index, (start, end, text) in enumerate(cues, 1):
+            blocks.append(f"{index}\n{self._format_timestamp(start, ',')} --> {self._format_timestamp(end, ',')}\n{text}\n")
+        return '\n'.join(blocks)
+    
+    def to_webvtt(self, cues):
+        """Format (start, end, text) cues as WebVTT"""
+        blocks = ['WEBVTT\n']
+        for start, end, text in cues:
+            blocks.append(f"{self._format_timestamp(start, '.')} --> {self._format_timestamp(end, '.')}\n{text}\n")
+        return '\n'.join(blocks)
+    
+    def _format_timestamp(self, seconds, millis_separator):
+        """Format seconds as HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm (WebVTT)"""
+        total_ms = int(round(max(seconds, 0) * 1000))
+        hours, remainder = divmod(total_ms, 3600 * 1000)
+        minutes, remainder = divmod(remainder, 60 * 1000)
+        secs, millis = divmod(remainder, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}{millis_separator}{millis:03d}"
+
 class AudioPreprocessor:
     """Audio preprocessing for better STT performance"""
     
@@ -3445,15 +6279,15 @@ class AudioPreprocessor:
         if WEBRTCVAD_AVAILABLE:
             try:
                 self.vad = webrtcvad.Vad(VAD_MODE)
-                print("✅ VAD initialized successfully")
+                video_log.debug("✅ VAD initialized successfully")
             except Exception as e:
-                print(f"⚠️  VAD initialization failed: {e}")
+                video_log.warning(f"⚠️  VAD initialization failed: {e}")
                 self.vad = None
     
     def preprocess_audio(self, audio_path, task_id):
         """Preprocess audio for better STT performance"""
         try:
-            print(f"🔧 เริ่ม preprocessing audio: {audio_path}")
+            video_log.debug(f"🔧 เริ่ม preprocessing audio: {audio_path}")
             
             # Load audio
             audio, sr = librosa.load(audio_path, sr=self.sample_rate)
@@ -3461,7 +6295,7 @@ class AudioPreprocessor:
             if len(audio) == 0:
                 raise Exception("Audio file is empty")
             
-            print(f"📊 Original audio: {len(audio)/sr:.2f}s, {sr}Hz")
+            video_log.debug(f"📊 Original audio: {len(audio)/sr:.2f}s, {sr}Hz")
             
             # Apply preprocessing steps
             processed_audio = audio.copy()
@@ -3486,18 +6320,18 @@ class AudioPreprocessor:
             preprocessed_path = self.audios_dir / f"{task_id}_preprocessed.wav"
             sf.write(str(preprocessed_path), processed_audio, sr)
             
-            print(f"✅ Preprocessing completed: {len(processed_audio)/sr:.2f}s")
+            video_log.debug(f"✅ Preprocessing completed: {len(processed_audio)/sr:.2f}s")
             return str(preprocessed_path)
             
         except Exception as e:
-            print(f"❌ Audio preprocessing failed: {e}")
+            video_log.error(f"❌ Audio preprocessing failed: {e}")
             # Return original audio if preprocessing fails
             return audio_path
     
     def _reduce_noise(self, audio, sr):
         """Reduce noise in audio"""
         try:
-            print("🔇 Applying noise reduction...")
+            video_log.debug("🔇 Applying noise reduction...")
             reduced = nr.reduce_noise(
                 y=audio, 
                 sr=sr, 
@@ -3506,13 +6340,13 @@ class AudioPreprocessor:
             )
             return reduced
         except Exception as e:
-            print(f"⚠️  Noise reduction failed: {e}")
+            video_log.warning(f"⚠️  Noise reduction failed: {e}")
             return audio
     
     def _apply_bandpass_filter(self, audio, sr):
         """Apply bandpass filter to focus on speech frequencies"""
         try:
-            print("🎵 Applying bandpass filter...")
+            video_log.debug("🎵 Applying bandpass filter...")
             # Design bandpass filter
             nyquist = sr / 2
             low = BANDPASS_LOW / nyquist
@@ -3524,13 +6358,13 @@ class AudioPreprocessor:
             
             return filtered
         except Exception as e:
-            print(f"⚠️  Bandpass filter failed: {e}")
+            video_log.warning(f"⚠️  Bandpass filter failed: {e}")
             return audio
     
     def _apply_vad(self, audio, sr):
         """Apply Voice Activity Detection to remove silence"""
         try:
-            print("🎤 Applying Voice Activity Detection...")
+            video_log.debug("🎤 Applying Voice Activity Detection...")
             
             # Convert to 16-bit PCM for VAD
             audio_int16 = (audio * 32767).astype(np.int16)
@@ -3554,17 +6388,17 @@ class AudioPreprocessor:
                 speech_audio = speech_audio.astype(np.float32) / 32767
                 return speech_audio
             else:
-                print("⚠️  No speech detected, returning original audio")
+                video_log.warning("⚠️  No speech detected, returning original audio")
                 return audio
                 
         except Exception as e:
-            print(f"⚠️  VAD failed: {e}")
+            video_log.warning(f"⚠️  VAD failed: {e}")
             return audio
     
     def _normalize_audio(self, audio):
         """Normalize audio levels"""
         try:
-            print("📊 Normalizing audio levels...")
+            video_log.debug("📊 Normalizing audio levels...")
             
             # Calculate RMS
             rms = np.sqrt(np.mean(audio**2))
@@ -3580,7 +6414,7 @@ class AudioPreprocessor:
                 return audio
                 
         except Exception as e:
-            print(f"⚠️  Normalization failed: {e}")
+            video_log.warning(f"⚠️  Normalization failed: {e}")
             return audio
 
 class  UltimateVocalRemover:
@@ -3597,7 +6431,7 @@ class  UltimateVocalRemover:
     def _load_models(self):
         """โหลดโมเดล Ultimate Vocal Remover"""
         try:
-            print("🔧 กำลังโหลด Ultimate Vocal Remover models...")
+            uvr_log.debug("🔧 กำลังโหลด Ultimate Vocal Remover models...")
             
             # Model paths
             models_dir = Path("models")
@@ -3605,12 +6439,12 @@ class  UltimateVocalRemover:
             mdx_models_dir = models_dir / "MDX_Net_Models"
             
             if not models_dir.exists():
-                print("⚠️  ไม่พบโฟลเดอร์ models/ สำหรับ Ultimate Vocal Remover")
+                uvr_log.warning("⚠️  ไม่พบโฟลเดอร์ models/ สำหรับ Ultimate Vocal Remover")
                 return
             
             # Load VR Architecture models (.pth files)
             if vr_models_dir.exists():
-                print("📁 ตรวจพบโฟลเดอร์ VR_Models...")
+                uvr_log.debug("📁 ตรวจพบโฟลเดอร์ VR_Models...")
                 
                 # Load VR models
                 vr_model_files = [
@@ -3625,13 +6459,13 @@ class  UltimateVocalRemover:
                             # Load PyTorch model
                             model_data = torch.load(str(vr_model_path), map_location=self.device)
                             self.models[f'vr_{vr_model}'] = model_data
-                            print(f"✅ โหลด VR model: {vr_model}")
+                            uvr_log.debug(f"✅ โหลด VR model: {vr_model}")
                         except Exception as e:
-                            print(f"⚠️  ไม่สามารถโหลด VR model {vr_model}: {e}")
+                            uvr_log.warning(f"⚠️  ไม่สามารถโหลด VR model {vr_model}: {e}")
             
             # Load MDX Net models (.onnx files)
             if mdx_models_dir.exists() and ONNX_AVAILABLE:
-                print("📁 ตรวจพบโฟลเดอร์ MDX_Net_Models...")
+                uvr_log.debug("📁 ตรวจพบโฟลเดอร์ MDX_Net_Models...")
                 
                 mdx_model_files = [
                     "Kim_Vocal_2.onnx",
@@ -3645,33 +6479,33 @@ class  UltimateVocalRemover:
                         if mdx_model_path.stat().st_size > 1024*1024:
                             try:
                                 self.models[f'mdx_{mdx_model}'] = ort.InferenceSession(str(mdx_model_path))
-                                print(f"✅ โหลด MDX model: {mdx_model}")
+                                uvr_log.debug(f"✅ โหลด MDX model: {mdx_model}")
                             except Exception as e:
-                                print(f"⚠️  ไม่สามารถโหลด MDX model {mdx_model}: {e}")
+                                uvr_log.warning(f"⚠️  ไม่สามารถโหลด MDX model {mdx_model}: {e}")
                         else:
-                            print(f"⚠️  ข้าม dummy model: {mdx_model} (ขนาด: {mdx_model_path.stat().st_size} bytes)")
+                            uvr_log.warning(f"⚠️  ข้าม dummy model: {mdx_model} (ขนาด: {mdx_model_path.stat().st_size} bytes)")
             
             # Set default models (prioritize MDX models for better compatibility)
             if 'mdx_Kim_Vocal_2.onnx' in self.models:
                 self.models['vocal'] = self.models['mdx_Kim_Vocal_2.onnx']
-                print("✅ ใช้ MDX model สำหรับแยกเสียงร้อง")
+                uvr_log.debug("✅ ใช้ MDX model สำหรับแยกเสียงร้อง")
             elif 'vr_1_HP-UVR.pth' in self.models:
                 self.models['vocal'] = self.models['vr_1_HP-UVR.pth']
-                print("✅ ใช้ VR model สำหรับแยกเสียงร้อง (fallback)")
+                uvr_log.debug("✅ ใช้ VR model สำหรับแยกเสียงร้อง (fallback)")
             
             if 'mdx_UVR-MDX-NET-Inst_HQ_3.onnx' in self.models:
                 self.models['instrumental'] = self.models['mdx_UVR-MDX-NET-Inst_HQ_3.onnx']
-                print("✅ ใช้ MDX model สำหรับแยกดนตรี")
+                uvr_log.debug("✅ ใช้ MDX model สำหรับแยกดนตรี")
             
             # Fallback to dummy models if no real models found
             if not self.models:
-                print("🔄 ไม่พบโมเดลจริง ใช้โมเดลจำลอง...")
+                uvr_log.debug("🔄 ไม่พบโมเดลจริง ใช้โมเดลจำลอง...")
                 self._load_dummy_models(models_dir)
             
-            print(f"🎵 โหลด Ultimate Vocal Remover models สำเร็จ: {len(self.models)} models")
+            uvr_log.debug(f"🎵 โหลด Ultimate Vocal Remover models สำเร็จ: {len(self.models)} models")
             
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการโหลด Ultimate Vocal Remover models: {e}")
+            uvr_log.error(f"❌ เกิดข้อผิดพลาดในการโหลด Ultimate Vocal Remover models: {e}")
             # Load dummy models as fallback
             self._load_dummy_models(Path("models"))
     
@@ -3684,7 +6518,7 @@ class  UltimateVocalRemover:
                 import pickle
                 with open(vocal_dummy_path, 'rb') as f:
                     self.models['vocal'] = pickle.load(f)
-                print("✅ โหลด Vocal Separation model (Dummy) สำเร็จ")
+                uvr_log.debug("✅ โหลด Vocal Separation model (Dummy) สำเร็จ")
             
             # Load instrumental separation dummy model
             instrumental_dummy_path = models_dir / "UVR-MDX-NET-Inst_FT.pkl"
@@ -3692,16 +6526,16 @@ class  UltimateVocalRemover:
                 import pickle
                 with open(instrumental_dummy_path, 'rb') as f:
                     self.models['instrumental'] = pickle.load(f)
-                print("✅ โหลด Instrumental Separation model (Dummy) สำเร็จ")
+                uvr_log.debug("✅ โหลด Instrumental Separation model (Dummy) สำเร็จ")
             
         except Exception as e:
-            print(f"⚠️  ไม่สามารถโหลดโมเดลจำลอง: {e}")
+            uvr_log.warning(f"⚠️  ไม่สามารถโหลดโมเดลจำลอง: {e}")
     
     def separate_audio(self, audio_path, task_id):
         """แยกเสียงออกจากดนตรี"""
         try:
-            print(f"🎵 เริ่มต้นการแยกเสียงด้วย Ultimate Vocal Remover...")
-            print(f"   ไฟล์เสียง: {audio_path}")
+            uvr_log.debug(f"🎵 เริ่มต้นการแยกเสียงด้วย Ultimate Vocal Remover...")
+            uvr_log.debug(f"   ไฟล์เสียง: {audio_path}")
             
             # Load audio
             audio, sr = self._load_audio(audio_path)
@@ -3721,9 +6555,9 @@ class  UltimateVocalRemover:
             sf.write(str(vocals_path), vocals, sr)
             sf.write(str(instrumental_path), instrumental, sr)
             
-            print(f"✅ แยกเสียงสำเร็จ:")
-            print(f"   🎤 เสียงร้อง: {vocals_path}")
-            print(f"   🎵 ดนตรี: {instrumental_path}")
+            uvr_log.debug(f"✅ แยกเสียงสำเร็จ:")
+            uvr_log.debug(f"   🎤 เสียงร้อง: {vocals_path}")
+            uvr_log.debug(f"   🎵 ดนตรี: {instrumental_path}")
             
             # Clean up temporary files (keep only final results)
             self._cleanup_temp_files(task_id)
@@ -3737,7 +6571,7 @@ class  UltimateVocalRemover:
             }
             
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการแยกเสียง: {e}")
+            uvr_log.error(f"❌ เกิดข้อผิดพลาดในการแยกเสียง: {e}")
             # Clean up any temporary files even on error
             self._cleanup_temp_files(task_id)
             # Fallback to original audio
@@ -3755,7 +6589,7 @@ class  UltimateVocalRemover:
             audio, sr = librosa.load(audio_path, sr=None)
             return audio, sr
         except Exception as e:
-            print(f"⚠️  ไม่สามารถโหลดด้วย librosa: {e}")
+            uvr_log.warning(f"⚠️  ไม่สามารถโหลดด้วย librosa: {e}")
             try:
                 # Fallback to soundfile
                 audio, sr = sf.read(audio_path)
@@ -3763,7 +6597,7 @@ class  UltimateVocalRemover:
                     audio = audio[:, 0]  # Convert to mono
                 return audio, sr
             except Exception as e2:
-                print(f"❌ ไม่สามารถโหลดไฟล์เสียง: {e2}")
+                uvr_log.error(f"❌ ไม่สามารถโหลดไฟล์เสียง: {e2}")
                 raise Exception(f"ไม่สามารถโหลดไฟล์เสียง: {e2}")
     
     def _separate_vocals_instrumental(self, audio, sr):
@@ -3771,7 +6605,7 @@ class  UltimateVocalRemover:
         try:
             # If models are not available, use fallback method
             if not self.models:
-                print("⚠️  ไม่มี Ultimate Vocal Remover models ใช้ fallback method")
+                uvr_log.warning("⚠️  ไม่มี Ultimate Vocal Remover models ใช้ fallback method")
                 return self._fallback_separation(audio, sr)
             
             # Check model types
@@ -3780,7 +6614,7 @@ class  UltimateVocalRemover:
             has_dummy_model = 'vocal' in self.models and isinstance(self.models['vocal'], dict)
             
             # Process entire file without chunking (for smaller files)
-            print(f"🎵 ประมวลผลไฟล์เสียงทั้งหมด ({len(audio)} samples)")
+            uvr_log.debug(f"🎵 ประมวลผลไฟล์เสียงทั้งหมด ({len(audio)} samples)")
             
             # Normalize audio
             audio_normalized = audio / np.max(np.abs(audio))
@@ -3807,41 +6641,41 @@ class  UltimateVocalRemover:
             return vocals, instrumental
             
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการแยกเสียง: {e}")
+            uvr_log.error(f"❌ เกิดข้อผิดพลาดในการแยกเสียง: {e}")
             return self._fallback_separation(audio, sr)
     
     def _process_with_vr_models(self, audio, sr):
         """ประมวลผลด้วย VR models"""
         try:
-            print("🎵 ใช้ VR models สำหรับแยกเสียง...")
+            uvr_log.debug("🎵 ใช้ VR models สำหรับแยกเสียง...")
             
             # VR models are state dicts, not callable models
             # Use fallback method for VR models since they require specific architecture
-            print("⚠️  VR models เป็น state dicts ใช้ fallback method...")
+            uvr_log.warning("⚠️  VR models เป็น state dicts ใช้ fallback method...")
             return self._fallback_separation(audio, sr)
             
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการประมวลผลด้วย VR models: {e}")
+            uvr_log.error(f"❌ เกิดข้อผิดพลาดในการประมวลผลด้วย VR models: {e}")
             return audio, audio
     
     def _process_with_mdx_models(self, audio, sr):
         """ประมวลผลด้วย MDX models"""
         try:
-            print("🎵 ใช้ MDX models สำหรับแยกเสียง...")
+            uvr_log.debug("🎵 ใช้ MDX models สำหรับแยกเสียง...")
             
             # MDX models require spectrogram input, not raw audio
             # Since converting to proper spectrogram is complex, use fallback method
-            print("⚠️  MDX models ต้องการ spectrogram input ใช้ fallback method...")
+            uvr_log.warning("⚠️  MDX models ต้องการ spectrogram input ใช้ fallback method...")
             return self._fallback_separation(audio, sr)
             
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการประมวลผลด้วย MDX models: {e}")
+            uvr_log.error(f"❌ เกิดข้อผิดพลาดในการประมวลผลด้วย MDX models: {e}")
             return audio, audio
     
     def _process_with_dummy_models(self, audio, sr):
         """ประมวลผลด้วยโมเดลจำลอง"""
         try:
-            print("🔄 ใช้โมเดลจำลองสำหรับแยกเสียง...")
+            uvr_log.debug("🔄 ใช้โมเดลจำลองสำหรับแยกเสียง...")
             
             # Simple bandpass filter for vocals (80-8000 Hz)
             nyquist = sr / 2
@@ -3862,14 +6696,14 @@ class  UltimateVocalRemover:
             return vocals, instrumental
             
         except Exception as e:
-            print(f"❌ เกิดข้อผิดพลาดในการประมวลผลด้วยโมเดลจำลอง: {e}")
+            uvr_log.error(f"❌ เกิดข้อผิดพลาดในการประมวลผลด้วยโมเดลจำลอง: {e}")
             return audio, audio
     
 
     
     def _fallback_separation(self, audio, sr):
         """Fallback method สำหรับแยกเสียง"""
-        print("🔄 ใช้ fallback method สำหรับแยกเสียง")
+        uvr_log.debug("🔄 ใช้ fallback method สำหรับแยกเสียง")
         
         # Simple high-pass filter for vocals
         vocals = self._extract_vocals_simple(audio, sr)
@@ -3881,9 +6715,9 @@ class  UltimateVocalRemover:
         vocals = vocals / np.max(np.abs(vocals)) if np.max(np.abs(vocals)) > 0 else vocals
         instrumental = instrumental / np.max(np.abs(instrumental)) if np.max(np.abs(instrumental)) > 0 else instrumental
         
-        print(f"✅ Fallback separation completed")
-        print(f"   🎤 Vocals RMS: {np.sqrt(np.mean(vocals**2)):.6f}")
-        print(f"   🎵 Instrumental RMS: {np.sqrt(np.mean(instrumental**2)):.6f}")
+        uvr_log.debug(f"✅ Fallback separation completed")
+        uvr_log.debug(f"   🎤 Vocals RMS: {np.sqrt(np.mean(vocals**2)):.6f}")
+        uvr_log.debug(f"   🎵 Instrumental RMS: {np.sqrt(np.mean(instrumental**2)):.6f}")
         
         return vocals, instrumental
     
@@ -3922,9 +6756,9 @@ class  UltimateVocalRemover:
                     try:
                         if os.path.exists(temp_file):
                             os.remove(temp_file)
-                            print(f"🗑️  ลบไฟล์ชั่วคราว: {os.path.basename(temp_file)}")
+                            uvr_log.debug(f"🗑️  ลบไฟล์ชั่วคราว: {os.path.basename(temp_file)}")
                     except Exception as e:
-                        print(f"⚠️  ไม่สามารถลบไฟล์ชั่วคราว {temp_file}: {e}")
+                        uvr_log.warning(f"⚠️  ไม่สามารถลบไฟล์ชั่วคราว {temp_file}: {e}")
             
             # Clean up any other temporary audio files
             temp_audio_patterns = [
@@ -3941,11 +6775,11 @@ class  UltimateVocalRemover:
                         try:
                             if os.path.exists(temp_file):
                                 os.remove(temp_file)
-                                print(f"🗑️  ลบไฟล์เสียงชั่วคราว: {os.path.basename(temp_file)}")
+                                uvr_log.debug(f"🗑️  ลบไฟล์เสียงชั่วคราว: {os.path.basename(temp_file)}")
                         except Exception as e:
-                            print(f"⚠️  ไม่สามารถลบไฟล์เสียงชั่วคราว {temp_file}: {e}")
+                            uvr_log.warning(f"⚠️  ไม่สามารถลบไฟล์เสียงชั่วคราว {temp_file}: {e}")
             
-            print("🧹 ทำความสะอาดไฟล์ชั่วคราวเสร็จสิ้น")
+            uvr_log.debug("🧹 ทำความสะอาดไฟล์ชั่วคราวเสร็จสิ้น")
             
         except Exception as e:
-            print(f"⚠️  เกิดข้อผิดพลาดในการทำความสะอาดไฟล์ชั่วคราว: {e}")
\ No newline at end of file
+            uvr_log.warning(f"⚠️  เกิดข้อผิดพลาดในการทำความสะอาดไฟล์ชั่วคราว: {e}")
\ No newline at end of file
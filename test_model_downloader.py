@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the background model download manager
+ทดสอบระบบดาวน์โหลดโมเดล (resume, ตรวจ hash, progress, marker)
+
+Runs ModelDownloadManager against a local HTTP stand-in with the Hugging Face layout
+(and a file:// mirror of the same tree): interrupted transfers must resume with a Range
+request, corrupted files must be fetched again, a file that never matches the manifest
+must leave the model unavailable, and a directory without the completion marker must
+not count as downloaded.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import http.server
+from pathlib import Path
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import ModelDownloadManager, ModelDownloader
+
+REPO_ID = 'test-org/tiny-model'
+REVISION = 'f' * 40
+
+def build_repo():
+    """ไฟล์ในรีโปทดสอบ: ไฟล์เล็ก (git blob sha1) และ weights ขนาดใหญ่ (LFS sha256)"""
+    return {
+        'config.json': json.dumps({'model_type': 'm2m_100', 'd_model': 16}).encode(),
+        'tokenizer_config.json': json.dumps({'model_max_length': 1024}).encode(),
+        'model.safetensors': os.urandom(3 * 1024 * 1024 + 123),
+        'pytorch_model.bin': os.urandom(256 * 1024),  # Skipped: safetensors weights exist
+        'flax_model.msgpack': os.urandom(64 * 1024)  # Skipped: other framework
+    }
+
+def write_mirror(root, files, corrupt_manifest=()):
+    """เขียน manifest และไฟล์ตามโครงสร้าง /api/models/... และ /<repo>/resolve/<sha>/..."""
+    siblings = []
+    for name, data in files.items():
+        if name.endswith(('.json', '.txt')):
+            blob_id = hashlib.sha1(f"blob {len(data)}\0".encode() + data).hexdigest()
+            siblings.append({'rfilename': name, 'size': len(data), 'blobId': blob_id})
+        else:
+            sha256 = hashlib.sha256(data).hexdigest()
+            if name in corrupt_manifest:
+                sha256 = '0' * 64
+            siblings.append({'rfilename': name, 'size': len(data), 'blobId': '1' * 40,
+                             'lfs': {'sha256': sha256, 'size': len(data), 'pointerSize': 134}})
+    
+    manifest_path = root / 'api' / 'models' / REPO_ID / 'revision' / 'main'
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps({'id': REPO_ID, 'sha': REVISION, 'siblings': siblings}), encoding='utf-8')
+    
+    for name, data in files.items():
+        file_path = root / REPO_ID / 'resolve' / REVISION / name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(data)
+
+class HubStandInHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the mirror tree with Range support, plus one-shot connection drops and corruption"""
+    
+    def do_GET(self):
+        path = self.server.root / self.path.split('?')[0].lstrip('/')
+        if not path.is_file():
+            self.send_error(404)
+            return
+        data = path.read_bytes()
+        name = path.name
+        
+        start = 0
+        range_header = self.headers.get('Range')
+        if range_header:
+            start = int(range_header.split('=')[1].split('-')[0])
+            self.server.range_requests.append((name, start))
+        body = data[start:]
+        
+        with self.server.lock:
+            drop_after = self.server.drop_after.pop(name, None)
+            corrupt = name in self.server.corrupt_once
+            self.server.corrupt_once.discard(name)
+        if corrupt:
+            body = bytes(byte ^ 0xFF for byte in body[:1024]) + body[1024:]
+        
+        self.send_response(206 if range_header else 200)
+        self.send_header('Content-Length', str(len(body)))
+        if range_header:
+            self.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.end_headers()
+        
+        if drop_after is not None:
+            # Connection lost mid-transfer: the client has a partial file to resume from
+            self.wfile.write(body[:drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        for offset in range(0, len(body), 256 * 1024):
+            self.wfile.write(body[offset:offset + 256 * 1024])
+            time.sleep(self.server.chunk_delay)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_stand_in(root):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), HubStandInHandler)
+    server.daemon_threads = True
+    server.root = root
+    server.lock = threading.Lock()
+    server.range_requests = []
+    server.drop_after = {}
+    server.corrupt_once = set()
+    server.chunk_delay = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+def make_downloader(endpoint, models_dir):
+    downloader = ModelDownloader(download_manager=ModelDownloadManager(endpoint=endpoint, workers=4))
+    downloader.download_paths = {
+        'tiny': {'url': f'https://huggingface.co/{REPO_ID}', 'local_path': str(models_dir / 'tiny-model'), 'type': 'translation'}
+    }
+    return downloader
+
+def check_download(downloader, files):
+    """ตรวจว่าไฟล์ครบ ตรงกับต้นฉบับ ไม่มีไฟล์ค้าง และ progress ครบ 100%"""
+    local_path = Path(downloader.download_paths['tiny']['local_path'])
+    problems = []
+    for name in ('config.json', 'tokenizer_config.json', 'model.safetensors'):
+        if not (local_path / name).exists() or (local_path / name).read_bytes() != files[name]:
+            problems.append(f"{name} missing or different")
+    for name in ('pytorch_model.bin', 'flax_model.msgpack'):
+        if (local_path / name).exists():
+            problems.append(f"{name} should have been skipped")
+    if list(local_path.glob('*.incomplete')):
+        problems.append("leftover .incomplete files")
+    if not downloader.is_model_available('tiny'):
+        problems.append("completion marker missing")
+    
+    progress = downloader.get_download_progress('tiny')
+    if progress['state'] != 'complete' or progress['bytes_done'] != progress['bytes_total'] or progress['files_done'] != 3:
+        problems.append(f"unexpected progress {progress}")
+    return problems
+
+def run_case(name, fn):
+    print(f"\n🧪 {name}")
+    try:
+        problems = fn()
+    except Exception as e:
+        problems = [f"exception: {e}"]
+    for problem in problems:
+        print(f"   ❌ {problem}")
+    if not problems:
+        print("   ✅ ผ่าน")
+    return not problems
+
+def main():
+    """ฟังก์ชันหลัก"""
+    print("🚀 เริ่มทดสอบ ModelDownloadManager")
+    print("=" * 50)
+    
+    work_dir = Path(tempfile.mkdtemp(prefix='model_download_test_'))
+    files = build_repo()
+    mirror = work_dir / 'mirror'
+    write_mirror(mirror, files)
+    bad_mirror = work_dir / 'bad_mirror'
+    write_mirror(bad_mirror, files, corrupt_manifest=('model.safetensors',))
+    server = start_stand_in(mirror)
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    def fresh_models_dir(case):
+        models_dir = work_dir / case
+        shutil.rmtree(models_dir, ignore_errors=True)
+        return models_dir
+    
+    def case_http():
+        downloader = make_downloader(endpoint, fresh_models_dir('http'))
+        if not downloader.download_model('tiny'):
+            return [f"download failed: {downloader.get_download_progress('tiny')}"]
+        return check_download(downloader, files)
+    
+    def case_background_progress():
+        server.chunk_delay = 0.05
+        try:
+            downloader = make_downloader(endpoint, fresh_models_dir('background'))
+            started = time.perf_counter()
+            downloader.start_download('tiny')
+            returned_after = time.perf_counter() - started
+            time.sleep(0.2)
+            midway = downloader.get_download_progress('tiny')
+            downloader.download_manager.wait('tiny', timeout=60)
+        finally:
+            server.chunk_delay = 0
+        problems = check_download(downloader, files)
+        if returned_after > 0.5:
+            problems.append(f"start_download blocked for {returned_after:.1f}s")
+        if midway['state'] != 'downloading' or not (0 < midway['bytes_done'] < midway['bytes_total']):
+            problems.append(f"no partial progress while downloading: {midway}")
+        print(f"   📊 ระหว่างดาวน์โหลด: {midway['bytes_done']}/{midway['bytes_total']} bytes ({midway['percent']}%)")
+        return problems
+    
+    def case_resume():
+        server.range_requests.clear()
+        server.drop_after['model.safetensors'] = 1024 * 1024 + 7
+        downloader = make_downloader(endpoint, fresh_models_dir('resume'))
+        if not downloader.download_model('tiny'):
+            return [f"download failed: {downloader.get_download_progress('tiny')}"]
+        problems = check_download(downloader, files)
+        # The client resumes from whatever it had written when the connection broke
+        resumed = [offset for name, offset in server.range_requests if name == 'model.safetensors']
+        if len(resumed) != 1 or not 0 < resumed[0] <= 1024 * 1024 + 7:
+            problems.append(f"expected one Range request inside the first {1024 * 1024 + 7} bytes, saw {resumed}")
+        else:
+            print(f"   📊 resume จาก byte {resumed[0]}")
+        return problems
+    
+    def case_corrupt_once():
+        server.corrupt_once.add('model.safetensors')
+        downloader = make_downloader(endpoint, fresh_models_dir('corrupt_once'))
+        if not downloader.download_model('tiny'):
+            return [f"download failed: {downloader.get_download_progress('tiny')}"]
+        return check_download(downloader, files)
+    
+    def case_hash_mismatch():
+        downloader = make_downloader(f"file://{bad_mirror}", fresh_models_dir('mismatch'))
+        ok = downloader.download_model('tiny')
+        progress = downloader.get_download_progress('tiny')
+        problems = []
+        if ok or downloader.is_model_available('tiny'):
+            problems.append("model with a bad hash was marked available")
+        if progress['state'] != 'error' or 'hash' not in (progress['error'] or ''):
+            problems.append(f"expected a hash error, got {progress}")
+        return problems
+    
+    def case_partial_directory():
+        models_dir = fresh_models_dir('partial')
+        partial = models_dir / 'tiny-model'
+        partial.mkdir(parents=True)
+        (partial / 'config.json').write_bytes(files['config.json'])
+        (partial / 'model.safetensors.incomplete').write_bytes(files['model.safetensors'][:1000])
+        downloader = make_downloader(endpoint, models_dir)
+        problems = []
+        if downloader.is_model_available('tiny'):
+            problems.append("half-downloaded directory counted as available")
+        if downloader.get_download_progress('tiny')['state'] != 'incomplete':
+            problems.append("partial directory not reported as incomplete")
+        server.range_requests.clear()
+        if not downloader.download_model('tiny'):
+            return problems + ["resumed download failed"]
+        if ('model.safetensors', 1000) not in server.range_requests:
+            problems.append(f"partial file was not resumed from byte 1000: {server.range_requests}")
+        return problems + check_download(downloader, files)
+    
+    def case_file_mirror():
+        downloader = make_downloader(f"file://{mirror}", fresh_models_dir('file_mirror'))
+        if not downloader.download_model('tiny'):
+            return [f"download failed: {downloader.get_download_progress('tiny')}"]
+        return check_download(downloader, files)
+    
+    cases = [
+        ("ดาวน์โหลดผ่าน HTTP stand-in", case_http),
+        ("ดาวน์โหลดเบื้องหลัง + progress", case_background_progress),
+        ("การเชื่อมต่อหลุดกลางไฟล์ -> resume ด้วย Range", case_resume),
+        ("ไฟล์เสียหายครั้งแรก -> ดาวน์โหลดใหม่", case_corrupt_once),
+        ("hash ไม่ตรง manifest -> ไม่ถือว่าพร้อมใช้งาน", case_hash_mismatch),
+        ("โฟลเดอร์ดาวน์โหลดไม่ครบ", case_partial_directory),
+        ("file:// mirror", case_file_mirror)
+    ]
+    results = [run_case(name, fn) for name, fn in cases]
+    
+    server.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    
+    print("\n" + "=" * 50)
+    print(f"📊 ผ่าน {sum(results)}/{len(results)} กรณี")
+    return 0 if all(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for JobQueue result deduplication
+ทดสอบการใช้ผลลัพธ์ซ้ำของงานที่เหมือนกัน (dedup)
+
+Runs a real JobQueue with _process_job replaced by a stand-in: an identical submission
+must join a job that is still queued/processing, and a job that failed must not be reused -
+the next identical submission gets a fresh job that actually runs.
+"""
+
+import os
+import sys
+import time
+import threading
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import JobQueue, pipeline_metrics
+
+def make_task_data():
+    """Same input fingerprint and parameters for every submission"""
+    return {
+        'mode': 'file_upload',
+        'video_input': 'uploads/dedup_test.mp4',
+        'input_fingerprint': 'sha256:dedup-test',
+        'source_lang': 'en',
+        'target_lang': 'th',
+        'stt_model': 'base',
+        'translation_model': 'nllb-200',
+        'tts_model': 'gtts',
+        'enable_step3_stt': False,
+        'enable_step4_translation': False,
+        'enable_step5_tts': False
+    }
+
+def wait_for_status(job_queue, task_id, statuses, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = job_queue.get_job_status(task_id)
+        if job is not None and job['status'] in statuses:
+            return job
+        time.sleep(0.05)
+    return job_queue.get_job_status(task_id)
+
+def active_jobs_gauge():
+    return pipeline_metrics.gauges['videotranslat_active_jobs']()
+
+def main():
+    """ฟังก์ชันหลัก"""
+    print("🚀 เริ่มทดสอบ result dedup ของ JobQueue")
+    print("=" * 50)
+    
+    job_queue = JobQueue(max_concurrent=1)
+    release = threading.Event()
+    runs = []
+    
+    def fake_process_job(job):
+        runs.append(job['task_id'])
+        release.wait(timeout=10)
+        if job['task_id'] == 't1':
+            raise Exception("simulated failure")
+    
+    job_queue._process_job = fake_process_job
+    problems = []
+    
+    print("\n🧪 งานที่ยังทำอยู่ -> งานซ้ำใช้งานเดิม")
+    job_queue.add_job('t1', make_task_data())
+    wait_for_status(job_queue, 't1', ('processing',))
+    duplicate = job_queue.add_job('t1-dup', make_task_data())
+    if duplicate['task_id'] != 't1':
+        problems.append(f"in-flight duplicate got its own job {duplicate['task_id']}")
+    
+    print("\n🧪 งานล้มเหลว -> ส่งใหม่ต้องประมวลผลใหม่")
+    release.set()
+    failed = wait_for_status(job_queue, 't1', ('error',))
+    if failed is None or failed['status'] != 'error':
+        problems.append(f"t1 did not fail: {failed and failed['status']}")
+    if active_jobs_gauge() != 0:
+        problems.append(f"active jobs gauge still counts the failed job ({active_jobs_gauge()})")
+    
+    retry = job_queue.add_job('t2', make_task_data())
+    if retry['task_id'] != 't2':
+        problems.append(f"resubmission was pointed at {retry['task_id']} ({retry['status']})")
+    finished = wait_for_status(job_queue, 't2', ('completed', 'error'))
+    if finished is None or finished['status'] != 'completed' or 't2' not in runs:
+        problems.append(f"resubmitted job did not run to completion: {finished and finished['status']}")
+    
+    job_queue.stop()
+    
+    for problem in problems:
+        print(f"   ❌ {problem}")
+    print("\n" + "=" * 50)
+    if problems:
+        print("❌ การทดสอบล้มเหลว")
+        return 1
+    print("✅ ผ่านทุกกรณี")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup import-time / memory regression test for main_optimized
+ทดสอบเวลา import และหน่วยความจำตอนเริ่มเว็บเซิร์ฟเวอร์
+
+Imports main_optimized in a fresh interpreter (python -X importtime) and fails when the
+import takes longer than --max-seconds, peak RSS exceeds --max-rss-mb, or any heavy
+library that services.py loads lazily (torch, transformers, librosa, yt-dlp, ...) was
+imported anyway. Prints the slowest top-level packages so a regression is easy to find.
+    
+    python test_startup_imports.py
+    python test_startup_imports.py --max-seconds 2 --max-rss-mb 150
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Loaded on first use by services.py; none of them may be imported by the web tier at startup
+HEAVY_MODULES = [
+    'torch', 'torchaudio', 'transformers', 'librosa', 'yt_dlp', 'gtts', 'youtube_transcript_api',
+    'noisereduce', 'webrtcvad', 'scipy', 'onnxruntime', 'cv2', 'edge_tts', 'TTS'
+]
+
+CHILD_SCRIPT = r'''
+import json, os, resource, sys, time
+start = time.perf_counter()
+import main_optimized
+elapsed = time.perf_counter() - start
+print("@@RESULT@@" + json.dumps({
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": sorted(sys.modules)
+}), flush=True)
+os._exit(0)  # skip joining the queue workers / metrics sampler started at import
+'''
+
+def measure_import():
+    """import main_optimized ใน process ใหม่ คืนค่า (ผลลัพธ์, เวลา import ต่อ package)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, timeout=300
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith('@@RESULT@@')]
+    if result.returncode != 0 or not lines:
+        raise Exception(f"import main_optimized failed:\n{result.stderr[-2000:]}")
+    
+    # "import time: self [us] | cumulative | imported package" -> self time summed per top-level package
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return json.loads(lines[0][len('@@RESULT@@'):]), packages
+
+def main():
+    """ฟังก์ชันหลัก"""
+    parser = argparse.ArgumentParser(description="Import-time and RSS regression test for main_optimized")
+    parser.add_argument('--max-seconds', type=float, default=3.0, help="Max time for import main_optimized")
+    parser.add_argument('--max-rss-mb', type=float, default=200, help="Max peak RSS after the import")
+    parser.add_argument('--runs', type=int, default=3, help="Best of N runs (first run warms the disk cache)")
+    parser.add_argument('--top', type=int, default=12, help="How many slow packages to list")
+    args = parser.parse_args()
+    
+    print("🚀 เริ่มทดสอบเวลา import ของ main_optimized")
+    print("=" * 50)
+    
+    runs = []
+    for i in range(args.runs):
+        runs.append(measure_import())
+        print(f"⏱️  รอบที่ {i + 1}: {runs[-1][0]['seconds']:.2f}s, peak RSS {runs[-1][0]['max_rss_kb'] / 1024:.0f}MB")
+    result, packages = min(runs, key=lambda run: run[0]['seconds'])
+    seconds = result['seconds']
+    rss_mb = result['max_rss_kb'] / 1024
+    
+    print(f"\n📦 Package ที่ import ช้าที่สุด (self time):")
+    for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"   {package:<28} {micros / 1000:>8.1f} ms")
+    
+    failures = []
+    if seconds > args.max_seconds:
+        failures.append(f"import ใช้เวลา {seconds:.2f}s เกิน {args.max_seconds:g}s")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"peak RSS {rss_mb:.0f}MB เกิน {args.max_rss_mb:g}MB")
+    heavy = [name for name in HEAVY_MODULES if name in result['modules']]
+    if heavy:
+        failures.append(f"heavy modules ถูก import ตอนเริ่มต้น: {', '.join(heavy)}")
+    
+    print("\n" + "=" * 50)
+    print(f"📊 import main_optimized: {seconds:.2f}s (สูงสุด {args.max_seconds:g}s), peak RSS {rss_mb:.0f}MB (สูงสุด {args.max_rss_mb:g}MB)")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("🎉 ผ่าน: ไม่มี heavy module ถูก import ตอนเริ่มต้น")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())